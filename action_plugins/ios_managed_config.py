@@ -0,0 +1,267 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+---
+module: ios_managed_config
+short_description: Generate the managed configuration of an ios device in one step
+description:
+  - Runs the whole pipeline of inc_set_managed_configuration_ios.yml on the
+    controller in a single task. The running configuration is parsed, the
+    banners are extracted ('^C' converted to chr(3)), the managed sections
+    and client ports are removed, the templates of the datamodel are
+    rendered with one template environment and all fragments are assembled
+    to dest.
+  - The most specific template is used like in include/inc_template.yml
+    (template_dir/network_os/config_group, template_dir/network_os,
+    template_dir).
+options:
+  src_config:
+    description: running configuration of the device
+    required: true
+  dest:
+    description: file the assembled configuration is written to (only if changed, not in check mode)
+    default: ''
+  delete_section_regex:
+    description: regular expressions of the managed sections
+    default: []
+  managed_client_ports:
+    description: managed client ports, default are the ports of conf_client_ports without port_type ptype_ignore
+  templates:
+    description:
+      - list of {key, template} of the generated fragments, default TEMPLATES
+      - if an item has a profile_template (config_client_interfaces.j2) the
+        ports of conf_client_ports are grouped by their profile, the profile
+        template is rendered once per distinct profile and the interface
+        lines are added in Python (see library/iosconfigprofiles.py).
+        The output is the same as of the template.
+  template_dir:
+    description: base directory of the templates, default the variable template_dir
+  config_group:
+    description: default the variable config_group
+  network_os:
+    description: default the variable ansible_network_os
+  dump_dir:
+    description: if not empty every fragment is written to dump_dir/<dump_prefix><key>.<network_os> (not in check mode)
+    default: ''
+  dump_prefix:
+    description: default '<inventory_hostname>_'
+  render_cache_dir:
+    description: directory of the rendered profiles shared by all hosts, default the variable render_cache_dir ('' keeps them in memory only)
+'''
+
+EXAMPLES = '''
+- name: Generate and assemble the managed configuration
+  ios_managed_config:
+    src_config: "{{ src_config }}"
+    dest: "{{ managed_config_dest }}"
+    delete_section_regex: "{{ delete_section_regex }}"
+  register: managed_config_assemble
+'''
+
+RETURN = '''
+changed:
+  description: true if dest was written (in check mode if dest would be written)
+checksum:
+  description: sha1 of the assembled configuration
+config:
+  description: the assembled configuration
+fragments:
+  description: keys of the assembled fragments in order
+managed_client_ports:
+  description: the removed client ports
+'''
+
+import sys
+import os
+
+from ansible.errors import AnsibleActionFail, AnsibleError
+from ansible.module_utils._text import to_text
+from ansible.plugins.action import ActionBase
+
+try:
+    from ansible.template import trust_as_template
+except ImportError:
+    # ansible < 2.19: all template data is trusted
+    def trust_as_template(value):
+        return value
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigassemble import IosConfigAssembler
+from iosconfigbatch import BANNERS, managed_client_ports, partition_rules
+from iosconfiginterfaces import IosConfigInterfaces
+from iosconfigpartition import IosConfigPartition
+from iosconfigprofiles import PROFILE_VARIABLES, ProfileBodyCache, client_port_profiles, \
+    render_client_interfaces, template_key
+from iosconfigregexp import MissingEndOfBannerError
+
+# generated fragments (see inc_set_managed_configuration_ios.yml)
+TEMPLATES = [
+    {'key': '0010_vlan_configuration', 'template': 'config_vlans.j2'},
+    {'key': '0800_client_ports_configuration', 'template': 'config_client_interfaces.j2',
+     'profile_template': 'config_client_interface_profile.j2'},
+    {'key': '0100_acl_emergency_access_configuration', 'template': 'config_acl_emergency_access.j2'},
+    {'key': '9010_banner_client_ports_configuration', 'template': 'config_ios_banner_motd.j2'},
+]
+# VSS Stack will just return one serial no (manually configured), so the
+# running banner motd is kept and no banner motd is generated
+VSS_CONFIG_GROUPS = ['C6800']
+VSS_SKIPPED_TEMPLATES = ['9010_banner_client_ports_configuration']
+# rendered profile bodies of this process
+PROFILE_CACHE_SIZE = 1024
+_PROFILE_CACHE = dict()
+
+
+class ActionModule(ActionBase):
+
+    TRANSFERS_FILES = False
+    _VALID_ARGS = frozenset(('src_config', 'dest', 'delete_section_regex', 'managed_client_ports', 'templates',
+                             'template_dir', 'config_group', 'network_os', 'dump_dir', 'dump_prefix',
+                             'render_cache_dir'))
+
+    def _var(self, task_vars: dict, name: str, default=None):
+        ''' templated value of the variable name, default if undefined '''
+        if name not in task_vars:
+            return default
+        return self._templar.template(task_vars[name])
+
+    def _template_dirs(self, template_dir: str, network_os: str, config_group: str) -> list:
+        ''' search path of inc_template.yml, most specific first '''
+        return [
+            os.path.join(template_dir, network_os, config_group),
+            os.path.join(template_dir, network_os),
+            template_dir,
+        ]
+
+    def _find(self, search_path: list, template: str) -> str:
+        ''' first template found in search_path, '' if there is none '''
+        for dirname in search_path:
+            filename = os.path.join(dirname, template)
+            if os.path.isfile(filename):
+                return filename
+        return ''
+
+    def _render(self, templar, search_path: list, template: str, filename: str = '') -> str:
+        ''' renders the first template found in search_path '''
+        filename = filename or self._find(search_path, template)
+        if filename == '':
+            raise AnsibleActionFail("Missing Template: {}".format(template))
+        data = trust_as_template(self._loader.get_text_file_contents(filename))
+        try:
+            res = templar.template(data, preserve_trailing_newlines=True, escape_backslashes=False,
+                                   overrides=dict(trim_blocks=True, lstrip_blocks=True))
+        except AnsibleError as e:
+            raise AnsibleActionFail("Template {} failed: {}".format(filename, to_text(e)))
+        return to_text(res) if res is not None else ''
+
+    def _render_profiles(self, templar, search_path: list, item: dict, template_vars: dict, cache_dir: str):
+        '''
+        Output of item['template'] rendered once per distinct port profile
+        with item['profile_template'], None if the profile template is
+        missing or conf_client_ports can't be grouped.
+        '''
+        filename = self._find(search_path, item['profile_template'])
+        if filename == '':
+            return None
+        try:
+            profiles = client_port_profiles(template_vars.get('conf_client_ports'),
+                                            template_vars.get('switch_interfaces'))
+        except (ValueError, AttributeError):
+            return None
+        cache = _PROFILE_CACHE.get(cache_dir)
+        if cache is None:
+            cache = _PROFILE_CACHE[cache_dir] = ProfileBodyCache(PROFILE_CACHE_SIZE, cache_dir)
+        prefix = template_key(self._loader.get_text_file_contents(filename), template_vars)
+
+        def render_body(profile):
+            templar.available_variables = dict(template_vars, **profile)
+            return self._render(templar, search_path, item['profile_template'], filename)
+        try:
+            res = render_client_interfaces(profiles, render_body, prefix, cache)[0]
+        finally:
+            templar.available_variables = template_vars
+        return res
+
+    def run(self, tmp=None, task_vars=None):
+        self._supports_check_mode = True
+        if task_vars is None:
+            task_vars = dict()
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        try:
+            if args.get('src_config') is None:
+                raise AnsibleActionFail("src_config is required")
+            host = self._var(task_vars, 'inventory_hostname', '')
+            network_os = args.get('network_os') or self._var(task_vars, 'ansible_network_os') or 'unknown_os'
+            config_group = args.get('config_group') or self._var(task_vars, 'config_group', 'NO_CONFIG_GROUP')
+            template_dir = args.get('template_dir') or self._var(task_vars, 'template_dir')
+            if not template_dir:
+                raise AnsibleActionFail("template_dir is not defined")
+            ports = args.get('managed_client_ports')
+            if ports is None:
+                ports = managed_client_ports(self._var(task_vars, 'conf_client_ports'))
+
+            # parse the running configuration, extract the banners and remove
+            # the managed sections and client ports in a single pass
+            src_config = args['src_config']
+            rules = partition_rules(host, '', ports, args.get('delete_section_regex') or [],
+                                    config_group, network_os)
+            parts = IosConfigPartition(src_config, rules, 'unmanaged').partition()
+            fragments = {'0001_unmanaged_configuration': parts['unmanaged'], '9999_end': 'end'}
+            for name, banner, part in BANNERS:
+                if name != 'banner_motd' or config_group in VSS_CONFIG_GROUPS:
+                    fragments[part] = parts[name]
+
+            # render all templates with one template environment
+            search_path = self._template_dirs(template_dir, network_os, config_group)
+            template_vars = dict(task_vars)
+            for name in PROFILE_VARIABLES + ('conf_client_ports',):
+                if name in task_vars:
+                    template_vars[name] = self._var(task_vars, name)
+            template_vars.update({
+                'switch_interfaces': IosConfigInterfaces(src_config).interfaces(),
+                'managed_client_ports': ports,
+                'display_core': '( --- CORE-SWITCH --- )' if self._var(task_vars, 'is_default_gateway') == True else '',
+            })
+            templar = self._templar.copy_with_new_env(searchpath=search_path, available_variables=template_vars)
+            cache_dir = args.get('render_cache_dir')
+            if cache_dir is None:
+                cache_dir = self._var(task_vars, 'render_cache_dir', '')
+            for item in args.get('templates') or TEMPLATES:
+                if config_group in VSS_CONFIG_GROUPS and item['key'] in VSS_SKIPPED_TEMPLATES:
+                    continue
+                res = None
+                if item.get('profile_template'):
+                    res = self._render_profiles(templar, search_path, item, template_vars, cache_dir)
+                if res is None:
+                    res = self._render(templar, search_path, item['template'])
+                fragments[item['key']] = res
+
+            # check mode reports the change without writing any file
+            check_mode = bool(self._play_context.check_mode)
+            assembler = IosConfigAssembler(fragments, network_os)
+            if args.get('dump_dir') and not check_mode:
+                assembler.dump(args['dump_dir'], args.get('dump_prefix', host + '_'))
+            if args.get('dest'):
+                result.update(assembler.write(args['dest'], check_mode))
+            else:
+                result.update({'changed': False, 'fragments': [key for key, data in assembler.ordered()]})
+            result['config'] = to_text(assembler.content())
+            result['managed_client_ports'] = list(ports)
+        except MissingEndOfBannerError as e:
+            result.update({'failed': True, 'msg': e.message})
+        except (ValueError, IOError, OSError) as e:
+            result.update({'failed': True, 'msg': 'ios_managed_config: {}'.format(e)})
+        except AnsibleActionFail as e:
+            result.update(e.result)
+        return result
@@ -0,0 +1,167 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    callback: ios_config_timing
+    type: aggregate
+    short_description: per host and per task timings as json and csv report
+    description:
+      - Measures the duration of every task per host and writes the
+        timings to <report>.json and <report>.csv at the end of the
+        playbook. The slowest hosts and tasks are displayed.
+    requirements:
+      - whitelist in configuration (callback_whitelist = ios_config_timing)
+    options:
+      report:
+        description: path of the report files without extension
+        default: ./reports/ios_config_timing
+        env:
+          - name: IOS_CONFIG_TIMING_REPORT
+        ini:
+          - section: callback_ios_config_timing
+            key: report
+      task_path:
+        description: only tasks defined in files containing this string are reported (all if empty)
+        default: ''
+        env:
+          - name: IOS_CONFIG_TIMING_TASK_PATH
+        ini:
+          - section: callback_ios_config_timing
+            key: task_path
+      top:
+        description: number of slowest hosts and tasks to display
+        default: 10
+        type: int
+        env:
+          - name: IOS_CONFIG_TIMING_TOP
+        ini:
+          - section: callback_ios_config_timing
+            key: top
+'''
+
+import csv
+import json
+import os
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    '''
+    Records (host, task) -> seconds from the start of the task on the host
+    (v2_runner_on_start) to its result. Loops are timed as one task. Tasks
+    are identified by their uuid, the name is only the label (tasks of an
+    include that is used several times or unnamed tasks share the name).
+    '''
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'ios_config_timing'
+    CALLBACK_NEEDS_WHITELIST = True
+
+    CSV_FIELDS = ('host', 'task', 'uuid', 'path', 'status', 'start', 'seconds')
+
+    def __init__(self, display=None):
+        super(CallbackModule, self).__init__(display=display)
+        self.report = './reports/ios_config_timing'
+        self.task_path = ''
+        self.top = 10
+        self.timings = list()
+        self.task_start = 0.0
+        self.running = dict()
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+        self.report = self.get_option('report')
+        self.task_path = self.get_option('task_path')
+        self.top = int(self.get_option('top'))
+
+    def _selected(self, task) -> bool:
+        return self.task_path == '' or self.task_path in (task.get_path() or '')
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self.task_start = time.time()
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self.task_start = time.time()
+
+    def v2_runner_on_start(self, host, task):
+        self.running[(host.get_name(), task._uuid)] = time.time()
+
+    def _record(self, result, status):
+        task = result._task
+        if not self._selected(task):
+            return
+        host = result._host.get_name()
+        start = self.running.pop((host, task._uuid), self.task_start)
+        self.timings.append({
+            'host': host,
+            'task': task.get_name(),
+            'uuid': task._uuid,
+            'path': task.get_path() or '',
+            'status': status,
+            'start': start,
+            'seconds': round(time.time() - start, 6),
+        })
+
+    def v2_runner_on_ok(self, result):
+        self._record(result, 'ok')
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record(result, 'failed')
+
+    def v2_runner_on_skipped(self, result):
+        self._record(result, 'skipped')
+
+    def v2_runner_on_unreachable(self, result):
+        self._record(result, 'unreachable')
+
+    def _totals(self, field: str) -> list:
+        ''' (value of field, total seconds) sorted by total seconds, slowest first '''
+        totals = dict()
+        for timing in self.timings:
+            totals[timing[field]] = totals.get(timing[field], 0.0) + timing['seconds']
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def _task_totals(self) -> list:
+        ''' {uuid, task, path, seconds} per task sorted by total seconds, slowest first '''
+        totals = dict()
+        for timing in self.timings:
+            total = totals.setdefault(timing['uuid'], {'uuid': timing['uuid'], 'task': timing['task'],
+                                                       'path': timing['path'], 'seconds': 0.0})
+            total['seconds'] += timing['seconds']
+        return sorted(totals.values(), key=lambda total: total['seconds'], reverse=True)
+
+    def _write_report(self):
+        dirname = os.path.dirname(os.path.abspath(self.report))
+        os.makedirs(dirname, exist_ok=True)
+        with open(self.report + '.json', 'w') as f:
+            json.dump({
+                'timings': self.timings,
+                'hosts': dict(self._totals('host')),
+                'tasks': self._task_totals(),
+            }, f, indent=2)
+        with open(self.report + '.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.timings)
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.timings:
+            return
+        try:
+            self._write_report()
+        except (IOError, OSError) as e:
+            self._display.warning('ios_config_timing: report could not be written: {}'.format(e))
+            return
+        self._display.banner('IOS CONFIG TIMING')
+        slowest_tasks = [(total['task'], total['seconds']) for total in self._task_totals()]
+        for title, totals in (('slowest hosts', self._totals('host')), ('slowest tasks', slowest_tasks)):
+            self._display.display('{}:'.format(title))
+            for name, seconds in totals[:self.top]:
+                self._display.display('  {:60} {:10.3f} s'.format(name, seconds))
+        self._display.display('report: {}.json, {}.csv'.format(self.report, self.report))
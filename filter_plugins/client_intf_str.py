@@ -66,85 +66,320 @@ description:
       name: "Te"
       number: "1/1/4"
 
+  client_intf_str_many, shorten_intf_str_many:
+  ============================================
+
+    List variants of client_intf_str and shorten_intf_str. They accept a list
+    of interface names (or a dictionary like conf_client_ports, the keys are
+    used) and return the list of dictionaries in the same order.
+
+  For e.g.:
+
+    - set_fact:
+        - intfs: "{{ conf_client_ports | shorten_intf_str_many }}"
+
+  interface_range_compress, interface_range_expand, interface_range_verify:
+  ==========================================================================
+
+    interface_range_compress replaces runs of consecutive interfaces
+    (e.g. GigabitEthernet1/0/1 - 12) with identical configuration by one
+    'interface range' block. Leading per-port lines (description) are kept
+    in a block of the port after the range. The interface type and number
+    are parsed with shorten_intf_str. interface_range_expand restores the
+    configuration line for line, interface_range_verify(original) checks
+    that the expanded configuration equals the original.
+
+    Only use the ranges for configuration that is merged (e.g. the
+    merge-mode change set of ios_config_delta). configure replace compares
+    the file line by line with the running-config, which never contains
+    'interface range'.
+
+  For e.g.:
+
+    - set_fact:
+        - config: "{{ client_ports_config | interface_range_compress }}"
+
+    interface GigabitEthernet1/0/1
+     description Printer
+     switchport mode access
+    !
+    interface GigabitEthernet1/0/2
+     switchport mode access
+    !
+
+    will return:
+
+    interface range GigabitEthernet1/0/1 - 2
+     switchport mode access
+    !
+    interface GigabitEthernet1/0/1
+     description Printer
+    !
+
 '''
 
 from ansible.errors import AnsibleFilterError
 
+import re
+from functools import lru_cache
 
-def parse_client_intf_str(str):
+
+# number of cached results per filter
+CACHE_SIZE = 4096
+
+# first two chars (lower case) -> interface name
+INTF_NAMES = {
+  u'fa': u'FastEthernet',
+  u'gi': u'GigabitEthernet',
+  u'te': u'TenGigabitEthernet',
+  u'tw': u'TwentyfiveGigabitEthernet',
+  u'fo': u'FortyGigabitEthernet',
+  u'hu': u'HundredGigabitEthernet',
+  u'ma': u'Management',
+  u'lo': u'Loopback',
+  u'et': u'eth',
+  u'po': u'',
+}
+
+# interface name or short name (lower case) -> short interface name
+SHORT_INTF_NAMES = {
+  u'fastethernet': u'Fa', u'fa': u'Fa',
+  u'gigabitethernet': u'Gi', u'gi': u'Gi',
+  u'ten-gigabitethernet': u'Te', u'tengigabitethernet': u'Te', u'te': u'Te',
+  u'twentyfivegigabitethernet': u'Tw', u'tw': u'Tw',
+  u'fortygigabitethernet': u'Fo', u'fo': u'Fo',
+  u'hundredgigabitethernet': u'Hu', u'hu': u'Hu',
+  u'management': u'Ma', u'mgmt': u'Ma', u'ma': u'Ma',
+  u'loopback': u'Lo', u'lo': u'Lo',
+  u'eth': u'et', u'et': u'et',
+  u'': u'Po',
+}
+
+DIGIT_RE = re.compile(u'[0-9]')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _client_intf_str(str):
   id = str[:2].lower()
-  if id == u'fa':
-    _interface = u'FastEthernet'
-  elif id == u'gi':
-    _interface = u'GigabitEthernet'
-  elif id == u'te':
-    _interface = u'TenGigabitEthernet'
-  elif id == u'tw':
-    _interface = u'TwentyfiveGigabitEthernet'
-  elif id == u'fo':
-    _interface = u'FortyGigabitEthernet'
-  elif id == u'hu':
-    _interface = u'HundredGigabitEthernet'
-  elif id == u'ma':
-    _interface = u'Management'
-  elif id == u'lo':
-    _interface = u'Loopback'
-  elif id == u'et':
-    _interface = u'eth'
-  elif id == u'po':
-    _interface = u''
-  else:
+  _interface = INTF_NAMES.get(id)
+  if _interface is None:
     raise AnsibleFilterError('client_intf_str: unknown category: %s' % id)
-  return {'name': _interface, 'number': str[2:]}
+  return (_interface, str[2:])
+
+
+def parse_client_intf_str(str):
+  name, number = _client_intf_str(str)
+  return {'name': name, 'number': number}
 
 
 def find_digit(str):
-  i = -1
-  j = 0
-  for c in str:
-    j = j+1
-    if c >= '0' and c <= '9' and i == -1:
-      i = j
-  return i
+  ''' 1-based position of the first digit in str, -1 if there is none '''
+  m = DIGIT_RE.search(str)
+  return -1 if m is None else m.start() + 1
 
 
-def parse_shorten_intf_str(str):
+@lru_cache(maxsize=CACHE_SIZE)
+def _shorten_intf_str(str):
   id = str.lower()
   p = find_digit(id)
   if p == -1:
     raise AnsibleFilterError('parse_shorten_intf_str: missing interface number: %s' % str)
   p = p -1
-  ifn = id[:p].strip()
-  if (ifn == u'fastethernet') or (ifn == u'fa'):
-    _interface = u'Fa'
-  elif (ifn == u'gigabitethernet') or (ifn == u'gi'):
-    _interface = u'Gi'
-  elif (ifn == u'ten-gigabitethernet') or (ifn == u'te'):
-    _interface = u'Te'
-  elif (ifn == u'tengigabitethernet'):
-    _interface = u'Te'
-  elif (ifn == u'twentyfivegigabitethernet') or (ifn == u'tw'):
-    _interface = u'Tw'
-  elif (ifn == u'fortygigabitethernet') or (ifn == u'fo'):
-    _interface = u'Fo'
-  elif (ifn == u'hundredgigabitethernet') or (ifn == u'hu'):
-    _interface = u'Hu'
-  elif (ifn == u'management') or (ifn == u'Ma') or (ifn == u'mgmt'):
-    _interface = u'Ma'
-  elif (ifn == u'loopback') or (ifn == u'lo'):
-    _interface = u'Lo'
-  elif (ifn == u'eth') or (ifn == u'et'):
-    _interface = u'et'
-  elif (ifn == u''):
-    _interface = u'Po'
-  else:
+  _interface = SHORT_INTF_NAMES.get(id[:p].strip())
+  if _interface is None:
     raise AnsibleFilterError('parse_shorten_intf_str: unknown category: %s' % str)
-  return {'name': _interface, 'number': str[p:]}
+  return (_interface, str[p:])
+
+
+def parse_shorten_intf_str(str):
+  name, number = _shorten_intf_str(str)
+  return {'name': name, 'number': number}
+
+
+def _intf_list(filtername, intfs):
+  if isinstance(intfs, (str, bytes)) or not hasattr(intfs, '__iter__'):
+    raise AnsibleFilterError('%s: list of interface names expected: %s' % (filtername, intfs))
+  return list(intfs)
+
+
+def parse_client_intf_str_many(intfs):
+  return [parse_client_intf_str(s) for s in _intf_list('client_intf_str_many', intfs)]
+
+
+def parse_shorten_intf_str_many(intfs):
+  return [parse_shorten_intf_str(s) for s in _intf_list('shorten_intf_str_many', intfs)]
+
+# minimum number of interfaces of an interface range
+MIN_RANGE = 2
+# leading lines of an interface kept per port
+RANGE_EXCEPTION_RE = re.compile(u'^ description ')
+RANGE_RE = re.compile(u'^interface range (?P<prefix>.*?)(?P<first>[0-9]+) - (?P<last>[0-9]+)$')
+
+
+def _config_lines(filtername, config):
+  if isinstance(config, (str, bytes)):
+    return (config.splitlines(), config[-1:] == '\n')
+  if not hasattr(config, '__iter__'):
+    raise AnsibleFilterError('%s: configuration expected: %s' % (filtername, config))
+  return (list(config), False)
+
+
+def _config_result(lines, newline):
+  return '\n'.join(lines) + ('\n' if newline and lines else '')
+
+
+def _interface_blocks(lines):
+  '''
+  Yields (name, exceptions, body, start) of all interface blocks: the
+  interface line, the leading exception lines, the rest of the indented
+  lines and the following '!' lines. Other lines are yielded with name None.
+  '''
+  i = 0
+  while i < len(lines):
+    line = lines[i]
+    if line[:10] != 'interface ' or line[:16] == 'interface range ':
+      yield (None, None, [line], i)
+      i += 1
+      continue
+    start = i
+    i += 1
+    exceptions = []
+    while i < len(lines) and RANGE_EXCEPTION_RE.match(lines[i]):
+      exceptions.append(lines[i])
+      i += 1
+    body = []
+    while i < len(lines) and lines[i][:1] == ' ':
+      body.append(lines[i])
+      i += 1
+    while i < len(lines) and lines[i] == '!':
+      body.append(lines[i])
+      i += 1
+    yield (line[10:], exceptions, body, start)
+
+
+def _range_key(name):
+  ''' (prefix, number) of the last interface number, None if name is no range member '''
+  try:
+    intf = parse_shorten_intf_str(name)
+  except AnsibleFilterError:
+    return None
+  number = intf['number']
+  p = len(number)
+  while p > 0 and number[p-1].isdigit():
+    p -= 1
+  if p == len(number) or number[p:][:1] == '0' and len(number) - p > 1:
+    return None
+  # the literal name is compared, so the ports expand to the same lines
+  return (name[:len(name) - len(number) + p], int(number[p:]))
+
+
+def interface_range_compress(config, min_range=MIN_RANGE):
+  lines, newline = _config_lines('interface_range_compress', config)
+  res = []
+  run = []
+
+  def flush():
+    if len(run) < max(min_range, 2):
+      for name, exceptions, body, key in run:
+        res.append('interface ' + name)
+        res.extend(exceptions)
+        res.extend(body)
+    else:
+      prefix = run[0][3][0]
+      res.append('interface range %s%d - %d' % (prefix, run[0][3][1], run[-1][3][1]))
+      res.extend(run[0][2])
+      for name, exceptions, body, key in run:
+        if exceptions:
+          res.append('interface ' + name)
+          res.extend(exceptions)
+          if body[-1] == '!':
+            res.append('!')
+    del run[:]
+
+  for name, exceptions, body, start in _interface_blocks(lines):
+    if name is None:
+      flush()
+      res.extend(body)
+      continue
+    key = _range_key(name)
+    if run and not (key is not None and run[-1][3] is not None and key[0] == run[-1][3][0] and
+                    key[1] == run[-1][3][1] + 1 and body == run[-1][2]):
+      flush()
+    if key is None or not body:
+      # a port with exception lines only stays a block of its own
+      run.append((name, exceptions, body, None))
+      flush()
+      continue
+    run.append((name, exceptions, body, key))
+  flush()
+  return _config_result(res, newline)
+
+
+def interface_range_expand(config):
+  lines, newline = _config_lines('interface_range_expand', config)
+  res = []
+  i = 0
+  while i < len(lines):
+    m = RANGE_RE.match(lines[i])
+    if m is None:
+      res.append(lines[i])
+      i += 1
+      continue
+    prefix = m.group('prefix')
+    first, last = int(m.group('first')), int(m.group('last'))
+    if last < first:
+      raise AnsibleFilterError('interface_range_expand: invalid range: %s' % lines[i])
+    i += 1
+    body = []
+    while i < len(lines) and lines[i][:1] == ' ':
+      body.append(lines[i])
+      i += 1
+    while i < len(lines) and lines[i] == '!':
+      body.append(lines[i])
+      i += 1
+    # per-port blocks of the range (interface, exception lines, optional '!')
+    exceptions = {}
+    while i < len(lines) and lines[i][:10 + len(prefix)] == 'interface ' + prefix:
+      number = lines[i][10 + len(prefix):]
+      if not number.isdigit() or not first <= int(number) <= last or int(number) in exceptions:
+        break
+      j = i + 1
+      while j < len(lines) and RANGE_EXCEPTION_RE.match(lines[j]):
+        j += 1
+      if j == i + 1 or j < len(lines) and lines[j] != '!' and lines[j][:1] == ' ':
+        break
+      exceptions[int(number)] = lines[i+1:j]
+      i = j + 1 if j < len(lines) and lines[j] == '!' else j
+    for n in range(first, last + 1):
+      res.append('interface %s%d' % (prefix, n))
+      res.extend(exceptions.get(n, []))
+      res.extend(body)
+  return _config_result(res, newline)
+
+
+def interface_range_verify(config, original):
+  ''' compares the expanded configuration with original line for line '''
+  expanded = _config_lines('interface_range_verify', interface_range_expand(config))[0]
+  lines = _config_lines('interface_range_verify', original)[0]
+  for n, (a, b) in enumerate(zip(expanded, lines)):
+    if a != b:
+      return {'equivalent': False, 'line': n + 1, 'expanded': a, 'original': b}
+  if len(expanded) != len(lines):
+    n = min(len(expanded), len(lines))
+    return {'equivalent': False, 'line': n + 1,
+            'expanded': expanded[n] if n < len(expanded) else None,
+            'original': lines[n] if n < len(lines) else None}
+  return {'equivalent': True, 'line': 0, 'expanded': None, 'original': None}
 
 # ---- Ansible filters ----
 class FilterModule(object):
     def filters(self):
         return {
             'client_intf_str': parse_client_intf_str,
-            'shorten_intf_str': parse_shorten_intf_str
+            'shorten_intf_str': parse_shorten_intf_str,
+            'client_intf_str_many': parse_client_intf_str_many,
+            'shorten_intf_str_many': parse_shorten_intf_str_many,
+            'interface_range_compress': interface_range_compress,
+            'interface_range_expand': interface_range_expand,
+            'interface_range_verify': interface_range_verify,
         }
@@ -0,0 +1,52 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigassemble import IosConfigAssembler
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_assemble': self.ios_config_assemble
+        }
+
+    def ios_config_assemble(self, a, dest='', network_os='ios', dump_dir='', dump_prefix='', *args, **kw):
+        '''
+        Assemble the configuration fragments of dictionary a (key -> str or list
+        of lines) like the assemble module does with the files in host_tmpdir
+        and write it to dest if the content has changed.
+
+        If dump_dir != '' all fragments are written to
+        dump_dir/<dump_prefix><key>.<network_os> for debugging.
+
+        Returns a dictionary with changed, dest, checksum and fragments.
+        '''
+        try:
+            asm = IosConfigAssembler(a, network_os)
+            if dump_dir != '':
+                asm.dump(dump_dir, dump_prefix)
+            if dest == '':
+                return {'changed': False, 'dest': dest, 'content': asm.content().decode(asm.ENCODING),
+                        'fragments': [key for key, data in asm.ordered()]}
+            return asm.write(dest)
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_assemble: {}'.format(e))
+        except (IOError, OSError) as e:
+            raise AnsibleFilterError(
+                ("'Error in filter ios_config_assemble! "
+                "File '{}' could not be written: {}").format(dest, e))
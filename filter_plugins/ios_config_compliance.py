@@ -0,0 +1,46 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigcompliance import IosConfigFingerprint
+from iosconfigregexp import MissingEndOfBannerError
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_compliance': self.ios_config_compliance
+        }
+
+    def ios_config_compliance(self, a, generated, ignore_regexp=list(), *args, **kw):
+        '''
+        Compare the top-level section fingerprints of the running
+        configuration a with the generated configuration without loading
+        the configuration to the device.
+
+            {{ src_config_running | ios_config_compliance(lookup('file', managed_config_dest), delete_section_diff_result) }}
+
+        Returns a dictionary with compliant (bool) and the header lines of
+        the changed, added and removed sections.
+        '''
+        try:
+            running = IosConfigFingerprint(a, ignore_regexp)
+            return running.compare(IosConfigFingerprint(generated, ignore_regexp))
+        except MissingEndOfBannerError as e:
+            raise AnsibleFilterError(e.message)
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_compliance: {}'.format(e))
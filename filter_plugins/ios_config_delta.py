@@ -0,0 +1,56 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigdelta import IosConfigDelta
+from iosconfigregexp import MissingEndOfBannerError
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_delta': self.ios_config_delta,
+            'ios_config_delta_verify': self.ios_config_delta_verify,
+        }
+
+    def ios_config_delta(self, a, generated, ignore_regexp=list(), *args, **kw):
+        '''
+        Returns the ios commands (list of lines) that change the running
+        configuration a to the generated configuration in merge mode:
+
+            {{ src_config | ios_config_delta(lookup('file', managed_config_dest), delete_section_diff_result) }}
+        '''
+        try:
+            return IosConfigDelta(a, generated, ignore_regexp).delta()
+        except MissingEndOfBannerError as e:
+            raise AnsibleFilterError(e.message)
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_delta: {}'.format(e))
+
+    def ios_config_delta_verify(self, a, generated, delta, ignore_regexp=list(), *args, **kw):
+        '''
+        Replays the commands delta against the running configuration a and
+        compares the result with the generated configuration. Returns a
+        dictionary with verified (bool), commands and the differing
+        top-level lines.
+        '''
+        try:
+            return IosConfigDelta(a, generated, ignore_regexp).verify(delta)
+        except MissingEndOfBannerError as e:
+            raise AnsibleFilterError(e.message)
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_delta_verify: {}'.format(e))
@@ -0,0 +1,40 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfiginterfaces import IosConfigInterfaces
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_interfaces': self.ios_config_interfaces
+        }
+
+    def ios_config_interfaces(self, a, *args, **kw):
+        '''
+        Parse all interface-sections of the configuration in a single pass.
+
+        Returns a dictionary interface_name -> record with the fields of
+        templates/textfsm/cisco_ios_show_run_interface_part.template, e.g.
+
+            {{ (switch_interfaces[intf] | default({})).vlan_voice }}
+        '''
+        try:
+            return IosConfigInterfaces(a).interfaces()
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_interfaces: {}'.format(e))
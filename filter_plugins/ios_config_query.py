@@ -0,0 +1,48 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigquery import IosConfigQuery, IosConfigTree
+from iosconfigregexp import MissingEndOfBannerError
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_query': self.ios_config_query
+        }
+
+    def ios_config_query(self, a, query, ignorecase=False, sections=False, *args, **kw):
+        '''
+        Path query over the nested sections of the configuration a, steps
+        separated by ' > ' (child) or ' >> ' (any depth):
+
+            {{ src_config | ios_config_query('interface GigabitEthernet.* > switchport voice vlan .*') }}
+
+        Returns the matches (line, start, end, parents and with sections
+        the lines of the span). A list of queries returns a dictionary
+        query -> matches, the configuration is parsed once.
+        '''
+        try:
+            tree = IosConfigTree.get(a)
+            if isinstance(query, str):
+                return IosConfigQuery(query, ignorecase).matches(tree, sections)
+            return dict((q, IosConfigQuery(q, ignorecase).matches(tree, sections)) for q in query)
+        except MissingEndOfBannerError as e:
+            raise AnsibleFilterError(e.message)
+        except (ValueError, TypeError) as e:
+            raise AnsibleFilterError('ios_config_query: {}'.format(e))
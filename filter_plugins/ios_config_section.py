@@ -10,56 +10,292 @@ from ansible.errors import AnsibleFilterError
 import sys
 import os
 import copy
+import json
+import time
+import tempfile
 
 LIBRARIES_DIR = '../library'
+STREAM_BUFFER_SIZE = 1024 * 1024
+# configurations are utf-8, other bytes (e.g. in banners) are written back unchanged
+STREAM_ENCODING = 'utf-8'
+STREAM_ERRORS = 'surrogateescape'
 sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
 
 # Append relative path for library directory. Allow to copy filestructure
 # without need to alter path definition
 from iosconfigregexp import IosConfigRegexp, MissingEndOfBannerError
+from iosconfigpartition import IosConfigPartition
+from resultcache import LruResultCache, input_digest, pattern_key
+
+# Results of the extract, remove and partition filters are cached per process.
+# Set IOS_CONFIG_SECTION_CACHE=0 to disable the cache, the limits are set with
+# IOS_CONFIG_SECTION_CACHE_SIZE (entries) and IOS_CONFIG_SECTION_CACHE_BYTES.
+CACHE_ENV = 'IOS_CONFIG_SECTION_CACHE'
+_RESULT_CACHE = LruResultCache(
+    int(os.environ.get(CACHE_ENV + '_SIZE', 128)),
+    int(os.environ.get(CACHE_ENV + '_BYTES', 64 * 1024 * 1024)))
+
+
+def _cache_enabled():
+    return os.environ.get(CACHE_ENV, '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def _cached(key, config, compute):
+    ''' Result of compute() for config, cached under key + config digest '''
+    _RESULT_CACHE.enabled = _cache_enabled()
+    if not _RESULT_CACHE.enabled:
+        return compute()
+    key = (input_digest(config),) + key
+    res = _RESULT_CACHE.get(key)
+    if res is None:
+        res = compute()
+        _RESULT_CACHE.put(key, res)
+    return res
+
+
+# Set IOS_CONFIG_SECTION_METRICS=1 to collect the metrics of every extract,
+# remove and partition call in this process (see ios_config_section_metrics).
+# Any other value is the name of a file the metrics are appended to as json
+# lines, e.g. to collect the metrics of all ansible worker processes.
+METRICS_ENV = 'IOS_CONFIG_SECTION_METRICS'
+METRICS_FIELDS = ('seconds', 'lines_in', 'lines_scanned', 'regex_evaluations', 'index_lookups',
+                  'sections_matched', 'lines_out', 'bytes_out')
+_METRICS = dict()
+
+
+def _metrics_target():
+    ''' None if metrics are disabled, '' to collect in this process, else a filename '''
+    value = os.environ.get(METRICS_ENV, '')
+    if value.lower() in ('', '0', 'false', 'no', 'off'):
+        return None
+    if value.lower() in ('1', 'true', 'yes', 'on'):
+        return ''
+    return value
+
+
+def _record_metrics(filtername, metrics):
+    ''' Adds the metrics of one filter call to the totals of filtername '''
+    total = _METRICS.setdefault(filtername, dict.fromkeys(('calls', 'cached') + METRICS_FIELDS, 0))
+    total['calls'] += 1
+    total['cached'] += bool(metrics.get('cached'))
+    for field in METRICS_FIELDS:
+        total[field] += metrics.get(field, 0)
+    target = _metrics_target()
+    if target:
+        try:
+            with open(target, 'a') as f:
+                f.write(json.dumps(dict(metrics, filter=filtername, pid=os.getpid())) + '\n')
+        except (IOError, OSError):
+            raise AnsibleFilterError(
+                ("'Error in filter {}! "
+                "File '{}' could not be written").format(filtername, target))
+
+
+def _run_section(filtername, operation, a, regexp, ignorecase, prefix_str):
+    '''
+    extract_section or remove_section of a, cached. The metrics of the call
+    are recorded if IOS_CONFIG_SECTION_METRICS is set.
+    '''
+    key = (pattern_key(regexp), bool(ignorecase), prefix_str or '', operation)
+    if _metrics_target() is None:
+        return _cached(key, a, lambda: getattr(IosConfigRegexp(a, regexp, ignorecase, prefix_str), operation + '_section')())
+    icr = IosConfigRegexp(None, regexp, ignorecase, prefix_str, metrics=True)
+    def compute():
+        icr.conf_lines = a
+        return getattr(icr, operation + '_section')()
+    start = time.perf_counter()
+    res = _cached(key, a, compute)
+    metrics = icr.last_metrics or {'cached': True, 'lines_out': len(res), 'bytes_out': sum(len(li) + 1 for li in res)}
+    metrics['seconds'] = time.perf_counter() - start
+    _record_metrics(filtername, metrics)
+    return res
+
+
+def _save_lines(filtername, filename, lines):
+    ''' Write lines to filename if filename != '' and lines is not empty '''
+    if filename != '' and lines != None and len(lines) > 0:
+        try:
+            with open(filename, 'w') as f:
+                for l in lines:
+                    f.write(l + os.linesep)
+        except:
+            raise AnsibleFilterError(
+                ("'Error in filter {}! "
+                "File '{}' could not be written").format(filtername, filename))
+
+
+def _stream_lines(filtername, filename, lines):
+    '''
+    Write the lines of an iterator to filename through a buffered writer.
+    The lines are written to a temporary file in the directory of filename,
+    which replaces filename when all lines are written and is deleted on any
+    error, so filename is never left partially written. Like _save_lines()
+    the file is only created if there is at least one line. Returns the
+    number of lines written.
+    '''
+    count = 0
+    f = None
+    tmp = None
+    try:
+        for l in lines:
+            if f == None:
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)),
+                                           prefix='.' + os.path.basename(filename) + '-')
+                f = os.fdopen(fd, 'w', buffering=STREAM_BUFFER_SIZE,
+                              encoding=STREAM_ENCODING, errors=STREAM_ERRORS)
+            f.write(l + os.linesep)
+            count += 1
+        if f != None:
+            f.close()
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, filename)
+            tmp = None
+    except (IOError, OSError):
+        raise AnsibleFilterError(
+            ("'Error in filter {}! "
+            "File '{}' could not be written").format(filtername, filename))
+    finally:
+        if f != None:
+            f.close()
+        if tmp != None and os.path.exists(tmp):
+            os.unlink(tmp)
+    return count
+
+
+def _stream_section(filtername, operation, src_filename, regexp, ignorecase, prefix_str, filename):
+    ''' Stream src_filename through IosConfigRegexp.iter_<operation> into filename '''
+    if not filename:
+        raise AnsibleFilterError(
+            "'Error in filter {}! A filename for the result is required".format(filtername))
+    icr = IosConfigRegexp(None, regexp, ignorecase, prefix_str)
+    try:
+        src = open(src_filename, 'r', buffering=STREAM_BUFFER_SIZE, encoding=STREAM_ENCODING, errors=STREAM_ERRORS)
+    except (IOError, OSError):
+        raise AnsibleFilterError(
+            ("'Error in filter {}! "
+            "File '{}' could not be read").format(filtername, src_filename))
+    try:
+        with src:
+            return _stream_lines(filtername, filename, getattr(icr, 'iter_' + operation)(src))
+    except MissingEndOfBannerError as e:
+        raise AnsibleFilterError(e.message)
+
 
 class FilterModule(object):
 
     def filters(self):
         return {
             'ios_config_section_extract': self.ios_config_section_extract,
-            'ios_config_section_remove': self.ios_config_section_remove
+            'ios_config_section_remove': self.ios_config_section_remove,
+            'ios_config_partition': self.ios_config_partition,
+            'ios_config_file_extract': self.ios_config_file_extract,
+            'ios_config_file_remove': self.ios_config_file_remove,
+            'ios_config_section_cache_stats': self.ios_config_section_cache_stats,
+            'ios_config_section_metrics': self.ios_config_section_metrics
         }
 
     def ios_config_section_extract(self, a, regexp=[], ignorecase=False, prefix_str='', filename='', *args, **kw):
         '''
         Extract all sections selected by regexp list and save to a file if filename != ''
         '''
-        icr = IosConfigRegexp(a, regexp, ignorecase, prefix_str)
         try:
-            sec = icr.extract_section()
-            if filename != '' and sec != None and len(sec) > 0:
-                try:
-                    with open(filename, 'w') as f:
-                        for l in sec:
-                            f.write(l + os.linesep)
-                except:
-                    raise AnsibleFilterError(
-                        ("'Error in filter ios_config_section_extract! "
-                        "File '{}' could not be written").format(filename))
+            sec = _run_section('ios_config_section_extract', 'extract', a, regexp, ignorecase, prefix_str)
+            _save_lines('ios_config_section_extract', filename, sec)
             return sec
         except MissingEndOfBannerError as e:
             raise AnsibleFilterError(e.message)
 
     def ios_config_section_remove(self, a, regexp=[], ignorecase=False, prefix_str='', filename='', *args, **kw):
         ''' Extract all sections selected by regexp list'''
-        icr = IosConfigRegexp(a, regexp, ignorecase, prefix_str)
         try:
-            sec = icr.remove_section()
-            if filename != '' and sec != None and len(sec) > 0:
-                try:
-                    with open(filename, 'w') as f:
-                        for l in sec:
-                            f.write(l + os.linesep)
-                except:
-                    raise AnsibleFilterError(
-                        ("'Error in filter ios_config_section_remove! "
-                        "File '{}' could not be written").format(filename))
+            sec = _run_section('ios_config_section_remove', 'remove', a, regexp, ignorecase, prefix_str)
+            _save_lines('ios_config_section_remove', filename, sec)
             return sec
         except MissingEndOfBannerError as e:
             raise AnsibleFilterError(e.message)
+
+    def ios_config_partition(self, a, rules={}, remainder='unmanaged', filename='', *args, **kw):
+        '''
+        Split the configuration in a single pass. rules is a dictionary
+        rule-name -> { action: extract|remove, regexp, ignorecase, prefix_str, filename }.
+
+        Returns a dictionary with the extracted lines of every extract rule and
+        the remaining configuration (without the sections of all remove rules)
+        as key remainder. Every part is saved to its filename if given.
+        '''
+        start = time.perf_counter()
+        try:
+            icp = IosConfigPartition(None, rules, remainder)
+            key = (tuple(sorted(
+                (name, rule['action'], pattern_key(rule.get('regexp')),
+                 bool(rule.get('ignorecase', False)), rule.get('prefix_str', '') or '')
+                for name, rule in icp.rules.items())), remainder, 'partition')
+            # set by partition(), the result is cached if it wasn't called
+            computed = list()
+            def partition():
+                computed.append(True)
+                icp.conf_lines = a
+                return icp.partition()
+            res = _cached(key, a, partition)
+        except MissingEndOfBannerError as e:
+            raise AnsibleFilterError(e.message)
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_partition: {}'.format(e))
+        if _metrics_target() is not None:
+            _record_metrics('ios_config_partition', {
+                'call': 'partition',
+                'cached': not computed,
+                'seconds': time.perf_counter() - start,
+                'lines_in': len(icp.conf_lines),
+                'lines_out': sum(len(part) for part in res.values()),
+                'bytes_out': sum(len(li) + 1 for part in res.values() for li in part),
+            })
+        for name, rule in icp.rules.items():
+            if rule['action'] == 'extract':
+                _save_lines('ios_config_partition', rule.get('filename', ''), res[name])
+        _save_lines('ios_config_partition', filename, res[remainder])
+        return res
+
+    def ios_config_file_extract(self, src_config_filename, regexp=[], ignorecase=False, prefix_str='', filename='', *args, **kw):
+        '''
+        Extract all sections selected by regexp list from the file src_config_filename
+        and write them to filename. The configuration is streamed line by line, so
+        large archived configurations are processed in constant memory.
+
+        Returns the number of lines written.
+        '''
+        return _stream_section('ios_config_file_extract', 'extract', src_config_filename,
+                               regexp, ignorecase, prefix_str, filename)
+
+    def ios_config_file_remove(self, src_config_filename, regexp=[], ignorecase=False, prefix_str='', filename='', *args, **kw):
+        '''
+        Remove all sections selected by regexp list from the file src_config_filename
+        and write the remaining configuration to filename (streamed, see
+        ios_config_file_extract).
+
+        Returns the number of lines written.
+        '''
+        return _stream_section('ios_config_file_remove', 'remove', src_config_filename,
+                               regexp, ignorecase, prefix_str, filename)
+
+    def ios_config_section_cache_stats(self, a=None, *args, **kw):
+        '''
+        Returns the counters of the result cache of this process (hits,
+        misses, evictions, entries, bytes). The input is ignored:
+
+            {{ '' | ios_config_section_cache_stats }}
+        '''
+        _RESULT_CACHE.enabled = _cache_enabled()
+        return _RESULT_CACHE.stats()
+
+    def ios_config_section_metrics(self, a=None, *args, **kw):
+        '''
+        Returns the metrics of this process per filter (calls, cached calls
+        and the totals of seconds, lines_in, lines_scanned,
+        regex_evaluations, index_lookups, sections_matched, lines_out,
+        bytes_out) if IOS_CONFIG_SECTION_METRICS is set. The input is
+        ignored:
+
+            {{ '' | ios_config_section_metrics }}
+        '''
+        return copy.deepcopy(_METRICS)
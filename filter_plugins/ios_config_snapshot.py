@@ -0,0 +1,57 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigsnapshot import IosConfigSnapshotStore
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_snapshot_put': self.ios_config_snapshot_put,
+            'ios_config_snapshot_get': self.ios_config_snapshot_get,
+        }
+
+    def ios_config_snapshot_put(self, a, store_dir, host, kind='running', *args, **kw):
+        '''
+        Stores the configuration a of host in the snapshot store store_dir.
+        Returns the manifest without the chunk list (timestamp, sha1, size,
+        changed, new_chunks, bytes_written).
+        '''
+        try:
+            res = IosConfigSnapshotStore(store_dir).put(host, a, kind)
+        except (ValueError, IOError, OSError) as e:
+            raise AnsibleFilterError('ios_config_snapshot_put: {}'.format(e))
+        del res['chunks']
+        return res
+
+    def ios_config_snapshot_get(self, a, host, kind='running', timestamp='', *args, **kw):
+        '''
+        Returns the configuration of host from the snapshot store a, the
+        latest snapshot whose timestamp starts with timestamp ('' or
+        'latest' is the latest snapshot):
+
+            {{ config_store_dir | ios_config_snapshot_get(inventory_hostname) }}
+        '''
+        try:
+            res = IosConfigSnapshotStore(a).get(host, kind, timestamp)
+        except (ValueError, IOError, OSError) as e:
+            raise AnsibleFilterError('ios_config_snapshot_get: {}'.format(e))
+        if res == None:
+            raise AnsibleFilterError(
+                "ios_config_snapshot_get: no {} snapshot of {} for timestamp '{}'".format(kind, host, timestamp))
+        return res
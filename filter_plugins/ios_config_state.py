@@ -0,0 +1,62 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from iosconfigstate import HostStateFile, input_fingerprint
+from iosconfigregexp import MissingEndOfBannerError
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ios_config_input_fingerprint': self.ios_config_input_fingerprint,
+            'ios_config_state_unchanged': self.ios_config_state_unchanged,
+            'ios_config_state_update': self.ios_config_state_update,
+        }
+
+    def ios_config_input_fingerprint(self, a, ignore_regexp=list(), data=dict(), filenames=list(), *args, **kw):
+        '''
+        Fingerprint of the running configuration a, the template variables
+        data and the content of the files filenames.
+        '''
+        try:
+            return input_fingerprint(a, ignore_regexp, data, filenames)
+        except MissingEndOfBannerError as e:
+            raise AnsibleFilterError(e.message)
+        except ValueError as e:
+            raise AnsibleFilterError('ios_config_input_fingerprint: {}'.format(e))
+
+    def ios_config_state_unchanged(self, a, state_file, host, force=False, *args, **kw):
+        '''
+        True if the fingerprint a is the fingerprint of the last compliant
+        run of host in state_file and force is false.
+        '''
+        if force:
+            return False
+        try:
+            return HostStateFile(state_file).is_unchanged(host, a)
+        except (IOError, OSError) as e:
+            raise AnsibleFilterError('ios_config_state_unchanged: {}'.format(e))
+
+    def ios_config_state_update(self, a, state_file, host, compliant, *args, **kw):
+        '''
+        Stores the fingerprint a and the compliance of host in state_file.
+        '''
+        try:
+            return HostStateFile(state_file).update(host, a, compliant in [True, 'true', 'True'])
+        except (IOError, OSError) as e:
+            raise AnsibleFilterError('ios_config_state_update: {}'.format(e))
@@ -0,0 +1,71 @@
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+import sys
+import os
+
+import yaml
+
+LIBRARIES_DIR = '../library'
+sys.path.append( os.path.join( os.path.dirname(__file__), LIBRARIES_DIR ) )
+
+# Append relative path for library directory. Allow to copy filestructure
+# without need to alter path definition
+from plantdatamodel import PlantDataModel
+
+
+def _load(name, plant_dir, cache_dir):
+    try:
+        return PlantDataModel.load(plant_dir, cache_dir)
+    except (ValueError, IOError, OSError, yaml.YAMLError) as e:
+        raise AnsibleFilterError('{}: {}'.format(name, e))
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'plant_data_model': self.plant_data_model,
+            'plant_device_vlans': self.plant_device_vlans,
+            'plant_uplinks_by_host': self.plant_uplinks_by_host,
+            'plant_vlan_name': self.plant_vlan_name,
+        }
+
+    def plant_data_model(self, a, cache_dir='', *args, **kw):
+        '''
+        Returns all variables of the plant directory a (like include_vars
+        dir). The files are parsed once per process, cache_dir shares the
+        parsed model between the processes:
+
+            {{ (vars_dir ~ '/' ~ switch_location_group) | plant_data_model(plant_data_cache_dir) }}
+        '''
+        return _load('plant_data_model', a, cache_dir).data
+
+    def plant_device_vlans(self, a, groups, cache_dir='', *args, **kw):
+        '''
+        Returns the vlans of the plant directory a deployed to one of the
+        vlan groups (switch_location) in the format of device_vlans.
+        '''
+        return _load('plant_device_vlans', a, cache_dir).device_vlans(groups)
+
+    def plant_uplinks_by_host(self, a, host, cache_dir='', *args, **kw):
+        '''
+        Returns the uplinks of the plant directory a with host as left or
+        right device, with the additional keys side and device_remote.
+        '''
+        return _load('plant_uplinks_by_host', a, cache_dir).uplinks_by_host.get(host, {})
+
+    def plant_vlan_name(self, a, vlan_id, cache_dir='', *args, **kw):
+        '''
+        Returns the vlan_name of vlan_id in the plant directory a.
+        '''
+        res = _load('plant_vlan_name', a, cache_dir).vlan_names.get(str(vlan_id))
+        if res == None:
+            raise AnsibleFilterError('plant_vlan_name: vlan {} not defined'.format(vlan_id))
+        return res
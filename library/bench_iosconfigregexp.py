@@ -0,0 +1,516 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+'''
+Benchmark for IosConfigRegexp.
+
+Compares remove_section and extract_section with the former implementation
+(vendored as LegacyIosConfigRegexp), which built and matched every anchored
+expression per line (re.match) and scanned the sections line by line.
+
+    python3 bench_iosconfigregexp.py [--members 9] [--ports 48] [--repeat 3]
+
+With --memory the peak RSS of the 7 filter calls of one host run (5 banner
+extracts, 2 removes) is measured in separate processes, once with the former
+list storage (deepcopy per call) and once with ConfigLines views of a memory
+mapped configuration file.
+
+    python3 bench_iosconfigregexp.py --memory [--lines 50000]
+
+With --suite IosConfigRegexp (index build, extract_section, remove_section)
+and IosConfigInterfaces are timed on configurations of gen_ios_config()
+across a grid of configuration sizes and pattern counts. --save-baseline
+writes the timings to a json file, --baseline compares the timings with a
+saved baseline and exits with 1 if a case is slower than the baseline by
+more than --threshold (0.25 = 25%).
+
+    python3 bench_iosconfigregexp.py --suite --save-baseline bench_baseline.json
+    python3 bench_iosconfigregexp.py --suite --baseline bench_baseline.json [--threshold 0.25]
+
+With --parallel remove_section/extract_section are compared with
+remove_parallel/extract_parallel on a large configuration (huge ACLs).
+
+    python3 bench_iosconfigregexp.py --parallel 4 [--acls 400]
+'''
+
+import argparse
+import copy
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from iosconfigregexp import IosConfigRegexp, MissingEndOfBannerError, _SectionIndex
+from iosconfiginterfaces import IosConfigInterfaces
+from configlines import ConfigLines
+
+
+class LegacyIosConfigRegexp:
+    '''
+    Former IosConfigRegexp (before the precompiled matcher and the section
+    index), vendored as baseline: every anchored expression is built and
+    matched per line (re.match) and the sections and banners are scanned
+    line by line.
+    '''
+
+    def __init__(self, config=None, regexplist=list(), ignorecase=False, prefix_str=''):
+        if config == None:
+            self.conf_lines = list()
+        elif isinstance(config, str):
+            self.conf_lines = config.splitlines()
+        else:
+            self.conf_lines = copy.deepcopy(list(config))
+        if regexplist == None:
+            regexplist = list()
+        elif isinstance(regexplist, str):
+            regexplist = regexplist.splitlines()
+        self.regexplist = copy.deepcopy(list(regexplist))
+        for i in range(0, len(self.regexplist)):
+            # allow using extracted banner for further filtering
+            pos = self.regexplist[i].find(r"\^C")
+            if pos != -1:
+                self.regexplist.append(self.regexplist[i][:pos] + "\x03" + self.regexplist[i][pos+3:])
+        self.re_flags = re.IGNORECASE if ignorecase else 0
+        self.prefix_str = prefix_str
+        self.prev_line = ''
+
+    def is_match(self, i: int) -> bool:
+        line = self.conf_lines[i]
+        for pat in self.regexplist:
+            expr = self.prefix_str + pat
+            if expr[0:1] != '^':
+                expr = '^' + expr
+            if expr[-1:] != '$':
+                expr = expr + '$'
+            m = re.match(expr, line, self.re_flags)
+            if m:
+                return True
+        return False
+
+    def is_banner(self, idx) -> bool:
+        return (self.conf_lines[idx].lower().find('banner ') != -1
+                and (self.conf_lines[idx][-2:] == '^C' or self.conf_lines[idx][-1:] == "\x03"))
+
+    def _extract_section(self, i: int, res: list) -> int:
+        is_in_section = True
+        while i < len(self.conf_lines) and is_in_section:
+            if (self.prev_line != '!' or self.conf_lines[i] != '!'):
+                res.append(self.conf_lines[i])
+                self.prev_line = self.conf_lines[i]
+            i += 1
+            if i < len(self.conf_lines):
+                li = self.conf_lines[i]
+                if (li + 'X')[0] != ' ':
+                    is_in_section = False
+        return i
+
+    def _remove_section(self, i: int, res: list) -> int:
+        is_in_section = True
+        while i < len(self.conf_lines) and is_in_section:
+            i += 1
+            if i < len(self.conf_lines):
+                li = self.conf_lines[i]
+                if (li + 'X')[0] != ' ':
+                    is_in_section = False
+        return i
+
+    def _extract_banner(self, i: int, res: list) -> int:
+        is_in_section = True
+        is_first = True
+        ErrMsg = ("Error in IosConfigRegexp.extract_banner: "
+                  "Missing block-end for line-no {} - '{}'").format(i, self.conf_lines[i])
+        while i < len(self.conf_lines) and is_in_section:
+            if is_first:
+                # modify for napalm_install_config compatibility
+                res.append(self.conf_lines[i][:-2] + "\x03")
+                is_first = False
+            else:
+                li = self.conf_lines[i]
+                if (li)[-2:] == '^C' or (li)[-1:] == "\x03":  # ^C at eol
+                    is_in_section = False
+                    res.append("\x03")
+                else:
+                    res.append(li)
+            i += 1
+        if is_in_section:
+            raise MissingEndOfBannerError(ErrMsg)
+        return i
+
+    def _remove_banner(self, i: int, res: list) -> int:
+        is_in_section = True
+        ErrMsg = ("Error in IosConfigRegexp.remove_banner: "
+                  "Missing block-end for line-no {} - '{}'").format(i, self.conf_lines[i])
+        while i < len(self.conf_lines) and is_in_section:
+            i += 1
+            if i >= len(self.conf_lines):
+                raise MissingEndOfBannerError(ErrMsg)
+            li = self.conf_lines[i]
+            if (li)[-2:] == '^C' or (li)[-1:] == "\x03":  # ^C at eol
+                i += 1
+                is_in_section = False
+        if is_in_section:
+            raise MissingEndOfBannerError(ErrMsg)
+        return i
+
+    def extract_section(self) -> list:
+        res = list()
+        i = 0
+        self.prev_line = ''
+        while i < len(self.conf_lines):
+            if self.is_match(i):
+                if self.is_banner(i):
+                    i = self._extract_banner(i, res)
+                else:
+                    i = self._extract_section(i, res)
+            else:
+                i += 1
+        return res
+
+    def remove_section(self) -> list:
+        res = list()
+        i = 0
+        self.prev_line = ''
+        while i < len(self.conf_lines):
+            if self.is_match(i):
+                if self.is_banner(i):
+                    i = self._remove_banner(i, res)
+                else:
+                    i = self._remove_section(i, res)
+            else:
+                if (self.prev_line != '!' or self.conf_lines[i] != '!'):
+                    res.append(self.conf_lines[i])
+                    self.prev_line = self.conf_lines[i]
+                i += 1
+        return res
+
+
+class LegacyStorageIosConfigRegexp(IosConfigRegexp):
+    ''' IosConfigRegexp storing conf_lines as deep copied list '''
+
+    @property
+    def conf_lines(self):
+        return self.__legacy_lines
+
+    @conf_lines.setter
+    def conf_lines(self, value):
+        if value == None:
+            self.__legacy_lines = list()
+        elif isinstance(value, str):
+            self.__legacy_lines = value.splitlines()
+        else:
+            self.__legacy_lines = copy.deepcopy(value)
+
+
+BANNERS = ['motd', 'login', 'exec', 'incoming', 'slip-ppp']
+DELETE_SECTION_REGEX = [
+    r"^Building\s+configuration.*$$",
+    r"^Current\s+configuration.*$$",
+    r"^vlan\s+\d*$$",
+    r"^banner\s+.*\^C$$",
+    r"^end$$",
+]
+
+
+def host_run(icr_class, conf, ports: list) -> list:
+    ''' the filter calls of one host run, returns all results '''
+    res = list()
+    for banner in BANNERS:
+        icr = icr_class(conf, r"^banner\s+{}\s+\^C$$".format(banner))
+        res.append(icr.extract_section() if icr_class is LegacyStorageIosConfigRegexp else icr.extract_view())
+    for regexp, prefix_str in ((DELETE_SECTION_REGEX, ''), (ports, r'interface\s+')):
+        icr = icr_class(conf, regexp, False, prefix_str)
+        conf = icr.remove_section() if icr_class is LegacyStorageIosConfigRegexp else icr.remove_view()
+        res.append(conf)
+    return res
+
+
+def memory_child(variant: str, filename: str, ports: list):
+    ''' run in a separate process, prints the peak RSS increase in KiB '''
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if variant == 'legacy':
+        with open(filename) as f:
+            res = host_run(LegacyStorageIosConfigRegexp, f.read(), ports)
+    else:
+        res = host_run(IosConfigRegexp, ConfigLines.from_file(filename), ports)
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(rss_peak - rss_start, len(res[-1]))
+
+
+def memory_benchmark(lines: int):
+    members = 9
+    ports = max(1, (lines - 600) // (6 * members))
+    conf = gen_stack_config(members, ports)
+    ports = ["GigabitEthernet{}/0/{}".format(m, p) for m in range(1, members + 1) for p in range(1, 3)]
+    with tempfile.NamedTemporaryFile('w', suffix='.ios', delete=False) as f:
+        f.write("\n".join(conf) + "\n")
+    print("config lines: {}  bytes: {}".format(len(conf), os.path.getsize(f.name)))
+    try:
+        out = dict()
+        for variant in ('legacy', 'current'):
+            res = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--memory-child', variant, f.name],
+                stdout=subprocess.PIPE, check=True, universal_newlines=True)
+            out[variant] = res.stdout.split()
+            print("{:7} peak RSS increase: {:8} KiB  (unmanaged lines: {})".format(
+                variant, out[variant][0], out[variant][1]))
+        if out['legacy'][1] != out['current'][1]:
+            raise SystemExit("ERROR: results differ")
+    finally:
+        os.unlink(f.name)
+
+
+def gen_stack_config(members: int, ports: int) -> list:
+    ''' simple running-config of a switch stack with access ports '''
+    conf = ["Building configuration...", "", "Current configuration : 123456 bytes", "!"]
+    for vlan in range(1, 200):
+        conf += ["vlan {}".format(vlan), " name VLAN_{}".format(vlan), "!"]
+    for member in range(1, members + 1):
+        for port in range(1, ports + 1):
+            conf += [
+                "interface GigabitEthernet{}/0/{}".format(member, port),
+                " switchport access vlan 10",
+                " switchport mode access",
+                " switchport voice vlan 40",
+                " spanning-tree portfast",
+                "!",
+            ]
+    conf += ["banner motd ^C", "! motd", "^C", "end"]
+    return conf
+
+
+PORTS_PER_MEMBER = 48
+
+# config size grid: name -> (interfaces, vlans, acls)
+SUITE_SIZES = (
+    ('small', 48, 50, 2),
+    ('medium', 192, 1000, 8),
+    ('large', 500, 4000, 16),
+)
+# pattern count grid
+SUITE_PATTERNS = (1, 10, 100, 500)
+
+
+def gen_interface_names(interfaces: int) -> list:
+    ''' names of the access ports of a stack, PORTS_PER_MEMBER per member '''
+    return ["GigabitEthernet{}/0/{}".format(i // PORTS_PER_MEMBER + 1, i % PORTS_PER_MEMBER + 1)
+            for i in range(interfaces)]
+
+
+def gen_ios_config(interfaces: int = 48, vlans: int = 100, acls: int = 4, acl_entries: int = 20) -> list:
+    '''
+    Synthetic running-config of a switch stack.
+
+    Contains the 'Building configuration'/'Current configuration' header,
+    vlans blocks, access, voice and trunk ports (PORTS_PER_MEMBER per stack
+    member) with uplinks, extended ACLs, the emergency-access ACL,
+    multi-line banners terminated with '^C' and chr(3) and line sections.
+    The result only depends on the parameters.
+    '''
+    members = max(1, (interfaces + PORTS_PER_MEMBER - 1) // PORTS_PER_MEMBER)
+    conf = [
+        "Building configuration...", "",
+        "Current configuration : {} bytes".format(1000 + 180 * interfaces + 30 * vlans),
+        "!", "! Last configuration change at 10:00:00 CET Mon Jan 7 2019", "!",
+        "version 15.2", "service timestamps debug datetime msec", "service password-encryption",
+        "!", "hostname SW01", "!", "boot-start-marker", "boot-end-marker", "!",
+        "aaa new-model", "aaa authentication login default group radius local", "!",
+        "switch 1 provision ws-c2960x-48fpd-l", "!",
+        "spanning-tree mode rapid-pvst", "spanning-tree extend system-id", "!",
+    ]
+    for vlan in range(1, vlans + 1):
+        conf += ["vlan {}".format(vlan), " name VLAN_{:04}".format(vlan), "!"]
+    for i, intf in enumerate(gen_interface_names(interfaces)):
+        conf.append("interface " + intf)
+        kind = i % 8
+        if kind == 7:
+            conf += [" description AP-{:04}".format(i), " switchport trunk native vlan 99",
+                     " switchport mode trunk"]
+        elif kind == 6:
+            conf += [" shutdown"]
+        else:
+            conf += [" description Client-{:04}".format(i), " switchport access vlan {}".format(i % vlans + 1),
+                     " switchport mode access"]
+            if kind < 3:
+                conf.append(" switchport voice vlan {}".format(vlans))
+            conf += [" authentication priority dot1x mab", " spanning-tree portfast"]
+        conf.append("!")
+    for member in range(1, members + 1):
+        for port in range(1, 5):
+            conf += ["interface TenGigabitEthernet{}/1/{}".format(member, port),
+                     " switchport mode trunk", " channel-group 1 mode active", "!"]
+    conf += ["interface Port-channel1", " description Uplink", " switchport mode trunk", "!",
+             "interface Vlan1", " no ip address", " shutdown", "!",
+             "interface Vlan{}".format(vlans), " ip address 10.0.0.10 255.255.255.0", "!"]
+    for acl in range(1, acls + 1):
+        conf.append("ip access-list extended ACL_{:03}".format(acl))
+        for entry in range(1, acl_entries + 1):
+            conf.append(" permit tcp 10.{}.{}.0 0.0.0.255 any eq {}".format(acl, entry, 1000 + entry))
+        conf += [" deny   ip any any log", "!"]
+    conf += ["ip access-list standard emergency-access", " permit 10.0.0.1", "!",
+             "banner exec ^C", "! exec banner", "! line two", "Welcome^C",
+             "banner login ^C", "! login banner", "! authorized access only", "\x03",
+             "banner motd ^C", "! -------------------------", "!   Hostname   : SW01", "!", "^C",
+             "!", "line con 0", " logging synchronous", "line vty 0 4", " transport input ssh",
+             "line vty 5 15", " transport input ssh", "!", "end"]
+    return conf
+
+
+def suite_patterns(kind: str, count: int, interfaces: list) -> list:
+    ''' count interface patterns, literal names or regular expressions '''
+    names = interfaces[:count]
+    if kind == 'literal':
+        return names
+    return [name.replace('GigabitEthernet', r'Gi\w*') for name in names]
+
+
+def run_suite(repeat: int = 3, sizes=SUITE_SIZES, patterns=SUITE_PATTERNS) -> dict:
+    ''' timings (min of repeat, seconds) of all grid cases, case name -> seconds '''
+    res = dict()
+
+    def timed(name, func, number=1):
+        res[name] = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+        print("{:40} {:10.6f} s".format(name, res[name]))
+
+    for size, interfaces, vlans, acls in sizes:
+        conf = ConfigLines.from_lines(gen_ios_config(interfaces, vlans, acls))
+        names = gen_interface_names(interfaces)
+        print("--- {}: {} lines, {} interfaces, {} vlans".format(size, len(conf), interfaces, vlans))
+        timed('{}/index'.format(size), lambda: _SectionIndex(conf))
+        timed('{}/interfaces'.format(size), lambda: IosConfigInterfaces(conf).records())
+        timed('{}/remove_delete_section_regex'.format(size),
+              lambda: IosConfigRegexp(conf, DELETE_SECTION_REGEX).remove_section())
+        for banner in ('exec', 'login', 'motd'):
+            timed('{}/extract_banner_{}'.format(size, banner),
+                  lambda: IosConfigRegexp(conf, r"^banner\s+{}\s+\^C$$".format(banner)).extract_section(), 10)
+        for count in patterns:
+            if count > interfaces:
+                continue
+            for kind in ('literal', 'regexp'):
+                regexp = suite_patterns(kind, count, names)
+                timed('{}/extract_{}_{}'.format(size, kind, count),
+                      lambda: IosConfigRegexp(conf, regexp, False, r'interface\s+').extract_section())
+                timed('{}/remove_{}_{}'.format(size, kind, count),
+                      lambda: IosConfigRegexp(conf, regexp, False, r'interface\s+').remove_section())
+    return res
+
+
+def save_baseline(filename: str, timings: dict):
+    data = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timings': timings,
+    }
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print("baseline saved: {}".format(filename))
+
+
+def check_baseline(filename: str, timings: dict, threshold: float, min_delta: float = 0.0005) -> list:
+    '''
+    Compares timings with the baseline in filename. Returns the regressions
+    (case, baseline, current) of cases slower than baseline * (1 + threshold)
+    and at least min_delta seconds.
+    '''
+    with open(filename) as f:
+        baseline = json.load(f)['timings']
+    res = list()
+    for name, base in sorted(baseline.items()):
+        current = timings.get(name)
+        if current is None:
+            continue
+        if current > base * (1 + threshold) and current - base >= min_delta:
+            res.append((name, base, current))
+    return res
+
+
+def parallel_benchmark(workers: int, acls: int, repeat: int):
+    conf = ConfigLines.from_lines(gen_ios_config(500, 4000, acls, 200))
+    regexp = suite_patterns('regexp', 100, gen_interface_names(500)) + [r"ip\s+access-list\s+extended\s+ACL_0\d+"]
+    print("config lines: {}  patterns: {}  workers: {}".format(len(conf), len(regexp), workers))
+    for operation in ('extract', 'remove'):
+        serial = getattr(IosConfigRegexp(conf, regexp), operation + '_section')
+        parallel = getattr(IosConfigRegexp(conf, regexp), operation + '_parallel')
+        if serial() != parallel(workers, 0):
+            raise SystemExit("ERROR: results differ")
+        t_serial = min(timeit.repeat(serial, number=1, repeat=repeat))
+        t_parallel = min(timeit.repeat(lambda: parallel(workers, 0), number=1, repeat=repeat))
+        print("{:7} serial: {:9.4f} s  parallel: {:9.4f} s  speedup: {:.1f}x".format(
+            operation, t_serial, t_parallel, t_serial / t_parallel))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IosConfigRegexp benchmark')
+    parser.add_argument('--members', type=int, default=9, help='stack members')
+    parser.add_argument('--ports', type=int, default=48, help='ports per member')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repetitions')
+    parser.add_argument('--memory', action='store_true', help='peak RSS benchmark')
+    parser.add_argument('--lines', type=int, default=50000, help='config lines of the peak RSS benchmark')
+    parser.add_argument('--suite', action='store_true', help='grid benchmark of sizes and pattern counts')
+    parser.add_argument('--save-baseline', metavar='FILE', help='save the suite timings as baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the suite timings with a baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--parallel', type=int, metavar='WORKERS', help='serial against parallel benchmark')
+    parser.add_argument('--acls', type=int, default=400, help='ACLs of the parallel benchmark')
+    parser.add_argument('--memory-child', nargs=2, metavar=('VARIANT', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child:
+        ports = ["GigabitEthernet{}/0/{}".format(m, p) for m in range(1, 10) for p in range(1, 3)]
+        memory_child(args.memory_child[0], args.memory_child[1], ports)
+        return
+    if args.memory:
+        memory_benchmark(args.lines)
+        return
+    if args.parallel:
+        parallel_benchmark(args.parallel, args.acls, args.repeat)
+        return
+    if args.suite:
+        timings = run_suite(args.repeat)
+        if args.save_baseline:
+            save_baseline(args.save_baseline, timings)
+        if args.baseline:
+            regressions = check_baseline(args.baseline, timings, args.threshold)
+            for name, base, current in regressions:
+                print("REGRESSION {:40} {:10.6f} s -> {:10.6f} s ({:+.0%})".format(
+                    name, base, current, current / base - 1))
+            if regressions:
+                raise SystemExit(1)
+            print("no regressions against {} (threshold {:.0%})".format(args.baseline, args.threshold))
+        return
+
+    conf = gen_stack_config(args.members, args.ports)
+    ports = ["GigabitEthernet{}/0/{}".format(m, p)
+             for m in range(1, args.members + 1) for p in range(1, args.ports + 1)]
+    print("config lines: {}  managed ports: {}".format(len(conf), len(ports)))
+
+    legacy = LegacyIosConfigRegexp(conf, ports, False, r'interface\s+')
+    current = IosConfigRegexp(conf, ports, False, r'interface\s+')
+    if legacy.remove_section() != current.remove_section():
+        raise SystemExit("ERROR: results differ")
+
+    t_legacy = min(timeit.repeat(legacy.remove_section, number=1, repeat=args.repeat))
+    t_current = min(timeit.repeat(current.remove_section, number=1, repeat=args.repeat))
+    print("legacy  remove_section: {:9.4f} s".format(t_legacy))
+    print("current remove_section: {:9.4f} s".format(t_current))
+    print("speedup: {:.1f}x".format(t_legacy / t_current))
+
+    # repeated calls on the same configuration reuse the cached section index
+    def extract_two_ports(icr_class):
+        return icr_class(conf, ports[:2] + [r"^banner\s+motd\s+\^C$$"], False, r'interface\s+').extract_section()
+    if extract_two_ports(LegacyIosConfigRegexp) != extract_two_ports(IosConfigRegexp):
+        raise SystemExit("ERROR: results differ")
+    t_legacy = min(timeit.repeat(lambda: extract_two_ports(LegacyIosConfigRegexp), number=10, repeat=args.repeat)) / 10
+    t_extract = min(timeit.repeat(lambda: extract_two_ports(IosConfigRegexp), number=10, repeat=args.repeat)) / 10
+    print("legacy  extract_section 2 ports: {:9.4f} s".format(t_legacy))
+    print("current extract_section 2 ports (cached index): {:9.4f} s".format(t_extract))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import re
+import mmap
+from array import array
+from collections.abc import Sequence
+
+
+# line boundaries of str.splitlines() and bytes.splitlines()
+_STR_EOL = re.compile('\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+_BYTES_EOL = re.compile(b'\r\n|[\r\n]')
+
+
+class ConfigLines(Sequence):
+    '''
+    Immutable, compact list of configuration lines.
+
+    The lines are kept in one text (str) or bytes buffer (bytes, mmap)
+    together with two array tables of line start and end offsets. A line
+    is only created as str object when it is accessed. Slices are views
+    sharing the buffer and the offset tables, so no line is copied.
+
+    Lines of a bytes buffer are decoded with ENCODING/ERRORS. Lines that
+    are not part of the buffer (e.g. the converted banner lines of
+    IosConfigRegexp.extract_view) are kept in the dict extra.
+
+    The line boundaries are the same as of str.splitlines(), so
+    ConfigLines(text) == text.splitlines().
+
+    Methods
+    -------
+
+    from_file(filename, use_mmap=True) -> ConfigLines
+        lines of a file, the file is mapped into memory if use_mmap is set.
+    from_lines(lines) -> ConfigLines
+        compact copy of a list of lines.
+    tolist(self) -> list
+        the lines as list of strings
+    '''
+    ENCODING = 'utf-8'
+    ERRORS = 'surrogateescape'
+
+    def __init__(self, text='', starts=None, ends=None, extra=None):
+        if starts is None:
+            starts, ends = self._offsets(text)
+        self._buf = text
+        self._decode = not isinstance(text, str)
+        self._starts = memoryview(starts)
+        self._ends = memoryview(ends)
+        # index -> str for lines not contained in the buffer
+        self._extra = extra if extra else dict()
+
+    @staticmethod
+    def _offsets(text):
+        ''' start and end offsets of all lines in text '''
+        starts = array('q')
+        ends = array('q')
+        eol = _STR_EOL if isinstance(text, str) else _BYTES_EOL
+        pos = 0
+        for m in eol.finditer(text):
+            starts.append(pos)
+            ends.append(m.start())
+            pos = m.end()
+        if pos < len(text):
+            starts.append(pos)
+            ends.append(len(text))
+        return starts, ends
+
+    @classmethod
+    def from_file(cls, filename: str, use_mmap: bool = True):
+        ''' Lines of filename, memory mapped if use_mmap is True '''
+        with open(filename, 'rb') as f:
+            if use_mmap:
+                try:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # an empty file can not be mapped
+                    buf = b''
+            else:
+                buf = f.read()
+        return cls(buf)
+
+    @classmethod
+    def from_lines(cls, lines):
+        ''' Compact copy of lines (lines may contain line breaks) '''
+        if isinstance(lines, cls):
+            return lines
+        starts = array('q')
+        ends = array('q')
+        pos = 0
+        for li in lines:
+            starts.append(pos)
+            pos += len(li)
+            ends.append(pos)
+            pos += 1
+        return cls('\n'.join(lines), starts, ends)
+
+    def _line(self, start: int, end: int) -> str:
+        if self._decode:
+            return self._buf[start:end].decode(self.ENCODING, self.ERRORS)
+        return self._buf[start:end]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            stop = max(start, stop)
+            extra = dict((j - start, li) for j, li in self._extra.items() if start <= j < stop)
+            return ConfigLines(self._buf, self._starts[start:stop], self._ends[start:stop], extra)
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError('ConfigLines index out of range')
+        if i in self._extra:
+            return self._extra[i]
+        return self._line(self._starts[i], self._ends[i])
+
+    def __iter__(self):
+        extra = self._extra
+        for i, (start, end) in enumerate(zip(self._starts, self._ends)):
+            if extra and i in extra:
+                yield extra[i]
+            else:
+                yield self._line(start, end)
+
+    def __eq__(self, other):
+        if not isinstance(other, (Sequence, ConfigLines)) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        res = self.__eq__(other)
+        return res if res is NotImplemented else not res
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ConfigLines({} lines)'.format(len(self))
+
+    def tolist(self) -> list:
+        return list(self)
+
+
+class ConfigLinesBuilder:
+    '''
+    Collects lines for a new ConfigLines sharing the buffer of base.
+
+    extend() with a slice of base only copies the offsets, append() adds
+    a line that is not part of the buffer.
+    '''
+    def __init__(self, base: ConfigLines):
+        self._base = base
+        self._starts = array('q')
+        self._ends = array('q')
+        self._extra = dict()
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def append(self, line: str):
+        self._extra[len(self._starts)] = line
+        self._starts.append(0)
+        self._ends.append(0)
+
+    def extend(self, lines):
+        if isinstance(lines, ConfigLines) and lines._buf is self._base._buf:
+            n = len(self._starts)
+            self._starts.frombytes(lines._starts.cast('B'))
+            self._ends.frombytes(lines._ends.cast('B'))
+            for j, li in lines._extra.items():
+                self._extra[n + j] = li
+        else:
+            for li in lines:
+                self.append(li)
+
+    def build(self) -> ConfigLines:
+        return ConfigLines(self._base._buf, self._starts, self._ends, self._extra)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import hashlib
+import tempfile
+
+
+class IosConfigAssembler:
+    '''
+    Assembles configuration fragments in memory.
+
+    The result is the same as writing every fragment to
+    <host_tmpdir>/<host>_<key>.<network_os> and running the ansible module
+    assemble on host_tmpdir: the fragments are ordered by key + '.' +
+    network_os and a newline is put between two fragments if the previous
+    fragment did not end with a newline.
+
+    Attributes
+    ----------
+
+    fragments: dict
+        key (e.g. '0001_unmanaged_configuration') -> content
+            str, bytes: content as written by the template module
+            list:       lines as written by the ios_config_section filters
+                        (line + os.linesep), an empty list is skipped
+            None:       skipped
+    network_os: str
+        extension of the fragment files
+
+    Methods
+    -------
+
+    ordered(self) -> list
+        (key, bytes) of all fragments in assemble order.
+    content(self) -> bytes
+        the assembled configuration.
+    write(self, dest, check_mode=False) -> dict
+        writes the assembled configuration if it differs from dest.
+    dump(self, dump_dir, prefix='') -> list
+        writes every fragment to dump_dir/<prefix><key>.<network_os>.
+    '''
+    ENCODING = 'utf-8'
+
+    def __init__(self, fragments=None, network_os='ios'):
+        self.fragments = fragments
+        self.network_os = network_os
+
+    @property
+    def fragments(self) -> dict:
+        return self.__fragments
+
+    @fragments.setter
+    def fragments(self, value):
+        if value == None:
+            value = dict()
+        if not isinstance(value, dict):
+            raise ValueError("IosConfigAssembler.fragments must be a dictionary!")
+        self.__fragments = value
+
+    def _encode(self, content):
+        ''' content of a fragment file, None if no file would be written '''
+        if content is None:
+            return None
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, str):
+            return content.encode(self.ENCODING)
+        if len(content) == 0:
+            return None
+        return ''.join(l + os.linesep for l in content).encode(self.ENCODING)
+
+    def ordered(self) -> list:
+        res = list()
+        for key in sorted(self.fragments, key=lambda k: '{}.{}'.format(k, self.network_os)):
+            data = self._encode(self.fragments[key])
+            if data is not None:
+                res.append((key, data))
+        return res
+
+    def content(self) -> bytes:
+        parts = list()
+        add_newline = False
+        for key, data in self.ordered():
+            # always put a newline between fragments if the previous
+            # fragment didn't end with a newline (like module assemble)
+            if add_newline:
+                parts.append(b'\n')
+            parts.append(data)
+            add_newline = not data.endswith(b'\n')
+        return b''.join(parts)
+
+    @staticmethod
+    def _file_digest(filename: str):
+        try:
+            with open(filename, 'rb') as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except (IOError, OSError):
+            return None
+
+    def write(self, dest: str, check_mode: bool = False) -> dict:
+        '''
+        Writes the assembled configuration to dest with a single write if
+        the content differs from the current content of dest. In check_mode
+        dest is only compared, not written.
+
+        Returns
+        -------
+
+        dict
+            changed:   True if dest was (or in check_mode would be) written
+            dest:      dest
+            checksum:  sha1 of the assembled configuration
+            fragments: keys of the assembled fragments in order
+        '''
+        data = self.content()
+        checksum = hashlib.sha1(data).hexdigest()
+        changed = self._file_digest(dest) != checksum
+        if changed and not check_mode:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest)), prefix='.assemble-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, dest)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        return {
+            'changed': changed,
+            'dest': dest,
+            'checksum': checksum,
+            'fragments': [key for key, data in self.ordered()],
+        }
+
+    def dump(self, dump_dir: str, prefix: str = '') -> list:
+        ''' Writes all fragments to dump_dir for debugging, returns the filenames '''
+        res = list()
+        for key, data in self.ordered():
+            filename = os.path.join(dump_dir, '{}{}.{}'.format(prefix, key, self.network_os))
+            with open(filename, 'wb') as f:
+                f.write(data)
+            res.append(filename)
+        return res
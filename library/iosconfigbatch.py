@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+'''
+Offline batch processing of saved running-configurations.
+
+Does the same as the partition step of inc_set_managed_configuration_ios.yml
+with src_config_filename for a whole directory of configurations without
+ansible: the banners are extracted, the managed sections and client ports are
+removed and the fragments are saved with the host_tmpdir naming scheme
+
+    <out-dir>/<host>/<host>_0001_unmanaged_configuration.<os>
+    <out-dir>/<host>/<host>_9000_banner_motd.<os>   (C6800 only)
+    <out-dir>/<host>/<host>_9001_banner_login.<os>
+    ...
+
+The hostname is the configuration filename without extension. The managed
+client ports (conf_client_ports, ports with port_type ptype_ignore are
+skipped) and config_group are read from the output of ansible-inventory,
+which includes group_vars and host_vars:
+
+    ansible-inventory -i inv_develop.yml --list > inventory.json
+    python3 iosconfigbatch.py --config-dir /home/backups/latest --inventory inventory.json [--workers 8]
+
+Without --inventory (or for a host missing in it) the variables are read from
+host_vars only and a host without config_group in host_vars fails, the
+config_group of its groups can't be determined. delete_section_regex is read
+from include/inc_set_managed_configuration_ios.yml. The hosts are processed by
+a pool of worker processes.
+'''
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from iosconfigpartition import IosConfigPartition
+from iosconfigregexp import MissingEndOfBannerError
+
+
+BASE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# rule-name, banner, filename part (see inc_set_managed_configuration_ios.yml)
+BANNERS = (
+    ('banner_motd', 'motd', '9000_banner_motd'),
+    ('banner_login', 'login', '9001_banner_login'),
+    ('banner_exec', 'exec', '9002_banner_exec'),
+    ('banner_incoming', 'incoming', '9003_banner_incoming'),
+    ('banner_slip_ppp', 'slip-ppp', '9003_banner_slip-ppp'),
+)
+
+
+def load_delete_section_regex(filename: str) -> list:
+    ''' delete_section_regex of the first set_fact task in filename '''
+    with open(filename) as f:
+        tasks = yaml.safe_load(f)
+    for task in tasks or []:
+        facts = task.get('set_fact') if isinstance(task, dict) else None
+        if isinstance(facts, dict) and 'delete_section_regex' in facts:
+            return facts['delete_section_regex']
+    raise ValueError("delete_section_regex not found in '{}'".format(filename))
+
+
+def load_host_vars(host_vars_dir: str, host: str) -> dict:
+    ''' variables of host_vars/<host>.yml and all yml-files in host_vars/<host>/ '''
+    res = dict()
+    files = glob.glob(os.path.join(host_vars_dir, host + '.y*ml'))
+    files += sorted(glob.glob(os.path.join(host_vars_dir, host, '*.y*ml')))
+    for filename in files:
+        with open(filename) as f:
+            data = yaml.safe_load(f)
+        if isinstance(data, dict):
+            res.update(data)
+    return res
+
+
+def load_inventory_vars(filename: str) -> dict:
+    ''' hostname -> variables of the output of 'ansible-inventory --list' '''
+    with open(filename) as f:
+        inventory = json.load(f)
+    return inventory.get('_meta', {}).get('hostvars', {})
+
+
+def managed_client_ports(conf_client_ports: dict) -> list:
+    ''' same as templates/gen_managed_client_interface_list.j2 '''
+    res = list()
+    for intf, definitions in (conf_client_ports or {}).items():
+        port_type = definitions[0].get('port_type') if definitions else None
+        if port_type != 'ptype_ignore':
+            res.append(intf)
+    return res
+
+
+def partition_rules(host: str, host_tmpdir: str, ports: list, delete_section_regex: list,
+                    config_group: str = 'NO_CONFIG_GROUP', network_os: str = 'ios') -> dict:
+    ''' partition rules of inc_set_managed_configuration_ios.yml for one host '''
+    rules = dict()
+    for name, banner, part in BANNERS:
+        filename = os.path.join(host_tmpdir, '{}_{}.{}'.format(host, part, network_os))
+        if name == 'banner_motd' and config_group not in ['C6800']:
+            # managed banner motd is generated
+            filename = ''
+        rules[name] = {
+            'action': 'extract',
+            'regexp': r'^banner\s+{}\s+\^C$$'.format(banner),
+            'filename': filename,
+        }
+    rules['managed_sections'] = {'action': 'remove', 'regexp': delete_section_regex}
+    rules['managed_client_ports'] = {'action': 'remove', 'regexp': ports, 'prefix_str': r'interface\s+'}
+    return rules
+
+
+def save_lines(filename: str, lines: list):
+    ''' Write lines to filename if filename != '' and lines is not empty '''
+    if filename != '' and len(lines) > 0:
+        with open(filename, 'w') as f:
+            for l in lines:
+                f.write(l + os.linesep)
+
+
+def process_host(job: dict) -> dict:
+    '''
+    Partitions the configuration of one host and saves the fragments.
+
+    Returns a dictionary with host, lines, seconds and error ('' on success).
+    '''
+    start = time.perf_counter()
+    res = {'host': job['host'], 'lines': 0, 'seconds': 0.0, 'error': ''}
+    try:
+        if job['config_group'] == None:
+            raise ValueError("config_group of '{}' is not defined in host_vars, use --inventory".format(job['host']))
+        with open(job['config_filename']) as f:
+            config = f.read()
+        rules = partition_rules(job['host'], job['host_tmpdir'], job['ports'], job['delete_section_regex'],
+                                job['config_group'], job['network_os'])
+        icp = IosConfigPartition(config, rules, 'unmanaged')
+        parts = icp.partition()
+        os.makedirs(job['host_tmpdir'], exist_ok=True)
+        for name, rule in rules.items():
+            if rule['action'] == 'extract':
+                save_lines(rule['filename'], parts[name])
+        save_lines(os.path.join(job['host_tmpdir'], '{}_0001_unmanaged_configuration.{}'.format(
+            job['host'], job['network_os'])), parts['unmanaged'])
+        res['lines'] = len(icp.conf_lines)
+    except MissingEndOfBannerError as e:
+        res['error'] = e.message
+    except (IOError, OSError, ValueError) as e:
+        res['error'] = str(e)
+    res['seconds'] = time.perf_counter() - start
+    return res
+
+
+def host_jobs(config_dir: str, host_vars_dir: str, out_dir: str, delete_section_regex: list,
+              network_os: str = 'ios', pattern: str = '*', inventory_vars: dict = None) -> list:
+    '''
+    one job per configuration file in config_dir, the variables of a host
+    are taken from inventory_vars (see load_inventory_vars()) or host_vars
+    '''
+    jobs = list()
+    for filename in sorted(glob.glob(os.path.join(config_dir, pattern))):
+        if not os.path.isfile(filename):
+            continue
+        host = os.path.splitext(os.path.basename(filename))[0]
+        if inventory_vars and host in inventory_vars:
+            host_vars = inventory_vars[host]
+        else:
+            host_vars = load_host_vars(host_vars_dir, host)
+        jobs.append({
+            'host': host,
+            'config_filename': filename,
+            'host_tmpdir': os.path.join(out_dir, host),
+            'ports': managed_client_ports(host_vars.get('conf_client_ports')),
+            'config_group': host_vars.get('config_group'),
+            'delete_section_regex': delete_section_regex,
+            'network_os': network_os,
+        })
+    return jobs
+
+
+def run_batch(jobs: list, workers: int = None):
+    ''' Yields the results of process_host() in the order of jobs '''
+    if workers == 1:
+        for job in jobs:
+            yield process_host(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for res in pool.map(process_host, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))):
+            yield res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline batch processing of saved ios running-configurations')
+    parser.add_argument('--config-dir', required=True, help='directory with the saved running-configurations')
+    parser.add_argument('--pattern', default='*', help='glob pattern of the configuration files (default: *)')
+    parser.add_argument('--inventory', help="output of 'ansible-inventory --list' (group_vars and host_vars)")
+    parser.add_argument('--host-vars-dir', default=os.path.join(BASE_DIR, 'host_vars'),
+                        help='host_vars directory of the hosts missing in --inventory')
+    parser.add_argument('--delete-section-regex', default=os.path.join(BASE_DIR, 'include', 'inc_set_managed_configuration_ios.yml'),
+                        help='yml-file with the delete_section_regex set_fact')
+    parser.add_argument('--out-dir', default=os.path.join(BASE_DIR, 'compiled'), help='base directory of host_tmpdir')
+    parser.add_argument('--network-os', default='ios', help='file extension (ansible_network_os)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: cpu count)')
+    args = parser.parse_args(argv)
+
+    delete_section_regex = load_delete_section_regex(args.delete_section_regex)
+    inventory_vars = load_inventory_vars(args.inventory) if args.inventory else None
+    jobs = host_jobs(args.config_dir, args.host_vars_dir, args.out_dir, delete_section_regex,
+                     args.network_os, args.pattern, inventory_vars)
+    start = time.perf_counter()
+    failed = 0
+    for res in run_batch(jobs, args.workers):
+        if res['error'] != '':
+            failed += 1
+            print("{:30} FAILED   {}".format(res['host'], res['error']))
+        else:
+            print("{:30} {:8} lines {:9.4f} s".format(res['host'], res['lines'], res['seconds']))
+    elapsed = time.perf_counter() - start
+    print("hosts: {}  failed: {}  total: {:.2f} s  ({:.1f} hosts/s)".format(
+        len(jobs), failed, elapsed, len(jobs) / elapsed if elapsed > 0 else 0.0))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
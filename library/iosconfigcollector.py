@@ -0,0 +1,435 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+'''
+Concurrent collector of running-configurations, facts and archive status.
+
+inc_set_managed_configuration_ios.yml opens a session per module (ios_facts,
+napalm_get_facts, ios_command) and the number of parallel hosts is limited by
+the ansible forks. The collector opens one CLI session per device and runs
+all show commands over it. All devices are handled by one asyncio event loop
+with a global concurrency limit and a timeout per device. The results are
+saved as
+
+    <out-dir>/<host>.cfg    running configuration (only if successful)
+    <out-dir>/<host>.json   ansible_net_* facts of the banner motd,
+                            collected_archive_enabled, collected_error and
+                            collected_seconds
+
+and read by the include with -e collected_dir=<out-dir>. The summary with
+the throughput in devices/s is saved to <out-dir>/collector_summary.json.
+
+The devices are read from the output of ansible-inventory:
+
+    ansible-inventory -i inv_develop.yml --list > inventory.json
+    IOS_COLLECTOR_PASSWORD=... python3 iosconfigcollector.py \\
+        --inventory inventory.json --out-dir ../compiled/collected --enable
+
+The ssh transport requires asyncssh. The host keys are checked against
+~/.ssh/known_hosts (--known-hosts), --no-host-key-check turns the check off.
+The tcp transport (plain CLI over tcp, no authentication) is used to test
+against a local CLI server.
+'''
+
+import argparse
+import asyncio
+import fnmatch
+import getpass
+import json
+import os
+import re
+import sys
+import time
+
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None
+
+
+# facts of ios_facts used by the banner motd templates
+COMMANDS = (
+    ('running', 'show running-config'),
+    ('version', 'show version'),
+    ('archive', 'show archive'),
+)
+SESSION_COMMANDS = ('terminal length 0', 'terminal width 511')
+PROMPT_REGEXP = re.compile(r'[\w.\-@/:()]+[>#]\s*$')
+PASSWORD_REGEXP = re.compile(r'[Pp]assword:\s*$')
+READ_SIZE = 64 * 1024
+SUMMARY_FILENAME = 'collector_summary.json'
+DEFAULT_KNOWN_HOSTS = '~/.ssh/known_hosts'
+
+
+DEFAULT_OPTIONS = {
+    'transport': 'ssh',
+    'port': 22,
+    'username': None,
+    'password': None,
+    'enable_secret': None,
+    'known_hosts': DEFAULT_KNOWN_HOSTS,
+    'host_key_check': True,
+    'concurrency': 50,
+    'timeout': 120,
+    'out_dir': '',
+}
+
+
+class CliError(Exception):
+    ''' Raised on unexpected output of the device '''
+    pass
+
+
+def parse_version(data: str) -> dict:
+    ''' ansible_net_* facts of 'show version' as set by ios_facts '''
+    facts = dict()
+    match = re.search(r'^(.+) uptime', data, re.M)
+    facts['ansible_net_hostname'] = match.group(1) if match else ''
+    match = re.search(r'Version (\S+?)(?:,\s|\s)', data)
+    facts['ansible_net_version'] = match.group(1) if match else ''
+    match = re.search(r'^[Cc]isco (.+) \(revision', data, re.M)
+    if match == None:
+        match = re.search(r'^[Cc]isco (\S+).+bytes of (?:.* )?memory', data, re.M)
+    facts['ansible_net_model'] = match.group(1).split()[0] if match else ''
+    match = re.search(r'board ID (\S+)', data)
+    facts['ansible_net_serialnum'] = match.group(1) if match else ''
+    models = re.findall(r'^[Mm]odel [Nn]umber\s+: (\S+)', data, re.M)
+    serialnums = re.findall(r'^[Ss]ystem [Ss]erial [Nn]umber\s+: (\S+)', data, re.M)
+    if models:
+        facts['ansible_net_stacked_models'] = models
+    if serialnums:
+        facts['ansible_net_stacked_serialnums'] = serialnums
+    return facts
+
+
+def archive_enabled(data: str) -> bool:
+    ''' same check as the assert of 'show archive' in the include '''
+    return data.find('not enabled') == -1
+
+
+class CliSession(object):
+    '''
+    Interactive CLI session over a (reader, writer) stream pair, e.g. of
+    asyncio.open_connection() (binary=True) or an asyncssh session.
+
+    Attributes
+    ----------
+    prompt : str
+        prompt of the device, detected by open()
+
+    Methods
+    -------
+    open(enable_secret=None)
+        Waits for the prompt, enters enable mode and disables paging
+    run(command)
+        Output of command without echo and prompt
+    close()
+        Logs out and closes the writer
+    abort()
+        Closes the writer
+    '''
+
+    def __init__(self, reader, writer, binary: bool = False):
+        self.__reader = reader
+        self.__writer = writer
+        self.__binary = binary
+        self.__prompt = ''
+
+    @property
+    def prompt(self) -> str:
+        return self.__prompt
+
+    async def _read_until(self, done) -> str:
+        ''' reads until done(buffer) is true '''
+        buffer = ''
+        while not done(buffer):
+            data = await self.__reader.read(READ_SIZE)
+            if not data:
+                raise CliError("Connection closed by device, received: '{}'".format(buffer[-80:]))
+            if isinstance(data, bytes):
+                data = data.decode('utf-8', 'replace')
+            buffer += data.replace('\r\n', '\n').replace('\r', '')
+        return buffer
+
+    def _last_line(self, buffer: str) -> str:
+        return buffer.rsplit('\n', 1)[-1]
+
+    async def _send(self, line: str):
+        data = line + '\n'
+        self.__writer.write(data.encode('utf-8') if self.__binary else data)
+        if hasattr(self.__writer, 'drain'):
+            await self.__writer.drain()
+
+    async def _detect_prompt(self):
+        buffer = await self._read_until(lambda b: PROMPT_REGEXP.match(self._last_line(b)) != None)
+        self.__prompt = self._last_line(buffer).strip()
+
+    async def open(self, enable_secret: str = None):
+        await self._detect_prompt()
+        if self.__prompt.endswith('>') and enable_secret != None:
+            await self._send('enable')
+            await self._read_until(lambda b: PASSWORD_REGEXP.search(b) != None)
+            await self._send(enable_secret)
+            await self._detect_prompt()
+            if not self.__prompt.endswith('#'):
+                raise CliError("enable failed, prompt: '{}'".format(self.__prompt))
+        for command in SESSION_COMMANDS:
+            await self.run(command)
+
+    async def run(self, command: str) -> str:
+        await self._send(command)
+        buffer = await self._read_until(
+            lambda b: '\n' in b and self._last_line(b).strip() == self.__prompt)
+        lines = buffer.split('\n')[:-1]
+        if lines and lines[0].strip().endswith(command):
+            # echo of the command
+            lines = lines[1:]
+        while lines and lines[-1].strip() == '':
+            lines.pop()
+        return '\n'.join(lines)
+
+    async def close(self):
+        try:
+            await self._send('exit')
+        except (IOError, OSError):
+            pass
+        self.abort()
+        if hasattr(self.__writer, 'wait_closed'):
+            try:
+                await self.__writer.wait_closed()
+            except (IOError, OSError):
+                pass
+
+    def abort(self):
+        self.__writer.close()
+
+
+async def open_tcp(device: dict, options: dict):
+    ''' (session, connection) of a plain CLI over tcp '''
+    reader, writer = await asyncio.open_connection(device['address'], device['port'] or options['port'])
+    return CliSession(reader, writer, binary=True), None
+
+
+def known_hosts(options: dict):
+    '''
+    known_hosts file of asyncssh.connect(), None (no host key check) only if
+    host_key_check is disabled explicitly
+    '''
+    if options.get('host_key_check', True) == False:
+        return None
+    filename = os.path.expanduser(options.get('known_hosts') or DEFAULT_KNOWN_HOSTS)
+    if not os.path.isfile(filename):
+        raise CliError("known_hosts file '{}' not found (disable the host key check with --no-host-key-check)".format(
+            filename))
+    return filename
+
+
+async def open_ssh(device: dict, options: dict):
+    ''' (session, connection) of an interactive ssh shell '''
+    if asyncssh == None:
+        raise CliError("transport ssh requires the python package asyncssh")
+    conn = await asyncssh.connect(
+        device['address'], port=device['port'] or options['port'],
+        username=options['username'], password=options['password'],
+        known_hosts=known_hosts(options))
+    writer, reader, stderr = await conn.open_session(term_type='vt100', encoding='utf-8')
+    return CliSession(reader, writer), conn
+
+
+TRANSPORTS = {
+    'ssh': open_ssh,
+    'tcp': open_tcp,
+}
+
+
+async def collect_device(device: dict, options: dict) -> dict:
+    ''' output of COMMANDS over one session '''
+    session, conn = await TRANSPORTS[options['transport']](device, options)
+    try:
+        await session.open(options.get('enable_secret'))
+        res = dict()
+        for key, command in COMMANDS:
+            res[key] = await session.run(command)
+        await session.close()
+        return res
+    finally:
+        # also on timeout (cancelled)
+        session.abort()
+        if conn != None:
+            conn.close()
+
+
+def save_result(out_dir: str, host: str, output: dict, res: dict):
+    ''' Writes <host>.cfg (if collected) and <host>.json '''
+    data = dict(res['facts'])
+    data.update({
+        'collected_archive_enabled': res['archive_enabled'],
+        'collected_error': res['error'],
+        'collected_seconds': round(res['seconds'], 6),
+    })
+    if output != None:
+        _write_file(os.path.join(out_dir, host + '.cfg'), output['running'] + '\n')
+    _write_file(os.path.join(out_dir, host + '.json'), json.dumps(data, indent=2, sort_keys=True) + '\n')
+
+
+def _write_file(filename: str, data: str):
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        f.write(data)
+    os.replace(tmp_filename, filename)
+
+
+async def collect_host(device: dict, options: dict, semaphore) -> dict:
+    '''
+    Collects one device within the concurrency limit and saves the result.
+
+    Returns a dictionary with host, facts, archive_enabled, seconds and
+    error ('' on success).
+    '''
+    res = {'host': device['host'], 'facts': dict(), 'archive_enabled': False, 'seconds': 0.0, 'error': ''}
+    async with semaphore:
+        start = time.perf_counter()
+        output = None
+        try:
+            output = await asyncio.wait_for(collect_device(device, options), options['timeout'])
+            res['facts'] = parse_version(output['version'])
+            res['archive_enabled'] = archive_enabled(output['archive'])
+        except asyncio.TimeoutError:
+            res['error'] = 'timeout after {} s'.format(options['timeout'])
+        except (CliError, IOError, OSError) as e:
+            res['error'] = str(e) or e.__class__.__name__
+        except Exception as e:
+            if asyncssh == None or not isinstance(e, asyncssh.Error):
+                raise
+            res['error'] = str(e)
+        res['seconds'] = time.perf_counter() - start
+    if options.get('out_dir'):
+        save_result(options['out_dir'], device['host'], output if res['error'] == '' else None, res)
+    return res
+
+
+async def collect_async(devices: list, options: dict, report=None) -> list:
+    ''' results of collect_host() in the order of devices '''
+    semaphore = asyncio.Semaphore(options['concurrency'])
+
+    async def run(device):
+        res = await collect_host(device, options, semaphore)
+        if report != None:
+            report(res)
+        return res
+    return await asyncio.gather(*[run(device) for device in devices])
+
+
+def collect(devices: list, options: dict, report=None) -> dict:
+    '''
+    Collects all devices and returns the summary (devices, failed, seconds,
+    devices_per_second and the results per host). report(res) is called as
+    soon as a device is finished.
+    '''
+    options = dict(DEFAULT_OPTIONS, **options)
+    if options.get('out_dir'):
+        os.makedirs(options['out_dir'], exist_ok=True)
+    start = time.perf_counter()
+    results = asyncio.run(collect_async(devices, options, report))
+    elapsed = time.perf_counter() - start
+    summary = {
+        'devices': len(devices),
+        'failed': sum(1 for res in results if res['error'] != ''),
+        'concurrency': options['concurrency'],
+        'seconds': round(elapsed, 6),
+        'devices_per_second': round(len(devices) / elapsed, 3) if elapsed > 0 else 0.0,
+        'results': [{key: res[key] for key in ('host', 'seconds', 'error')} for res in results],
+    }
+    if options.get('out_dir'):
+        _write_file(os.path.join(options['out_dir'], SUMMARY_FILENAME), json.dumps(summary, indent=2) + '\n')
+    return summary
+
+
+def load_inventory(filename: str, limit: str = '*') -> list:
+    '''
+    devices {host, address, port} of the output of 'ansible-inventory --list'.
+    The address is ansible_host (default the hostname), limit is a glob
+    pattern of the hostnames.
+    '''
+    with open(filename) as f:
+        inventory = json.load(f)
+    hostvars = inventory.get('_meta', {}).get('hostvars', {})
+    hosts = set(hostvars)
+    for name, group in inventory.items():
+        if name != '_meta' and isinstance(group, dict):
+            hosts.update(group.get('hosts', []))
+    devices = list()
+    for host in sorted(hosts):
+        if not fnmatch.fnmatch(host, limit):
+            continue
+        hvars = hostvars.get(host, {})
+        devices.append({'host': host, 'address': hvars.get('ansible_host', host),
+                        'port': hvars.get('ansible_port')})
+    return devices
+
+
+def parse_device(value: str) -> dict:
+    ''' device of NAME[=ADDRESS[:PORT]] '''
+    host, sep, address = value.partition('=')
+    port = None
+    if ':' in address:
+        address, port = address.rsplit(':', 1)
+        port = int(port)
+    return {'host': host, 'address': address or host, 'port': port}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent collector of ios running-configurations and facts')
+    parser.add_argument('--inventory', help="output of 'ansible-inventory --list'")
+    parser.add_argument('--limit', default='*', help='glob pattern of the hostnames (default: *)')
+    parser.add_argument('--host', action='append', default=[], metavar='NAME[=ADDRESS[:PORT]]',
+                        help='additional device')
+    parser.add_argument('--out-dir', required=True, help='directory of the collected files (collected_dir)')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='ssh', help='default: ssh')
+    parser.add_argument('--port', type=int, default=None, help='default: 22 (ssh), 23 (tcp)')
+    parser.add_argument('--username', default=os.environ.get('IOS_COLLECTOR_USERNAME', getpass.getuser()),
+                        help='default: IOS_COLLECTOR_USERNAME or the current user')
+    parser.add_argument('--enable', action='store_true',
+                        help='enter enable mode with IOS_COLLECTOR_ENABLE_SECRET (default: the password)')
+    parser.add_argument('--known-hosts', default=DEFAULT_KNOWN_HOSTS, help='known_hosts file (default: %(default)s)')
+    parser.add_argument('--no-host-key-check', action='store_true',
+                        help='do not check the ssh host keys (insecure, lab devices only)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_OPTIONS['concurrency'],
+                        help='devices collected in parallel (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_OPTIONS['timeout'],
+                        help='seconds per device (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    devices = load_inventory(args.inventory, args.limit) if args.inventory else list()
+    devices += [parse_device(value) for value in args.host]
+    password = os.environ.get('IOS_COLLECTOR_PASSWORD')
+    if password == None and args.transport == 'ssh':
+        password = getpass.getpass('Password: ')
+    options = {
+        'transport': args.transport,
+        'port': args.port or (22 if args.transport == 'ssh' else 23),
+        'username': args.username,
+        'password': password,
+        'enable_secret': os.environ.get('IOS_COLLECTOR_ENABLE_SECRET', password) if args.enable else None,
+        'known_hosts': args.known_hosts,
+        'host_key_check': not args.no_host_key_check,
+        'concurrency': args.concurrency,
+        'timeout': args.timeout,
+        'out_dir': args.out_dir,
+    }
+
+    def report(res):
+        if res['error'] != '':
+            print("{:30} FAILED   {}".format(res['host'], res['error']))
+        else:
+            print("{:30} {:9.4f} s".format(res['host'], res['seconds']))
+    summary = collect(devices, options, report)
+    print("devices: {}  failed: {}  total: {:.2f} s  ({:.1f} devices/s)".format(
+        summary['devices'], summary['failed'], summary['seconds'], summary['devices_per_second']))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
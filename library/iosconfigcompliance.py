@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import hashlib
+
+from iosconfigregexp import IosConfigRegexp
+
+
+class IosConfigFingerprint:
+    '''
+    Fingerprints of the top-level configuration-sections of an
+    ios-configuration.
+
+    A section is a top-level line with its indented lines (or a banner up to
+    its end-line, see IosConfigRegexp). Every section is hashed under its
+    header line. The sections selected by ignore_regexp (volatile header
+    lines like 'Building configuration...'), '!' comment lines (also
+    indented ones outside of banners) and empty lines are ignored. Banner
+    delimiters '^C' and chr(3) are treated as equal. The line order is
+    ignored for sections selected by unordered_regexp, as IOS sorts their
+    lines itself (interfaces).
+
+    Attributes
+    ----------
+
+    conf_lines: ConfigLines, tuple
+        contains the ios-configuration (see IosConfigRegexp.conf_lines).
+    ignore_regexp: list
+        regular expressions of ignored sections (IGNORE_REGEXP is added)
+    unordered_regexp: list
+        regular expressions of sections hashed independent of line order
+
+    Methods
+    -------
+
+    sections(self) -> dict
+        header line -> sha1 of the section.
+    compare(self, other) -> dict
+        compliance report of other against this configuration.
+    '''
+    IGNORE_REGEXP = [
+        r"^Building\s+configuration.*$",
+        r"^Current\s+configuration.*$",
+    ]
+    UNORDERED_REGEXP = [r"^interface\s+.*$"]
+
+    def __init__(self, config=None, ignore_regexp=None, unordered_regexp=None):
+        self.__icr = IosConfigRegexp(config)
+        self.ignore_regexp = ignore_regexp
+        self.unordered_regexp = self.UNORDERED_REGEXP if unordered_regexp == None else unordered_regexp
+
+    @property
+    def conf_lines(self):
+        return self.__icr.conf_lines
+
+    @conf_lines.setter
+    def conf_lines(self, value):
+        self.__icr.conf_lines = value
+
+    @property
+    def ignore_regexp(self) -> list:
+        return self.__ignore_regexp
+
+    @ignore_regexp.setter
+    def ignore_regexp(self, value):
+        if value == None:
+            value = list()
+        elif isinstance(value, str):
+            value = value.splitlines()
+        self.__ignore_regexp = self.IGNORE_REGEXP + list(value)
+
+    @staticmethod
+    def _normalize_banner_line(line: str) -> str:
+        ''' banner header or end-line with chr(3) as delimiter '''
+        if line[-2:] == '^C':
+            return line[:-2] + "\x03"
+        return line
+
+    def sections(self) -> dict:
+        '''
+        Returns the fingerprints of all top-level sections
+
+        Returns
+        -------
+
+        dict
+            header line -> sha1 hex digest of the section. Sections with the
+            same header line are hashed together in configuration order.
+        '''
+        lines = IosConfigRegexp(self.conf_lines, self.ignore_regexp).remove_view()
+        icr = IosConfigRegexp(lines, self.unordered_regexp)
+        unordered = icr.matcher.match
+        hashes = dict()
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            if line == '' or line[:1] == '!' or line[:1] == ' ':
+                i += 1
+                continue
+            if icr.is_banner(i):
+                end = icr.banner_end(i, 'fingerprint')
+                body = [self._normalize_banner_line(line)] + list(lines[i+1:end-1]) + \
+                    [self._normalize_banner_line(lines[end-1])]
+                key = body[0]
+            else:
+                end = icr.section_end(i)
+                body = [li for li in lines[i:end] if li.strip() != '!']
+                key = line
+                if unordered(line):
+                    body = [line] + sorted(body[1:])
+            h = hashes.get(key)
+            if h is None:
+                h = hashes[key] = hashlib.sha1()
+            for li in body:
+                h.update(li.encode('utf-8', 'surrogatepass'))
+                h.update(b'\n')
+            i = end
+        return dict((key, h.hexdigest()) for key, h in hashes.items())
+
+    def compare(self, other) -> dict:
+        '''
+        Compares the sections of other (an IosConfigFingerprint of e.g. the
+        generated configuration) against this configuration.
+
+        Returns
+        -------
+
+        dict
+            compliant: True if all section fingerprints are equal
+            changed:   headers of sections with different content
+            added:     headers of sections only in other
+            removed:   headers of sections only in this configuration
+        '''
+        mine = self.sections()
+        theirs = other.sections()
+        changed = [key for key in theirs if key in mine and mine[key] != theirs[key]]
+        added = [key for key in theirs if key not in mine]
+        removed = [key for key in mine if key not in theirs]
+        return {
+            'compliant': not (changed or added or removed),
+            'changed': changed,
+            'added': added,
+            'removed': removed,
+        }
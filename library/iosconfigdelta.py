@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import re
+
+from iosconfigregexp import IosConfigRegexp
+
+
+class _Node:
+    ''' configuration line with its sub-lines, body is the text of a banner '''
+    __slots__ = ('line', 'children', 'body')
+
+    def __init__(self, line: str, body=None):
+        self.line = line
+        self.children = dict()
+        self.body = body
+
+    def child(self, line: str):
+        node = self.children.get(line)
+        if node is None:
+            node = self.children[line] = _Node(line)
+        return node
+
+
+def _banner_key(line: str) -> str:
+    ''' banner header without the delimiter ('banner motd') '''
+    return line[:-2].rstrip() if line[-2:] == '^C' else line[:-1].rstrip()
+
+
+def _strip_delimiter(line: str) -> str:
+    if line[-2:] == '^C':
+        return line[:-2]
+    if line[-1:] == "\x03":
+        return line[:-1]
+    return line
+
+
+def _negate(line: str) -> str:
+    ''' the 'no' form of line (and the line of a 'no' form) '''
+    return line[3:] if line[:3] == 'no ' else 'no ' + line
+
+
+class IosConfigDelta:
+    '''
+    Minimal merge-mode change set from the running to the generated
+    ios-configuration.
+
+    Both configurations are parsed into trees of top-level sections (see
+    IosConfigRegexp) and their indented sub-lines. The sections selected by
+    ignore_regexp, comment lines and empty lines are ignored. The line order
+    of a section is ignored (IOS sorts them itself) except for the sections
+    selected by ordered_regexp (access-lists), which are replaced as a whole.
+
+    The delta is ordered so that a merge (copy to running-config) reaches
+    the generated configuration:
+
+    - removed top-level lines without sub-lines ('no ...'),
+    - new and changed sections in the order of the generated configuration,
+      changed sections as header and the changed sub-lines only ('no' forms
+      first), banners as 'banner <type> chr(3)', text, chr(3),
+    - removed sections in reverse order of the running configuration
+      ('no vlan 10' after the ports left the vlan, 'default interface' for
+      physical interfaces).
+
+    Attributes
+    ----------
+
+    running: _Node
+        tree of the running configuration
+    generated: _Node
+        tree of the generated configuration
+
+    Methods
+    -------
+
+    delta(self) -> list
+        the ordered ios commands (empty if the configurations are equal).
+    replay(self, delta) -> _Node
+        tree of the running configuration after merging delta.
+    verify(self, delta=None) -> dict
+        replays delta (default: delta()) and compares the result with the
+        generated configuration.
+    '''
+    IGNORE_REGEXP = [
+        r"^Building\s+configuration.*$",
+        r"^Current\s+configuration.*$",
+        r"^end$",
+    ]
+    ORDERED_REGEXP = [r"^ip(v6)?\s+access-list\s+.*$"]
+    # interfaces that can be deleted, all others are reset with 'default interface'
+    VIRTUAL_INTERFACE = re.compile(
+        r"^interface\s+(Vlan|Port-channel|Loopback|Tunnel|BDI|Dialer|Virtual-Template)", re.IGNORECASE)
+
+    def __init__(self, running=None, generated=None, ignore_regexp=None, ordered_regexp=None):
+        if ignore_regexp == None:
+            ignore_regexp = list()
+        elif isinstance(ignore_regexp, str):
+            ignore_regexp = ignore_regexp.splitlines()
+        self.ignore_regexp = self.IGNORE_REGEXP + list(ignore_regexp)
+        self.ordered = re.compile('|'.join(
+            '(?:{})'.format(e) for e in (self.ORDERED_REGEXP if ordered_regexp == None else ordered_regexp)) or '(?!)')
+        self.running = self.tree(running)
+        self.generated = self.tree(generated)
+
+    def tree(self, config) -> _Node:
+        ''' tree of the configuration config (str or list of lines) '''
+        lines = IosConfigRegexp(config, self.ignore_regexp).remove_view()
+        icr = IosConfigRegexp(lines)
+        root = _Node('')
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            if line.strip() == '' or line[:1] == '!' or line[:1] == ' ':
+                i += 1
+                continue
+            if icr.is_banner(i):
+                end = icr.banner_end(i, 'delta')
+                body = list(lines[i+1:end-1])
+                if _strip_delimiter(lines[end-1]) != '':
+                    body.append(_strip_delimiter(lines[end-1]))
+                root.children[_banner_key(line)] = _Node(_banner_key(line), tuple(body))
+                i = end
+                continue
+            end = icr.section_end(i)
+            stack = [(-1, root)]
+            for li in lines[i:end]:
+                text = li.strip()
+                if text == '' or text[:1] == '!':
+                    continue
+                indent = len(li) - len(li.lstrip(' '))
+                while stack[-1][0] >= indent:
+                    stack.pop()
+                stack.append((indent, stack[-1][1].child(text)))
+            i = end
+        return root
+
+    def _is_physical(self, node: _Node, depth: int) -> bool:
+        return depth == 0 and node.line[:10] == 'interface ' and not self.VIRTUAL_INTERFACE.match(node.line)
+
+    @staticmethod
+    def _section(node: _Node, depth: int, res: list):
+        ''' node and its sub-lines as configuration lines '''
+        if node.body is not None:
+            res.append(node.line + " \x03")
+            res.extend(node.body)
+            res.append("\x03")
+            return
+        res.append(' ' * depth + node.line)
+        for child in node.children.values():
+            IosConfigDelta._section(child, depth + 1, res)
+
+    def _remove(self, node: _Node, depth: int) -> str:
+        if self._is_physical(node, depth):
+            return 'default ' + node.line
+        return ' ' * depth + _negate(node.line)
+
+    def _diff(self, running: _Node, generated: _Node, depth: int, res: list):
+        removed = list()
+        for line, node in running.children.items():
+            if line in generated.children:
+                continue
+            if _negate(line) in generated.children and not node.children and node.body is None:
+                # the generated 'no' form (or line) replaces it
+                continue
+            if node.children or node.body is not None:
+                removed.append(self._remove(node, depth))
+            else:
+                res.append(self._remove(node, depth))
+        for line, node in generated.children.items():
+            old = running.children.get(line)
+            if old is None:
+                self._section(node, depth, res)
+            elif node.body is not None or old.body is not None:
+                if node.body != old.body:
+                    self._section(node, depth, res)
+            elif depth == 0 and self.ordered.match(line):
+                if list(self._lines(old)) != list(self._lines(node)):
+                    res.append(self._remove(old, depth))
+                    self._section(node, depth, res)
+            else:
+                changes = list()
+                self._diff(old, node, depth + 1, changes)
+                if changes:
+                    res.append(' ' * depth + line)
+                    res.extend(changes)
+        res.extend(reversed(removed))
+
+    @staticmethod
+    def _lines(node: _Node):
+        for child in node.children.values():
+            yield child.line
+            yield from IosConfigDelta._lines(child)
+
+    def delta(self) -> list:
+        '''
+        Returns the ios commands that change the running to the generated
+        configuration in merge mode, sub-lines indented by their depth.
+        '''
+        res = list()
+        self._diff(self.running, self.generated, 0, res)
+        return res
+
+    def replay(self, delta) -> _Node:
+        '''
+        Applies the commands delta (str or list) to a copy of the running
+        configuration like IOS does in merge mode: a line enters the
+        (sub-)section of its indentation, 'no <line>' removes the line (or
+        all lines starting with '<line> '), a line removes its 'no' form
+        and 'default interface' removes all sub-lines of an interface. A line
+        that replaces its 'no' form (or the reverse) is kept if the generated
+        configuration has it ('no shutdown' instead of 'shutdown').
+        '''
+        root = self._copy(self.running)
+        if isinstance(delta, str):
+            delta = delta.splitlines()
+        stack = [(-1, root, self.generated)]
+        i = 0
+        while i < len(delta):
+            li = delta[i]
+            i += 1
+            text = li.strip()
+            if text == '' or text[:1] == '!':
+                continue
+            indent = len(li) - len(li.lstrip(' '))
+            if indent == 0 and text[:7] == 'banner ' and text[-1:] == "\x03":
+                body = list()
+                while i < len(delta) and delta[i][-1:] != "\x03":
+                    body.append(delta[i])
+                    i += 1
+                if i == len(delta):
+                    raise ValueError("missing end of banner '{}'".format(text))
+                if _strip_delimiter(delta[i]) != '':
+                    body.append(_strip_delimiter(delta[i]))
+                i += 1
+                root.children[_banner_key(text)] = _Node(_banner_key(text), tuple(body))
+                stack = [(-1, root, self.generated)]
+                continue
+            while stack[-1][0] >= indent:
+                stack.pop()
+            parent, generated = stack[-1][1:]
+            generated = generated.children.get(text) if generated is not None else None
+            if indent == 0 and text[:18] == 'default interface ':
+                node = root.children.get(text[8:])
+                if node is not None:
+                    node.children = dict()
+                continue
+            if text[:3] == 'no ':
+                target = text[3:]
+                if target in parent.children:
+                    del parent.children[target]
+                    if generated is not None:
+                        parent.child(text)
+                else:
+                    prefixed = [k for k in parent.children if k.startswith(target + ' ')]
+                    for k in prefixed:
+                        del parent.children[k]
+                    if not prefixed:
+                        parent.child(text)
+                continue
+            if 'no ' + text in parent.children:
+                # back to the default, IOS does not show it
+                del parent.children['no ' + text]
+                if generated is not None:
+                    parent.child(text)
+                continue
+            stack.append((indent, parent.child(text), generated))
+        return root
+
+    @staticmethod
+    def _copy(node: _Node) -> _Node:
+        res = _Node(node.line, node.body)
+        for line, child in node.children.items():
+            res.children[line] = IosConfigDelta._copy(child)
+        return res
+
+    def _canonical(self, node: _Node, depth: int):
+        items = [(child.line, child.body, self._canonical(child, depth + 1))
+                 for child in node.children.values()
+                 if not (self._is_physical(child, depth) and not child.children)]
+        if depth == 1 and self.ordered.match(node.line):
+            return tuple(items)
+        return tuple(sorted(items, key=lambda item: (item[0], repr(item[1:]))))
+
+    def verify(self, delta=None) -> dict:
+        '''
+        Replays delta (default: delta()) against the running configuration.
+
+        Returns
+        -------
+
+        dict
+            verified:   True if the result equals the generated configuration
+            commands:   number of commands in delta
+            differences: top-level lines that differ after the replay
+        '''
+        if delta == None:
+            delta = self.delta()
+        elif isinstance(delta, str):
+            delta = delta.splitlines()
+        result = self.replay(delta)
+        mine = dict((line, self._canonical(_wrap(node), 0)) for line, node in result.children.items())
+        theirs = dict((line, self._canonical(_wrap(node), 0)) for line, node in self.generated.children.items())
+        # a physical interface without sub-lines equals a missing one
+        differences = [line for line in theirs if mine.get(line, ()) != theirs[line]] + \
+            [line for line in mine if line not in theirs and mine[line] != ()]
+        return {
+            'verified': not differences,
+            'commands': len(delta),
+            'differences': differences,
+        }
+
+
+def _wrap(node: _Node) -> _Node:
+    ''' root with node as the only top-level section '''
+    root = _Node('')
+    root.children[node.line] = node
+    return root
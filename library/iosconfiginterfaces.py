@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import re
+
+from iosconfigregexp import IosConfigRegexp
+
+
+class IosConfigInterfaces:
+    '''
+    Parses the interface-sections of an ios-configuration.
+
+    The records are the same as the result of parse_cli_textfsm with the
+    template templates/textfsm/cisco_ios_show_run_interface_part.template:
+    the first matching rule of the template assigns the values of a line,
+    a line '!' (and the end of the configuration) saves the record if
+    interface_name is set and clears all values.
+
+    Attributes
+    ----------
+
+    conf_lines: ConfigLines, tuple
+        contains the ios-configuration (see IosConfigRegexp.conf_lines).
+
+    Methods
+    -------
+
+    records(self) -> list
+        list of dicts, one per interface-section in configuration order.
+    interfaces(self) -> dict
+        interface_name -> record, the first record of every interface.
+    '''
+    FIELDS = (
+        'interface_name', 'auth_prio', 'description', 'flow_monitor', 'flow_monitor_mode',
+        'ip_address', 'ip_netmask', 'port_channel', 'port_channel_mode', 'port_mode',
+        'stp_mode', 'vlan_access', 'vlan_voice', 'power_inline',
+    )
+    # ^interface\s+${interface_name}$$ -> Continue
+    INTERFACE_RULE = re.compile(r'^interface\s+(?P<interface_name>\w+.+)$')
+    # remaining rules of the template in order, (fields, regexp)
+    RULES = (
+        (('port_channel',), r'interface\s+Port-channel(\d+)'),
+        (('port_mode',), r'\s+switchport\s+mode\s+(\w+)'),
+        (('description',), r'\s+description\s+(.+)'),
+        (('power_inline',), r'\s+power\s+inline\s+(\.+)'),
+        (('vlan_access',), r'\s+switchport\s+access\s+vlan\s+(\d+)'),
+        (('vlan_voice',), r'\s+switchport\s+voice\s+vlan\s+(\d+)'),
+        (('stp_mode',), r'\s+spanning-tree\s+(\.+)'),
+        (('port_channel', 'port_channel_mode'), r'\s+channel-group\s+(\d+)\s+mode\s+(\w+)'),
+        (('ip_address', 'ip_netmask'), r'\s+ip\s+address\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)'),
+        (('flow_monitor', 'flow_monitor_mode'), r'\s+ip\s+flow\s+monitor\s+(\w+)\s+(\w+)'),
+        (('auth_prio',), r'\s+authentication\s+priority\s+(.+)'),
+        ((), r'!'),
+    )
+    # all rules as one expression, the first matching alternative is the
+    # first matching rule. The alternative k is the named group 'r<k>'.
+    MATCHER = re.compile('|'.join(
+        '(?P<r{}>{}$)'.format(k, expr) for k, (fields, expr) in enumerate(RULES)))
+    RECORD_RULE = 'r{}'.format(len(RULES) - 1)
+
+    def __init__(self, config=None):
+        self.__icr = IosConfigRegexp(config)
+
+    @property
+    def conf_lines(self):
+        return self.__icr.conf_lines
+
+    @conf_lines.setter
+    def conf_lines(self, value):
+        self.__icr.conf_lines = value
+
+    def _save(self, values: dict, res: list):
+        if values['interface_name'] != '':
+            res.append(values)
+        return dict.fromkeys(self.FIELDS, '')
+
+    def records(self) -> list:
+        '''
+        Returns the interface records
+
+        Returns
+        -------
+
+        list
+            dicts with the keys FIELDS, empty values are ''.
+        '''
+        res = list()
+        values = dict.fromkeys(self.FIELDS, '')
+        rules = dict(('r{}'.format(k), fields) for k, (fields, expr) in enumerate(self.RULES))
+        interface_rule = self.INTERFACE_RULE.match
+        matcher = self.MATCHER.match
+        for line in self.conf_lines:
+            if line[:9] == 'interface':
+                m = interface_rule(line)
+                if m:
+                    values['interface_name'] = m.group('interface_name')
+            m = matcher(line)
+            if m is None:
+                continue
+            rule = m.lastgroup
+            if rule == self.RECORD_RULE:
+                values = self._save(values, res)
+                continue
+            start = m.re.groupindex[rule]
+            for i, field in enumerate(rules[rule]):
+                values[field] = m.group(start + 1 + i)
+        self._save(values, res)
+        return res
+
+    def interfaces(self) -> dict:
+        '''
+        Returns interface_name -> record
+
+        Returns
+        -------
+
+        dict
+            the first record (see records()) of every interface.
+        '''
+        res = dict()
+        for rec in self.records():
+            res.setdefault(rec['interface_name'], rec)
+        return res
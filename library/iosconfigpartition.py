@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from iosconfigregexp import IosConfigRegexp, _RemoveStage
+
+
+class IosConfigPartition:
+    '''
+    Split an ios-configuration into several parts in a single pass.
+
+    Every rule either extracts the selected configuration-sections into its
+    own part (like IosConfigRegexp.extract_section) or removes them from the
+    remaining configuration (like IosConfigRegexp.remove_section). Extract
+    rules work on the whole configuration independently of each other.
+    Remove rules are chained in the given order, so the remainder is the
+    same as calling remove_section for every rule one after another.
+
+    Attributes
+    ----------
+
+    conf_lines: list, str
+        contains the ios-configuration.
+    rules: dict
+        rule-name -> dict with the keys
+            action:     'extract' or 'remove'
+            regexp:     list or str, regular expressions (see IosConfigRegexp)
+            ignorecase: bool (optional, default False)
+            prefix_str: str (optional, default '')
+    remainder: str
+        name of the part that receives the remaining configuration
+
+    Methods
+    -------
+
+    partition(self) -> dict
+        returns rule-name -> extracted lines for all extract rules and
+        remainder -> configuration without the sections of all remove rules.
+    '''
+    ACTIONS = ('extract', 'remove')
+
+    def __init__(self, config=None, rules=None, remainder='unmanaged'):
+        self.__icr = IosConfigRegexp(config)
+        self.rules = rules
+        if remainder in self.rules:
+            raise ValueError("IosConfigPartition.remainder: '{}' is the name of a rule".format(remainder))
+        self.remainder = remainder
+
+    @property
+    def conf_lines(self) -> list:
+        return self.__icr.conf_lines
+
+    @conf_lines.setter
+    def conf_lines(self, value):
+        self.__icr.conf_lines = value
+
+    @property
+    def rules(self) -> dict:
+        return self.__rules
+
+    @rules.setter
+    def rules(self, value):
+        if value == None:
+            value = dict()
+        if not isinstance(value, dict):
+            raise ValueError("IosConfigPartition.rules must be a dictionary!")
+        for name, rule in value.items():
+            if not isinstance(rule, dict) or rule.get('action') not in self.ACTIONS:
+                raise ValueError(
+                    "IosConfigPartition.rules: '{}' needs action {}".format(name, ' or '.join(self.ACTIONS)))
+        self.__rules = value
+
+    def _matchers(self, action: str) -> list:
+        ''' list of (rule-name, compiled matcher) for the given action '''
+        res = list()
+        for name, rule in self.rules.items():
+            if rule['action'] == action:
+                icr = IosConfigRegexp(None, rule.get('regexp'),
+                                      rule.get('ignorecase', False), rule.get('prefix_str', ''))
+                res.append((name, icr.matcher.match))
+        return res
+
+    def partition(self) -> dict:
+        '''
+        Returns all parts of the configuration
+
+        Returns
+        -------
+
+        dict
+            rule-name -> list of extracted lines for every extract rule,
+            remainder -> list with the configuration without the sections
+            selected by all remove rules.
+        '''
+        icr = self.__icr
+        lines = icr.conf_lines
+        extractors = self._matchers('extract')
+        removers = [_RemoveStage(match) for name, match in self._matchers('remove')]
+
+        res = dict((name, list()) for name, match in extractors)
+        # index of the first line after the current section per extract rule
+        extract_until = dict((name, 0) for name, match in extractors)
+        prev_line = dict((name, '') for name, match in extractors)
+        remainder = list()
+
+        for i, line in enumerate(lines):
+            for name, match in extractors:
+                if extract_until[name] > i or not match(line):
+                    continue
+                part = res[name]
+                if icr.is_banner(i):
+                    end = icr.banner_end(i, 'extract_banner')
+                    # modify for napalm_install_config compatibility
+                    part.append(line[:-2] + "\x03")
+                    part.extend(lines[i+1:end-1])
+                    part.append("\x03")
+                else:
+                    end = icr.section_end(i)
+                    for li in lines[i:end]:
+                        if (prev_line[name] != '!' or li != '!'):
+                            part.append(li)
+                            prev_line[name] = li
+                extract_until[name] = end
+
+            for stage in removers:
+                line = stage.feed(line)
+                if line is None:
+                    break
+            else:
+                remainder.append(line)
+
+        for stage in removers:
+            stage.close()
+        res[self.remainder] = remainder
+        return res
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import json
+import hashlib
+import tempfile
+
+from resultcache import LruResultCache
+
+
+# variables of templates/ios/config_client_interface_profile.j2 per port
+# (name in the template, attribute of conf_client_ports)
+PROFILE_FIELDS = (
+    ('port_type', 'port_type'),
+    ('description', 'description'),
+    ('vlan_id', 'vlan_id'),
+    ('port_enabled', 'is_enabled'),
+)
+# variables of the profile template that are the same for all ports of a host
+PROFILE_VARIABLES = ('config_group', 'switchport_voice_vlan_id')
+
+
+def client_port_profiles(conf_client_ports: dict, switch_interfaces: dict = None) -> list:
+    '''
+    (interface, profile) of every port of conf_client_ports in order. The
+    profile holds the variables of the profile template as set by
+    config_client_interfaces.j2, switch_intf_data only if switch_interfaces
+    is given. Raises ValueError if a port has no definition or a field is
+    missing.
+    '''
+    res = list()
+    for intf, definitions in (conf_client_ports or {}).items():
+        if not definitions:
+            raise ValueError("no definition for client port {}".format(intf))
+        first = definitions[0]
+        try:
+            profile = dict((name, first[attr]) for name, attr in PROFILE_FIELDS)
+        except (KeyError, TypeError) as e:
+            raise ValueError("missing {} for client port {}".format(e, intf))
+        if switch_interfaces is not None:
+            data = switch_interfaces.get(intf) or {}
+            profile['switch_intf_data'] = {'vlan_voice': data['vlan_voice']} if 'vlan_voice' in data else {}
+        res.append((intf, profile))
+    return res
+
+
+def profile_key(prefix: str, profile: dict) -> str:
+    ''' sha1 of prefix (template and host variables) and profile '''
+    h = hashlib.sha1(prefix.encode('utf-8', 'surrogatepass'))
+    h.update(json.dumps(profile, sort_keys=True, default=repr).encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
+
+
+def template_key(source: str, variables: dict) -> str:
+    ''' key prefix of the profile template source and the PROFILE_VARIABLES '''
+    h = hashlib.sha1(source.encode('utf-8', 'surrogatepass'))
+    h.update(json.dumps([variables.get(name) for name in PROFILE_VARIABLES],
+                        default=repr).encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
+
+
+class ProfileBodyCache:
+    '''
+    Bounded cache of rendered profile bodies.
+
+    Bodies are kept in an LruResultCache of this process. If cache_dir is
+    given they are also stored as files <cache_dir>/<key>, so the hosts
+    rendered by other processes of the same run (ansible forks) reuse them.
+    The keys are content hashes, so a file is never stale. At most
+    max_entries files are kept, the least recently used are removed first.
+    The directory is only pruned after prune_interval new files of this
+    process (max_entries / 8), so it may briefly hold up to prune_interval
+    more files.
+
+    Methods
+    -------
+
+    get(self, key) -> str
+        cached body or None
+    put(self, key, body)
+    stats(self) -> dict
+        counters of the memory cache and the file hits
+    '''
+    def __init__(self, max_entries: int = 1024, cache_dir: str = ''):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.memory = LruResultCache(max_entries)
+        self.file_hits = 0
+        self.prune_interval = max(1, max_entries // 8)
+        # files written since the last prune
+        self.written = 0
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str):
+        res = self.memory.get(key)
+        if res is not None:
+            return res[0]
+        if self.cache_dir == '':
+            return None
+        try:
+            with open(self._filename(key), 'r', newline='') as f:
+                body = f.read()
+            os.utime(self._filename(key))
+        except (IOError, OSError):
+            return None
+        self.file_hits += 1
+        self.memory.put(key, [body])
+        return body
+
+    def put(self, key: str, body: str):
+        self.memory.put(key, [body])
+        if self.cache_dir == '':
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+            with os.fdopen(fd, 'w', newline='') as f:
+                f.write(body)
+            os.replace(tmp, self._filename(key))
+            self.written += 1
+            if self.written >= self.prune_interval:
+                self.written = 0
+                self._prune()
+        except (IOError, OSError):
+            # the file cache is optional
+            pass
+
+    def _prune(self):
+        with os.scandir(self.cache_dir) as it:
+            entries = [e for e in it if not e.name.startswith('.')]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(e.path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return dict(self.memory.stats(), file_hits=self.file_hits)
+
+
+def render_client_interfaces(profiles: list, render_body, prefix: str = '', cache: ProfileBodyCache = None) -> tuple:
+    '''
+    Output of config_client_interfaces.j2: 'interface <name>' and the body
+    of the port profile for all ports except ptype_ignore. render_body(profile)
+    is called once per distinct profile that is not cached.
+
+    Returns the configuration and the number of rendered bodies.
+    '''
+    bodies = dict()
+    parts = list()
+    rendered = 0
+    for intf, profile in profiles:
+        if profile['port_type'] == 'ptype_ignore':
+            continue
+        key = profile_key(prefix, profile)
+        body = bodies.get(key)
+        if body is None:
+            body = cache.get(key) if cache != None else None
+            if body is None:
+                body = render_body(profile)
+                rendered += 1
+                if cache != None:
+                    cache.put(key, body)
+            bodies[key] = body
+        parts.append('interface {}\n'.format(intf))
+        parts.append(body)
+    return ''.join(parts), rendered
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+from iosconfigregexp import IosConfigRegexp, _LineMatcher, config_digest
+
+
+# number of cached compiled queries
+QUERY_CACHE_SIZE = 256
+STEP_SEPARATOR = re.compile(r'\s+(>>?)\s+')
+# literal first word of a step ('interface GigabitEthernet.*' -> 'interface')
+FIRST_WORD = re.compile(r'^\^?([A-Za-z][A-Za-z0-9_-]*)(?: (?![*?{])|\\s(?:\+|(?![*?{])))')
+
+
+class IosConfigTree:
+    '''
+    Indentation tree of an ios-configuration, built in one pass.
+
+    Every line except empty lines and '!' comments is a node, its children
+    are the following lines with a deeper indentation. A banner is a
+    top-level node without children up to its end-line (see
+    IosConfigRegexp.banner_end()). The nodes are the line indices, the
+    parent of a top-level node is -1.
+
+    The tree is built once per configuration content and shared by all
+    queries (see get()).
+
+    Attributes
+    ----------
+
+    conf_lines: ConfigLines, tuple
+        the ios-configuration
+    parent: dict
+        node -> parent node
+    end: dict
+        node -> index of the first line after the node and its children,
+        for top-level nodes like IosConfigRegexp.section_end()
+    children: dict
+        node -> child nodes in configuration order (-1: top-level nodes)
+    text: dict
+        node -> line without indentation
+    '''
+    MAX_CACHED = 8
+    __cache = OrderedDict()
+    # str configurations, their hash is computed once per object
+    __texts = OrderedDict()
+
+    def __init__(self, lines):
+        icr = IosConfigRegexp(lines)
+        self.conf_lines = lines = icr.conf_lines
+        self.parent = dict()
+        self.end = dict()
+        self.children = {-1: list()}
+        self.text = dict()
+        self.__keys = dict()
+        stack = [(-1, -1)]
+        i = 0
+        while i < len(lines):
+            li = lines[i]
+            text = li.strip()
+            if text == '' or text[:1] == '!':
+                i += 1
+                continue
+            indent = len(li) - len(li.lstrip(' '))
+            while stack[-1][0] >= indent:
+                stack.pop()
+            parent = stack[-1][1]
+            self.parent[i] = parent
+            self.children[parent].append(i)
+            self.children[i] = list()
+            self.text[i] = text
+            self._add_keys(i, text)
+            if parent == -1 and icr.is_banner(i):
+                self.end[i] = icr.banner_end(i, 'query')
+                stack = [(-1, -1)]
+                i = self.end[i]
+                continue
+            self.end[i] = icr.section_end(i) if parent == -1 else i + 1
+            stack.append((indent, i))
+            i += 1
+        # spans of the nested nodes end after their last descendant
+        for node in sorted(self.parent, reverse=True):
+            parent = self.parent[node]
+            if parent != -1 and self.parent[parent] != -1 and self.end[node] > self.end[parent]:
+                self.end[parent] = self.end[node]
+
+    def _add_keys(self, i: int, text: str):
+        ''' keys of _LineMatcher.literal_keys() and the first word '''
+        keys = self.__keys
+        keys.setdefault(('L', text), list()).append(i)
+        parts = text.split(None, 1)
+        keys.setdefault(('W', parts[0]), list()).append(i)
+        if len(parts) == 2:
+            keys.setdefault(('H', parts[0], parts[1]), list()).append(i)
+
+    @classmethod
+    def get(cls, config):
+        ''' tree of config, reused if the same content was parsed before '''
+        if isinstance(config, str):
+            tree = cls.__texts.get(config)
+            if tree is not None:
+                cls.__texts.move_to_end(config)
+                return tree
+            tree = cls.__texts[config] = cls.get(IosConfigRegexp(config).conf_lines)
+            while len(cls.__texts) > cls.MAX_CACHED:
+                cls.__texts.popitem(last=False)
+            return tree
+        lines = IosConfigRegexp(config).conf_lines
+        digest = config_digest(lines)
+        tree = cls.__cache.get(digest)
+        if tree is None:
+            tree = cls(lines)
+            cls.__cache[digest] = tree
+            while len(cls.__cache) > cls.MAX_CACHED:
+                cls.__cache.popitem(last=False)
+        else:
+            cls.__cache.move_to_end(digest)
+        return tree
+
+    def lookup(self, keys: list) -> list:
+        ''' sorted nodes of the keys, see _add_keys() '''
+        res = set()
+        for key in keys:
+            res.update(self.__keys.get(key, ()))
+        return sorted(res)
+
+    def descendants(self, node: int):
+        ''' all nodes below node in configuration order '''
+        for child in self.children[node]:
+            yield child
+            yield from self.descendants(child)
+
+    def is_below(self, node: int, parents: set, direct: bool) -> bool:
+        ''' True if the parent (direct) or an ancestor of node is in parents '''
+        node = self.parent[node]
+        if direct:
+            return node in parents
+        while node != -1:
+            if node in parents:
+                return True
+            node = self.parent[node]
+        return -1 in parents
+
+
+class _Step:
+    ''' compiled step of a query: axis ('>' child, '>>' descendant) and pattern '''
+    __slots__ = ('axis', 'pattern', 'matcher', 'keys')
+
+    def __init__(self, axis: str, pattern: str, ignorecase: bool):
+        self.axis = axis
+        self.pattern = pattern
+        patterns = [pattern]
+        # allow using extracted banners ('^C' converted to chr(3))
+        pos = pattern.find(r"\^C")
+        if pos != -1:
+            patterns.append(pattern[:pos] + "\x03" + pattern[pos+3:])
+        self.matcher = _LineMatcher(patterns, '', re.IGNORECASE if ignorecase else 0)
+        self.keys = self.matcher.literal_keys()
+        if self.keys is None and not ignorecase and len(patterns) == 1 and '|' not in pattern:
+            m = FIRST_WORD.match(pattern)
+            if m:
+                self.keys = [('W', m.group(1))]
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _compile(query: str, ignorecase: bool) -> tuple:
+    parts = STEP_SEPARATOR.split(' ' + query.strip())
+    # a leading '>>' searches the whole tree
+    if parts[0] == '':
+        parts = parts[1:]
+    else:
+        parts = ['>'] + parts
+    steps = list()
+    for k in range(0, len(parts), 2):
+        step = parts[k+1].strip() if k + 1 < len(parts) else ''
+        # a separator without whitespace ends up in the step
+        if step == '' or step[:1] == '>' or step[-1:] == '>':
+            raise ValueError("IosConfigQuery: empty step in query '{}'".format(query))
+        steps.append(_Step(parts[k], step, ignorecase))
+    return tuple(steps)
+
+
+class IosConfigQuery:
+    '''
+    Path query over the indentation tree of an ios-configuration.
+
+    A query is a list of steps separated by ' > ' (child) or ' >> '
+    (descendant at any depth). Every step is a regular expression matched
+    against the whole line without indentation, like the regexplist of
+    IosConfigRegexp ('^' and '$' added, '\\^C' also matches chr(3)):
+
+        interface GigabitEthernet.* > switchport voice vlan \\d+
+        router bgp \\d+ > address-family .*
+        >> shutdown
+
+    A query is compiled once into its steps (cached). Literal steps and
+    steps with a literal first word are looked up in the index of the tree,
+    the other steps only scan the children of the previous matches. Any
+    number of queries on one configuration cost one parse (see
+    IosConfigTree.get()).
+
+    Attributes
+    ----------
+
+    query: str
+        the query
+    ignorecase: bool
+        case insensitive matching
+
+    Methods
+    -------
+
+    nodes(self, tree) -> list
+        the matching nodes (line indices) of an IosConfigTree.
+    matches(self, config, sections=False) -> list
+        dicts with line, start, end (line span, end exclusive), parents
+        (the lines of the ancestors) and the lines of the span if sections
+        is True.
+    '''
+    def __init__(self, query: str, ignorecase: bool = False):
+        if not isinstance(query, str) or query.strip() == '':
+            raise ValueError("IosConfigQuery: query must be a non empty string")
+        self.query = query
+        self.ignorecase = ignorecase
+        self.steps = _compile(query, bool(ignorecase))
+
+    @staticmethod
+    def _step(tree: IosConfigTree, step: _Step, parents: set) -> list:
+        text = tree.text
+        direct = step.axis == '>'
+        if step.keys is not None:
+            pool = [node for node in tree.lookup(step.keys) if tree.is_below(node, parents, direct)]
+        elif direct:
+            pool = [child for parent in sorted(parents) for child in tree.children[parent]]
+        else:
+            pool = sorted(set(node for parent in parents for node in tree.descendants(parent)))
+        match = step.matcher.match
+        return [node for node in pool if match(text[node])]
+
+    def nodes(self, tree: IosConfigTree) -> list:
+        res = [-1]
+        for step in self.steps:
+            res = self._step(tree, step, set(res))
+            if not res:
+                break
+        return sorted(res)
+
+    def matches(self, config, sections: bool = False) -> list:
+        tree = config if isinstance(config, IosConfigTree) else IosConfigTree.get(config)
+        lines = tree.conf_lines
+        res = list()
+        for node in self.nodes(tree):
+            parents = list()
+            p = tree.parent[node]
+            while p != -1:
+                parents.insert(0, lines[p])
+                p = tree.parent[p]
+            match = {'line': lines[node], 'start': node, 'end': tree.end[node], 'parents': parents}
+            if sections:
+                match['lines'] = list(lines[node:tree.end[node]])
+            res.append(match)
+        return res
@@ -2,8 +2,17 @@
 # Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import io
+import os
 import re
-import copy
+import time
+import hashlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from configlines import ConfigLines, ConfigLinesBuilder
 
 class MissingEndOfBannerError(Exception):
     def __init__(self, message):
@@ -11,6 +20,462 @@ class MissingEndOfBannerError(Exception):
         self.message = message
 
 
+def _is_ascii(s: str) -> bool:
+    try:
+        s.encode('ascii')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+class _LineMatcher:
+    '''
+    Precompiled matcher for a list of section-header regular expressions.
+
+    Every pattern is anchored the same way IosConfigRegexp always did
+    (prefix_str prepended, missing '^' and '$' added).
+
+    Patterns that are really literals (e.g. 'interface\\s+' + an interface
+    name) are normalized to (head, whitespace, tail) and looked up in a set,
+    so checking a line costs O(1) instead of O(patterns). Header lines are
+    split the same way: leading head, whitespace run, tail.
+
+    Other patterns that can be safely combined are compiled into a single
+    alternation, the remaining ones (capture groups, back-references or
+    global inline flags) are compiled one by one.
+    '''
+    # global inline flags are only allowed at the start of an expression
+    __global_flags = re.compile(r'\(\?[aiLmsux]+\)')
+    __meta_chars = frozenset('.^$*+?{}[]|()')
+
+    def __init__(self, regexplist: list, prefix_str: str, re_flags: int):
+        self.ignorecase = bool(re_flags & re.IGNORECASE)
+        # whole line literals
+        self.literal_lines = set()
+        # (head, min. whitespace count) -> set of tails
+        self.literal_heads = dict()
+        literals = list()
+        alternatives = list()
+        self.single = list()
+        for pat in regexplist:
+            expr = self.anchor(prefix_str + pat)
+            compiled = re.compile(expr, re_flags)
+            literal = self.split_literal(expr)
+            if literal is not None and (not self.ignorecase or _is_ascii(expr)):
+                head, min_ws, tail = literal
+                if self.ignorecase:
+                    head, tail = head.lower(), tail.lower()
+                if min_ws is None:
+                    self.literal_lines.add(head)
+                else:
+                    self.literal_heads.setdefault((head, min_ws), set()).add(tail)
+                literals.append(expr)
+            elif compiled.groups == 0 and not self.__global_flags.search(expr):
+                alternatives.append(expr)
+            else:
+                self.single.append(compiled)
+        self.has_literals = len(literals) > 0
+        # used for case insensitive matching of non-ascii lines only
+        self.literal_regexp = self.alternation(literals, re_flags)
+        self.combined = self.alternation(alternatives, re_flags)
+
+    @staticmethod
+    def alternation(exprs: list, re_flags: int):
+        if len(exprs) == 0:
+            return None
+        if len(exprs) == 1:
+            return re.compile(exprs[0], re_flags)
+        return re.compile('|'.join('(?:{})'.format(expr) for expr in exprs), re_flags)
+
+    @staticmethod
+    def anchor(expr: str) -> str:
+        ''' add missing line-start and line-end markers '''
+        if expr[0:1] != '^':
+            expr = '^' + expr
+        if expr[-1:] != '$':
+            expr = expr + '$'
+        return expr
+
+    @classmethod
+    def split_literal(cls, expr: str):
+        '''
+        Split an anchored expression into (head, min_ws, tail) if it only
+        consists of literal characters and at most one '\\s+' or '\\s*'.
+
+        min_ws is None for whole line literals (tail is '' then), 1 for
+        '\\s+' and 0 for '\\s*'. Returns None for real regular expressions.
+        '''
+        body = expr[1:]
+        # strip line-end markers, unless escaped
+        is_anchored = False
+        while body[-1:] == '$':
+            escapes = len(body) - 1 - len(body[:-1].rstrip('\\'))
+            if escapes % 2 == 1:
+                break
+            body = body[:-1]
+            is_anchored = True
+        if not is_anchored:
+            # an escaped '$' at the end is no line-end marker
+            return None
+        parts = ['']
+        min_ws = None
+        i = 0
+        while i < len(body):
+            c = body[i]
+            if c == '\\':
+                n = body[i+1:i+2]
+                if n == 's' and body[i+2:i+3] in ('+', '*') and min_ws is None:
+                    min_ws = 1 if body[i+2] == '+' else 0
+                    parts.append('')
+                    i += 3
+                    continue
+                if n == '' or (_is_ascii(n) and n.isalnum()):
+                    return None
+                parts[-1] += n
+                i += 2
+            elif c in cls.__meta_chars:
+                return None
+            else:
+                parts[-1] += c
+                i += 1
+        if any('\n' in part for part in parts):
+            return None
+        if min_ws is None:
+            return (parts[0], None, '')
+        tail = parts[1]
+        if tail == '' or tail[0].isspace():
+            return None
+        return (parts[0], min_ws, tail)
+
+    def literal_keys(self):
+        '''
+        Keys for _SectionIndex.lookup() if all patterns are case sensitive
+        literals of the form 'line' or 'head\\s+tail', else None.
+        '''
+        if self.ignorecase or self.combined is not None or len(self.single) > 0:
+            return None
+        keys = [('L', line) for line in self.literal_lines]
+        for (head, min_ws), tails in self.literal_heads.items():
+            if min_ws != 1 or head == '' or len(head.split()) != 1 or head.split()[0] != head:
+                return None
+            keys += [('H', head, tail) for tail in tails]
+        return keys
+
+    def match_literal(self, line: str) -> bool:
+        ''' lookup line in the literal pattern index '''
+        if self.ignorecase:
+            if not _is_ascii(line):
+                return self.literal_regexp.match(line) is not None
+            line = line.lower()
+        # '$' also matches in front of a trailing newline
+        if line[-1:] == '\n':
+            line = line[:-1]
+        if line in self.literal_lines:
+            return True
+        for (head, min_ws), tails in self.literal_heads.items():
+            if line.startswith(head):
+                rest = line[len(head):]
+                tail = rest.lstrip()
+                if len(rest) - len(tail) >= min_ws and tail in tails:
+                    return True
+        return False
+
+    def match(self, line: str) -> bool:
+        ''' True if any of the patterns matches the whole line '''
+        if self.has_literals and self.match_literal(line):
+            return True
+        if self.combined is not None and self.combined.match(line):
+            return True
+        for compiled in self.single:
+            if compiled.match(line):
+                return True
+        return False
+
+
+def _is_banner_line(line: str) -> bool:
+    return (line.lower().find('banner ') != -1
+            and (line[-2:] == '^C' or line[-1:] == "\x03"))
+
+
+class _ExtractStage:
+    '''
+    Line by line variant of IosConfigRegexp.extract_section.
+
+    feed() takes the configuration lines one after another and returns the
+    (converted) line if it belongs to a selected section or None. close()
+    must be called at the end of the configuration to detect an
+    unterminated banner.
+    '''
+    def __init__(self, match):
+        self.match = match
+        self.lineno = -1
+        self.prev_line = ''
+        self.in_section = False
+        self.banner = None
+
+    def _keep(self, line: str):
+        if (self.prev_line != '!' or line != '!'):
+            self.prev_line = line
+            return line
+        return None
+
+    def feed(self, line: str):
+        self.lineno += 1
+        if self.banner is not None:
+            if line[-2:] == '^C' or line[-1:] == "\x03":  # ^C at eol
+                self.banner = None
+                return "\x03"
+            return line
+        if self.in_section:
+            if line[:1] == ' ':
+                return self._keep(line)
+            self.in_section = False
+        if self.match(line):
+            if _is_banner_line(line):
+                self.banner = (self.lineno, line)
+                # modify for napalm_install_config compatibility
+                return line[:-2] + "\x03"
+            self.in_section = True
+            return self._keep(line)
+        return None
+
+    def close(self):
+        if self.banner is not None:
+            raise MissingEndOfBannerError(
+                ("Error in IosConfigRegexp.extract_banner: "
+                 "Missing block-end for line-no {} - '{}'").format(*self.banner))
+
+
+class _RemoveStage(_ExtractStage):
+    '''
+    Line by line variant of IosConfigRegexp.remove_section.
+
+    feed() takes the configuration lines one after another and returns the
+    line if it is kept or None if it was removed. close() must be called at
+    the end of the configuration to detect an unterminated banner.
+    '''
+    def feed(self, line: str):
+        self.lineno += 1
+        if self.banner is not None:
+            if line[-2:] == '^C' or line[-1:] == "\x03":  # ^C at eol
+                self.banner = None
+            return None
+        if self.in_section:
+            if line[:1] == ' ':
+                return None
+            self.in_section = False
+        if self.match(line):
+            if _is_banner_line(line):
+                self.banner = (self.lineno, line)
+            else:
+                self.in_section = True
+            return None
+        return self._keep(line)
+
+    def close(self):
+        if self.banner is not None:
+            raise MissingEndOfBannerError(
+                ("Error in IosConfigRegexp.remove_banner: "
+                 "Missing block-end for line-no {} - '{}'").format(*self.banner))
+
+
+# configurations with less lines are processed serially by extract_parallel()
+# and remove_parallel(), starting the worker processes costs more
+PARALLEL_MIN_LINES = 50000
+
+
+def _is_term_line(line: str) -> bool:
+    return line[-2:] == '^C' or line[-1:] == "\x03"
+
+
+def _chunk_boundaries(lines, chunks: int) -> list:
+    '''
+    Start indices of at most chunks parts of lines, the first is 0.
+
+    A part only starts at a line that is not indented (never inside a
+    section) and not inside a banner: the last line ending with '^C' or
+    chr(3) before the start must not be a banner header, otherwise the
+    start is moved behind the end of the banner. Sections and banners
+    never span two parts, so every part can be processed on its own.
+    '''
+    n = len(lines)
+    res = [0]
+    for k in range(1, chunks):
+        b = max(k * n // chunks, res[-1] + 1)
+        while b < n:
+            if lines[b][:1] == ' ':
+                b += 1
+                continue
+            # last '^C' line in front of b (lines before res[-1] are safe)
+            j = b - 1
+            while j >= res[-1] and not _is_term_line(lines[j]):
+                j -= 1
+            if j < res[-1] or not _is_banner_line(lines[j]):
+                break
+            # inside the banner starting at line j: continue after its end
+            b = j + 1
+            while b < n and not _is_term_line(lines[b]):
+                b += 1
+            b += 1
+        if b >= n:
+            break
+        res.append(b)
+    return res
+
+
+def _process_chunk(job):
+    '''
+    Runs in a worker process: extract or remove for one part of the
+    configuration, see IosConfigRegexp._process_part()
+    '''
+    operation, lines, offset, regexplist, ignorecase, prefix_str = job
+    icr = IosConfigRegexp(lines, regexplist, ignorecase, prefix_str)
+    return icr._process_part(operation, offset)
+
+
+def config_digest(lines) -> str:
+    ''' content hash of a list of configuration lines '''
+    h = hashlib.sha1('\n'.join(lines).encode('utf-8', 'surrogatepass'))
+    # line lengths make the digest unique even if lines contain '\n'
+    h.update(array('q', map(len, lines)).tobytes())
+    return h.hexdigest()
+
+
+class _SectionIndex:
+    '''
+    Section and banner spans of one ios-configuration.
+
+    The index is built once per configuration content and shared by all
+    IosConfigRegexp instances with the same conf_lines (see get()).
+
+    next_top[i] is the index of the first line >= i that is not indented,
+    so a section starting at line i ends at next_top[i+1].
+    next_term[i] is the index of the first line >= i that ends with '^C' or
+    chr(3), -1 if there is none. A banner starting at line i ends after
+    next_term[i+1].
+    '''
+    MAX_CACHED = 8
+    __cache = OrderedDict()
+
+    def __init__(self, lines):
+        # one pass over the lines, lines of a ConfigLines are only created once
+        indented = bytearray()
+        term = bytearray()
+        banners = set()
+        dup_bang = array('q')
+        prev = None
+        for i, li in enumerate(lines):
+            indented.append(li[:1] == ' ')
+            if li[-2:] == '^C' or li[-1:] == "\x03":  # ^C at eol
+                term.append(1)
+                if _is_banner_line(li):
+                    banners.add(i)
+            else:
+                term.append(0)
+            if li == '!' and prev == '!':
+                dup_bang.append(i)
+            prev = li
+        n = len(indented)
+        next_top = array('q', [n]) * (n + 1)
+        next_term = array('q', [-1]) * (n + 1)
+        for i in range(n - 1, -1, -1):
+            next_top[i] = next_top[i+1] if indented[i] else i
+            next_term[i] = i if term[i] else next_term[i+1]
+        self.next_top = next_top
+        self.next_term = next_term
+        self.banners = frozenset(banners)
+        # lines i with lines[i] == lines[i-1] == '!'
+        self.dup_bang = dup_bang
+        self.__lines = lines
+        self.__positions = None
+
+    @classmethod
+    def get(cls, lines):
+        ''' index for lines, reused if the same content was indexed before '''
+        digest = config_digest(lines)
+        index = cls.__cache.get(digest)
+        if index is None:
+            index = cls(lines)
+            cls.__cache[digest] = index
+            while len(cls.__cache) > cls.MAX_CACHED:
+                cls.__cache.popitem(last=False)
+        else:
+            cls.__cache.move_to_end(digest)
+        return index
+
+    def section_end(self, i: int) -> int:
+        return self.next_top[i+1]
+
+    def banner_end(self, i: int) -> int:
+        ''' first line after the banner starting at line i, -1 if unterminated '''
+        j = self.next_term[i+1]
+        return j + 1 if j != -1 else -1
+
+    def _build_positions(self):
+        '''
+        Hash table of the keys of all lines (see _LineMatcher.literal_keys()).
+
+        The table is kept in arrays instead of a dict of tuples: key hash and
+        line index per key, a chain of keys with the same hash and an open
+        addressing table of the most recent key per hash. The keys are
+        verified against the lines on lookup.
+        '''
+        hashes = array('q')
+        where = array('l')
+        for i, li in enumerate(self.__lines):
+            if '\n' in li:
+                # '$' also matches in front of a trailing newline
+                return False
+            hashes.append(hash(('L', li)))
+            where.append(i)
+            if li[:1].isspace():
+                continue
+            parts = li.split(None, 1)
+            if len(parts) == 2:
+                hashes.append(hash(('H', parts[0], parts[1])))
+                where.append(i)
+        size = 1 << (2 * len(hashes)).bit_length()
+        mask = size - 1
+        table = array('l', [-1]) * size
+        chain = array('l', [-1]) * len(hashes)
+        for k, h in enumerate(hashes):
+            j = h & mask
+            while table[j] != -1 and hashes[table[j]] != h:
+                j = (j + 1) & mask
+            chain[k] = table[j]
+            table[j] = k
+        return (hashes, where, table, chain, mask)
+
+    @staticmethod
+    def _has_key(li: str, key: tuple) -> bool:
+        if key[0] == 'L':
+            return li == key[1]
+        if li[:1].isspace():
+            return False
+        return li.split(None, 1) == [key[1], key[2]]
+
+    def lookup(self, keys: list):
+        ''' sorted indices of the lines selected by _LineMatcher.literal_keys() '''
+        if self.__positions is None:
+            self.__positions = self._build_positions()
+        if self.__positions is False:
+            return None
+        hashes, where, table, chain, mask = self.__positions
+        lines = self.__lines
+        res = set()
+        for key in keys:
+            h = hash(key)
+            j = h & mask
+            while table[j] != -1 and hashes[table[j]] != h:
+                j = (j + 1) & mask
+            k = table[j]
+            while k != -1:
+                if self._has_key(lines[where[k]], key):
+                    res.add(where[k])
+                k = chain[k]
+        return sorted(res)
+
+
 class IosConfigRegexp:
     '''
     A class used to manipulate cisco ios configuration-sections via regexp.
@@ -21,40 +486,75 @@ class IosConfigRegexp:
     Attributes
     ----------
 
-    conf_lines: list, str
-        contains the ios-configuration.
+    conf_lines: ConfigLines, tuple
+        contains the ios-configuration (read only sequence of lines). A str
+        is stored as ConfigLines, a list as tuple sharing the line objects.
     ignorecase: bool
         set to True to perform case insensitive regexp searches
+    matcher: _LineMatcher
+        precompiled select-patterns (read only), rebuilt when regexplist,
+        prefix_str or ignorecase change.
     prefix_str: str
         string that will be prepended to all regexp in regexplist
     regexplist: list, str
         regular expressions to identify configuration-section headers
+    section_index: _SectionIndex
+        section and banner spans of conf_lines (read only). The index is
+        built once per configuration content and cached by content hash.
+    metrics: bool
+        set to True to record last_metrics for every extract_section,
+        remove_section, extract_view and remove_view call
+    last_metrics: dict
+        metrics of the last call (None if metrics is False): call, seconds,
+        lines_in, lines_scanned (lines matched against the patterns),
+        regex_evaluations (compiled expressions applied, at most one per
+        expression and line), index_lookups (keys looked up in the section
+        index instead of scanning), sections_matched, lines_out, bytes_out
 
     Methods
     -------
 
-    __init__(self, config=None, regexplist=list(), ignorecase=False, prefix_str='')
+    __init__(self, config=None, regexplist=list(), ignorecase=False, prefix_str='', metrics=False)
         constructor
     is_match(self, i: int) -> bool
         Match all select-patterns against the string conf_line[i].
+    is_banner(self, idx) -> bool
+        Checks if conf_line[idx] is a banner header.
+    section_end(self, i: int) -> int
+        index of the first line after the section starting at line i.
+    banner_end(self, i: int, caller: str) -> int
+        index of the first line after the banner starting at line i.
     extract_section(self) -> list
         returns the configuration without the selected configuration-sections.
     remove_section(self) -> list
         returns the whole configuration without the selected
         configuration-sections.
+    extract_view(self) -> ConfigLines
+        like extract_section(), but the result shares the buffer of conf_lines.
+    remove_view(self) -> ConfigLines
+        like remove_section(), but the result shares the buffer of conf_lines.
+    iter_extract(self, source=None) -> iterator
+        generator variant of extract_section() for any iterable or open file.
+    iter_remove(self, source=None) -> iterator
+        generator variant of remove_section() for any iterable or open file.
+    extract_parallel(self, workers=None, min_lines=PARALLEL_MIN_LINES) -> list
+        extract_section() of parts of conf_lines in worker processes.
+    remove_parallel(self, workers=None, min_lines=PARALLEL_MIN_LINES) -> list
+        remove_section() of parts of conf_lines in worker processes.
     '''
-    __ignorecase = False
-    __regexplist = list()
-    __conf_lines = list()
-    __re_flags = 0
-    __prev_line = ''
-
-    def __init__(self, config=None, regexplist=list(), ignorecase=False, prefix_str=''):
+    def __init__(self, config=None, regexplist=list(), ignorecase=False, prefix_str='', metrics=False):
+        self.__matcher = None
+        self.__index = None
+        self.__counts = None
+        self.metrics = metrics
+        self.last_metrics = None
         self.conf_lines = config
         self.regexplist = regexplist
         self.ignorecase = ignorecase
         self.prefix_str = prefix_str
         self.__prev_line = ''
+        self.__first_copy = -1
+        self.__line_offset = 0
 
     # property ignorecase
     @property
@@ -69,23 +569,48 @@ class IosConfigRegexp:
         else:
             self.__ignorecase = True
             self.__re_flags = re.IGNORECASE
+        self.__matcher = None
+
+    # property prefix_str
+    @property
+    def prefix_str(self):
+        return self.__prefix_str
+
+    @prefix_str.setter
+    def prefix_str(self, value):
+        ''' string that will be prepended to all regexp in regexplist '''
+        self.__prefix_str = '' if value == None else value
+        self.__matcher = None
 
     # property conf_lines
     @property
-    def conf_lines(self) -> list:
+    def conf_lines(self):
         return self.__conf_lines
 
     @conf_lines.setter
     def conf_lines(self, value):
-        ''' property conf_lines set the ios-configuration as a list of strings '''
+        '''
+        property conf_lines set the ios-configuration as a string, a list of
+        strings or a ConfigLines (e.g. ConfigLines.from_file())
+        '''
         if value == None:
-            self.__conf_lines = list()
-        elif isinstance(value, str):
-            self.__conf_lines = value.splitlines()
+            self.__conf_lines = ConfigLines()
+        elif isinstance(value, (str, bytes)):
+            self.__conf_lines = ConfigLines(value)
+        elif isinstance(value, (ConfigLines, tuple)):
+            self.__conf_lines = value
         elif isinstance(value, list):
-            self.__conf_lines = copy.deepcopy(value)
+            self.__conf_lines = tuple(value)
         else:
             raise ValueError("IosConfigRegexp.conf_lines must be a list of strings!")
+        self.__index = None
+
+    @property
+    def section_index(self) -> _SectionIndex:
+        ''' section and banner spans of conf_lines, cached by content hash '''
+        if self.__index is None:
+            self.__index = _SectionIndex.get(self.conf_lines)
+        return self.__index
 
     # property regexplist
     @property
@@ -98,8 +623,8 @@ class IosConfigRegexp:
             self.__regexplist = list()
         elif isinstance(value, str):
             self.__regexplist = value.splitlines()
-        elif isinstance(value, list):
-            self.__regexplist = copy.deepcopy(value)
+        elif isinstance(value, (list, tuple)):
+            self.__regexplist = list(value)
         else:
             raise ValueError("IosConfigRegexp.regexplist must be a list of strings!")
 
@@ -110,96 +635,216 @@ class IosConfigRegexp:
                 if pos != -1:
                     s = self.__regexplist[i][:pos] + "\x03" + self.__regexplist[i][pos+3:]
                     self.__regexplist.append(s)
+        self.__matcher = None
+
+    @property
+    def matcher(self) -> _LineMatcher:
+        ''' compiled matcher, rebuilt after regexplist, prefix_str or ignorecase changed '''
+        if self.__matcher is None:
+            self.__matcher = _LineMatcher(self.regexplist, self.prefix_str, self.__re_flags)
+        return self.__matcher
 
     def is_match(self, i: int) -> bool:
         ''' match all regexp to current line indexed by i '''
-        line = self.conf_lines[i]
-        for pat in self.regexplist:
-            expr = self.prefix_str + pat
-            if expr[0:1] != '^':
-                expr = '^' + expr
-            if expr[-1:]  != '$':
-                expr = expr + '$'
-            m = re.match(expr, line, self.__re_flags)
-            if m:
-                return True
-        return False
+        return self.matcher.match(self.conf_lines[i])
 
     def is_banner(self, idx) -> bool:
         ''' Checks if conf_line[idx] is a banner header '''
-        return (self.conf_lines[idx].lower().find('banner ') != -1
-                and (self.conf_lines[idx][-2:] == '^C' or self.conf_lines[idx][-1:] == "\x03"))
+        return idx in self.section_index.banners
+
+    def section_end(self, i: int) -> int:
+        ''' Returns the index of the first line after the section starting at line i '''
+        return self.section_index.section_end(i)
+
+    def banner_end(self, i: int, caller: str = 'extract_banner') -> int:
+        ''' Returns the index of the first line after the banner starting at line i '''
+        end = self.section_index.banner_end(i)
+        if end == -1:
+            raise MissingEndOfBannerError(
+                ("Error in IosConfigRegexp.{}: "
+                 "Missing block-end for line-no {} - '{}'").format(
+                    caller, i + self.__line_offset, self.conf_lines[i]))
+        return end
+
+    def _match_positions(self, pos: list):
+        '''
+        Yields the ascending indices of all matching lines. Lines before
+        pos[0] (i.e. inside an already processed section) are skipped.
+        '''
+        counts = self.__counts
+        keys = self.matcher.literal_keys()
+        if keys is not None:
+            positions = self.section_index.lookup(keys)
+            if positions is not None:
+                if counts is not None:
+                    counts['index_lookups'] += len(keys)
+                for i in positions:
+                    if i >= pos[0]:
+                        if counts is not None:
+                            counts['sections_matched'] += 1
+                        yield i
+                return
+        match = self.matcher.match
+        if counts is not None:
+            match = self._counting_match(match, counts, self.matcher)
+        for i, li in enumerate(self.conf_lines):
+            if i >= pos[0] and match(li):
+                yield i
+
+    @staticmethod
+    def _counting_match(match, counts, matcher):
+        ''' match() counting the lines and the compiled expressions applied per line '''
+        evaluations = (matcher.combined is not None) + len(matcher.single)
+        def counting(li):
+            counts['lines_scanned'] += 1
+            counts['regex_evaluations'] += evaluations
+            if match(li):
+                counts['sections_matched'] += 1
+                return True
+            return False
+        return counting
+
+    def _copy_lines(self, start: int, end: int, res: list):
+        ''' Append conf_lines[start:end] to res, repeated '!' lines are skipped '''
+        if start >= end:
+            return
+        lines = self.conf_lines
+        dup_bang = self.section_index.dup_bang
+        j = bisect_right(dup_bang, start)
+        if self.__first_copy == -1:
+            self.__first_copy = len(res)
+        if self.__prev_line == '!' and lines[start] == '!':
+            start += 1
+        while j < len(dup_bang) and dup_bang[j] < end:
+            res.extend(lines[start:dup_bang[j]])
+            start = dup_bang[j] + 1
+            j += 1
+        res.extend(lines[start:end])
+        self.__prev_line = lines[end-1]
 
     def _extract_section(self, i: int, res: list) -> int:
         ''' Extract ios configuration-section starting at line i '''
-        is_in_section = True
-        while i < len(self.conf_lines) and is_in_section:
-            # append current line
-            if (self.__prev_line != '!' or self.conf_lines[i] != '!'):
-                res.append(self.conf_lines[i])
-                self.__prev_line = self.conf_lines[i]
-
-            # examine next line
-            i += 1
-            if i < len(self.conf_lines):
-                li = self.conf_lines[i]
-                if (li + 'X')[0] != ' ':
-                    is_in_section = False
-        return i
+        end = self.section_end(i)
+        self._copy_lines(i, end, res)
+        return end
 
     def _remove_section(self, i: int, res: list) -> int:
         ''' Remove ios configuration-section starting at line i '''
-        is_in_section = True
-        while i < len(self.conf_lines) and is_in_section:
-            i += 1
-            if i < len(self.conf_lines):
-                li = self.conf_lines[i]
-                if (li + 'X')[0] != ' ':
-                    is_in_section = False
-        return i
+        return self.section_end(i)
 
     def _extract_banner(self, i: int, res: list) -> int:
         ''' Extract ios-banner starting at line i '''
-        is_in_section = True
-        is_first = True
-        ErrMsg = ("Error in IosConfigRegexp.extract_banner: "
-                  "Missing block-end for line-no {} - '{}'").format(i, self.conf_lines[i])
-        while i < len(self.conf_lines) and is_in_section:
-            if is_first:
-                # modify for napalm_install_config compatibility
-                res.append(self.conf_lines[i][:-2] + "\x03")
-                is_first = False
-            else:
-                # examine next line
-                if i >= len(self.conf_lines):
-                    raise MissingEndOfBannerError(ErrMsg)
-                li = self.conf_lines[i]
-                if (li)[-2:] == '^C' or (li)[-1:] == "\x03":  # ^C at eol
-                    is_in_section = False
-                    res.append("\x03")
-                else:
-                    res.append(li)
-            i += 1
-        if is_in_section:
-            raise MissingEndOfBannerError(ErrMsg)
-        return i
+        end = self.banner_end(i, 'extract_banner')
+        # modify for napalm_install_config compatibility
+        res.append(self.conf_lines[i][:-2] + "\x03")
+        res.extend(self.conf_lines[i+1:end-1])
+        res.append("\x03")
+        return end
 
     def _remove_banner(self, i: int, res: list) -> int:
         ''' Remove ios-banner starting at line i '''
-        is_in_section = True
-        ErrMsg = ("Error in IosConfigRegexp.remove_banner: "
-                  "Missing block-end for line-no {} - '{}'").format(i, self.conf_lines[i])
-        while i < len(self.conf_lines) and is_in_section:
-            i += 1
-            if i >= len(self.conf_lines):
-                raise MissingEndOfBannerError(ErrMsg)
-            li = self.conf_lines[i]
-            if (li)[-2:] == '^C' or (li)[-1:] == "\x03":  # ^C at eol
-                i += 1
-                is_in_section = False
-        if is_in_section:
-            raise MissingEndOfBannerError(ErrMsg)
-        return i
+        return self.banner_end(i, 'remove_banner')
+
+    def _extract(self, res):
+        pos = [0]
+        self.__prev_line = ''
+        self.__first_copy = -1
+        for i in self._match_positions(pos):
+            if self.is_banner(i):
+                pos[0] = self._extract_banner(i, res)
+            else:
+                pos[0] = self._extract_section(i, res)
+        return res
+
+    def _remove(self, res):
+        pos = [0]
+        self.__prev_line = ''
+        self.__first_copy = -1
+        for i in self._match_positions(pos):
+            self._copy_lines(pos[0], i, res)
+            if self.is_banner(i):
+                pos[0] = self._remove_banner(i, res)
+            else:
+                pos[0] = self._remove_section(i, res)
+        self._copy_lines(pos[0], len(self.conf_lines), res)
+        return res
+
+    def _process_part(self, operation: str, offset: int) -> tuple:
+        '''
+        extract or remove of a part of a configuration starting at line
+        offset. Returns the result, the index of the first line copied by
+        _copy_lines() (-1 if none) and the last copied line (None if none):
+        the first copied line is a repeated '!' if the last copied line of
+        the previous parts is '!' too.
+        '''
+        self.__line_offset = offset
+        res = self._extract(list()) if operation == 'extract' else self._remove(list())
+        if self.__first_copy == -1:
+            return res, -1, None
+        return res, self.__first_copy, self.__prev_line
+
+    def _parallel(self, operation: str, workers, min_lines: int) -> list:
+        n = len(self.conf_lines)
+        workers = workers or os.cpu_count() or 1
+        bounds = _chunk_boundaries(self.conf_lines, workers) if n >= min_lines and workers > 1 else [0]
+        if len(bounds) == 1:
+            return self._extract(list()) if operation == 'extract' else self._remove(list())
+        bounds.append(n)
+        jobs = [(operation, tuple(self.conf_lines[bounds[k]:bounds[k+1]]), bounds[k],
+                 self.regexplist, self.ignorecase, self.prefix_str) for k in range(len(bounds) - 1)]
+        res = list()
+        prev_line = ''
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            for part, first_copy, last_copied in pool.map(_process_chunk, jobs):
+                # '!' repeated across the seam of two parts
+                if first_copy != -1 and prev_line == '!' and part[first_copy] == '!':
+                    del part[first_copy]
+                res.extend(part)
+                if last_copied is not None:
+                    prev_line = last_copied
+        return res
+
+    def extract_parallel(self, workers=None, min_lines=PARALLEL_MIN_LINES) -> list:
+        '''
+        Same result as extract_section(), but conf_lines is cut into parts
+        (only between top-level sections, never inside a banner) that are
+        processed by a pool of workers processes (default: cpu count).
+        Configurations with less than min_lines lines are processed
+        serially. The line numbers of errors refer to the whole
+        configuration.
+        '''
+        return self._parallel('extract', workers, min_lines)
+
+    def remove_parallel(self, workers=None, min_lines=PARALLEL_MIN_LINES) -> list:
+        '''
+        Same result as remove_section(), processed in parallel like
+        extract_parallel().
+        '''
+        return self._parallel('remove', workers, min_lines)
+
+    def _measured(self, call: str, run):
+        '''
+        Returns run(), records last_metrics if metrics is True. The
+        counters are only maintained while measuring.
+        '''
+        if not self.metrics:
+            return run()
+        self.__counts = counts = dict.fromkeys(
+            ('lines_scanned', 'regex_evaluations', 'index_lookups', 'sections_matched'), 0)
+        start = time.perf_counter()
+        try:
+            res = run()
+        finally:
+            self.__counts = None
+        seconds = time.perf_counter() - start
+        self.last_metrics = dict(counts, call=call, seconds=seconds, lines_in=len(self.conf_lines),
+                                 lines_out=len(res), bytes_out=sum(len(li) + 1 for li in res))
+        return res
+
+    def _view_builder(self) -> ConfigLinesBuilder:
+        if not isinstance(self.conf_lines, ConfigLines):
+            self.__conf_lines = ConfigLines.from_lines(self.conf_lines)
+        return ConfigLinesBuilder(self.conf_lines)
 
     def extract_section(self) -> list:
         '''
@@ -212,18 +857,7 @@ class IosConfigRegexp:
             Selected parts of the configuration or an
             empty list if nothing was found.
         '''
-        res = list()
-        i = 0
-        self.__prev_line = ''
-        while i < len(self.conf_lines):
-            if self.is_match(i):
-                if self.is_banner(i):
-                    i = self._extract_banner(i, res)
-                else:
-                    i = self._extract_section(i, res)
-            else:
-                i += 1
-        return res
+        return self._measured('extract_section', lambda: self._extract(list()))
 
     def remove_section(self) -> list:
         '''
@@ -234,18 +868,69 @@ class IosConfigRegexp:
         list
             Content of `conf_lines` without the selected configuration-sections.
         '''
-        res = list()
-        i = 0
-        self.__prev_line = ''
-        while i < len(self.conf_lines):
-            if self.is_match(i):
-                if self.is_banner(i):
-                    i = self._remove_banner(i, res)
-                else:
-                    i = self._remove_section(i, res)
-            else:
-                if (self.__prev_line != '!' or self.conf_lines[i] != '!'):
-                    res.append(self.conf_lines[i])
-                    self.__prev_line = self.conf_lines[i]
-                i += 1
-        return res
+        return self._measured('remove_section', lambda: self._remove(list()))
+
+    def extract_view(self) -> ConfigLines:
+        '''
+        Same as extract_section(), but returns a ConfigLines that shares the
+        text buffer of conf_lines, so no line is copied. A conf_lines list
+        is converted to a ConfigLines first.
+        '''
+        return self._measured('extract_view', lambda: self._extract(self._view_builder()).build())
+
+    def remove_view(self) -> ConfigLines:
+        '''
+        Same as remove_section(), but returns a ConfigLines that shares the
+        text buffer of conf_lines (see extract_view()).
+        '''
+        return self._measured('remove_view', lambda: self._remove(self._view_builder()).build())
+
+    def _iter_source(self, source):
+        ''' configuration lines of source, conf_lines if source is None '''
+        if source == None:
+            return iter(self.conf_lines)
+        if isinstance(source, str):
+            return iter(source.splitlines())
+        if isinstance(source, io.IOBase) or hasattr(source, 'readline'):
+            return self._iter_file(source)
+        return iter(source)
+
+    @staticmethod
+    def _iter_file(f):
+        ''' lines of an open file, split like str.splitlines() '''
+        for chunk in f:
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode('utf-8')
+            for line in chunk.splitlines():
+                yield line
+
+    def _iter_stage(self, stage, source):
+        for line in self._iter_source(source):
+            line = stage.feed(line)
+            if line is not None:
+                yield line
+        stage.close()
+
+    def iter_extract(self, source=None):
+        '''
+        Yields the selected configuration-sections line by line
+
+        Parameters
+        ----------
+
+        source: iterable, file, str
+            configuration lines, an open (text or binary) file or a
+            string. conf_lines is used if source is None.
+
+        Only the current line is held in memory, so large configurations
+        can be processed in constant memory. MissingEndOfBannerError is
+        raised at the end of source if a selected banner is unterminated.
+        '''
+        return self._iter_stage(_ExtractStage(self.matcher.match), source)
+
+    def iter_remove(self, source=None):
+        '''
+        Yields the configuration without the selected configuration-sections
+        line by line. See iter_extract() for source.
+        '''
+        return self._iter_stage(_RemoveStage(self.matcher.match), source)
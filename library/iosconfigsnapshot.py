@@ -0,0 +1,403 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+'''
+Content addressed snapshot store of running and generated configurations.
+
+A configuration is split into chunks at the section boundaries of
+IosConfigRegexp (a chunk ends after a top-level '!' line), every chunk is
+stored once zlib compressed under its sha1, so sections shared by hosts
+and runs (interfaces, acls, ...) don't use additional disk space.
+
+    <store>/objects/<sha1[:2]>/<sha1[2:]>            compressed chunk
+    <store>/snapshots/<host>/<kind>/<timestamp>.json manifest (chunk list)
+    <store>/snapshots/<host>/<kind>/LATEST           timestamp of the latest snapshot
+
+Retention and garbage collection (the latest snapshot of every host is
+always kept):
+
+    python3 iosconfigsnapshot.py --store ~/snapshots/store gc --keep 10 --max-age-days 90 --max-bytes 2G
+    python3 iosconfigsnapshot.py --store ~/snapshots/store get R01 [--timestamp 20191001]
+    python3 iosconfigsnapshot.py --store ~/snapshots/store stats
+'''
+
+import argparse
+import calendar
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+from iosconfigregexp import IosConfigRegexp, MissingEndOfBannerError
+
+
+KINDS = ('running', 'managed')
+MAX_CHUNK_LINES = 1000
+COMPRESS_LEVEL = 6
+LATEST = 'LATEST'
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S'
+TIMESTAMP_RE = re.compile(r'^(\d{8}T\d{6})(?:\.(\d{6}))?Z?$')
+
+
+def split_chunks(config: str, max_lines: int = MAX_CHUNK_LINES) -> list:
+    '''
+    Splits config at section boundaries. A chunk ends after a top-level '!'
+    line or when it has max_lines lines, sections and banners are never
+    split. ''.join(split_chunks(config)) == config + '\\n'.
+    '''
+    lines = config.split('\n')
+    icr = IosConfigRegexp(lines)
+    chunks = list()
+    start = i = 0
+    while i < len(lines):
+        if icr.is_banner(i):
+            try:
+                end = icr.banner_end(i, 'snapshot')
+            except MissingEndOfBannerError:
+                end = len(lines)
+        else:
+            end = max(icr.section_end(i), i + 1)
+        if lines[i] == '!' or end - start >= max_lines or end >= len(lines):
+            chunks.append('\n'.join(lines[start:end]) + '\n')
+            start = end
+        i = end
+    return chunks
+
+
+def snapshot_timestamp(after: str = '') -> str:
+    '''
+    UTC timestamp of now (YYYYmmddTHHMMSS.ffffffZ) of a single clock read,
+    greater than the timestamp after (of the latest snapshot) if the clock
+    didn't advance since.
+    '''
+    micros = int(time.time() * 1000000)
+    m = TIMESTAMP_RE.match(after or '')
+    if m:
+        latest = calendar.timegm(time.strptime(m.group(1), TIMESTAMP_FORMAT)) * 1000000 + int(m.group(2) or 0)
+        micros = max(micros, latest + 1)
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(micros // 1000000)) + '.{:06}Z'.format(micros % 1000000)
+
+
+def parse_size(value: str) -> int:
+    ''' bytes of a size with an optional suffix K, M, G '''
+    value = str(value).strip().upper()
+    factor = 1
+    for suffix, f in (('K', 1024), ('M', 1024 ** 2), ('G', 1024 ** 3)):
+        if value.endswith(suffix):
+            value, factor = value[:-1], f
+            break
+    return int(float(value) * factor)
+
+
+class IosConfigSnapshotStore:
+    '''
+    Deduplicated, compressed configuration snapshots per host and kind
+    (running, managed).
+
+    put() and get() may be used by parallel ansible forks, they hold a
+    shared fcntl lock on <store>/store.lock, gc() an exclusive one. All
+    files are written to a temporary file and replaced atomically.
+
+    Methods
+    -------
+
+    put(self, host, config, kind='running', timestamp=None) -> dict
+        stores config and returns the manifest, a config equal to the latest
+        snapshot of the host is not stored again (changed False).
+    latest(self, host, kind='running') -> dict
+        the manifest of the latest snapshot, None if there is none.
+    history(self, host, kind='running') -> list
+        the timestamps of all snapshots, oldest first.
+    get(self, host, kind='running', timestamp='') -> str
+        the configuration of the latest snapshot whose timestamp starts with
+        timestamp ('' is the latest snapshot), None if there is none.
+    gc(self, keep=None, max_age_days=None, max_bytes=None, now=None) -> dict
+        removes old snapshots and all unreferenced chunks.
+    stats(self) -> dict
+        number of hosts, snapshots, objects and bytes of the objects.
+    '''
+    def __init__(self, store_dir: str):
+        self.store_dir = os.path.expanduser(store_dir)
+
+    @contextmanager
+    def _locked(self, operation):
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, 'store.lock'), 'a') as lock:
+            fcntl.flock(lock.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, 'objects', digest[:2], digest[2:])
+
+    def _snapshot_dir(self, host: str, kind: str) -> str:
+        if kind not in KINDS:
+            raise ValueError("kind must be one of {}".format(', '.join(KINDS)))
+        if host in ('', '.', '..') or '/' in host:
+            raise ValueError("invalid host '{}'".format(host))
+        return os.path.join(self.store_dir, 'snapshots', host, kind)
+
+    @staticmethod
+    def _write(filename: str, data: bytes):
+        dirname = os.path.dirname(filename)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, filename)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def _read_json(filename: str):
+        try:
+            with open(filename) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _put_chunk(self, chunk: str) -> tuple:
+        ''' (sha1, bytes written) of chunk, 0 bytes if already stored '''
+        data = chunk.encode('utf-8', 'surrogatepass')
+        digest = hashlib.sha1(data).hexdigest()
+        filename = self._object_path(digest)
+        if os.path.exists(filename):
+            return digest, 0
+        compressed = zlib.compress(data, COMPRESS_LEVEL)
+        self._write(filename, compressed)
+        return digest, len(compressed)
+
+    def _get_chunk(self, digest: str) -> str:
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                data = zlib.decompress(f.read())
+        except (IOError, OSError, zlib.error) as e:
+            raise ValueError("chunk {} could not be read: {}".format(digest, e))
+        if hashlib.sha1(data).hexdigest() != digest:
+            raise ValueError("chunk {} is damaged".format(digest))
+        return data.decode('utf-8', 'surrogatepass')
+
+    def _latest_timestamp(self, host: str, kind: str) -> str:
+        try:
+            with open(os.path.join(self._snapshot_dir(host, kind), LATEST)) as f:
+                return f.read().strip()
+        except (IOError, OSError):
+            return ''
+
+    def _manifest(self, host: str, kind: str, timestamp: str) -> dict:
+        return self._read_json(os.path.join(self._snapshot_dir(host, kind), timestamp + '.json'))
+
+    def put(self, host: str, config: str, kind: str = 'running', timestamp: str = None) -> dict:
+        if isinstance(config, (list, tuple)):
+            config = '\n'.join(config)
+        digest = hashlib.sha1(config.encode('utf-8', 'surrogatepass')).hexdigest()
+        with self._locked(fcntl.LOCK_SH):
+            snapshot_dir = self._snapshot_dir(host, kind)
+            latest = self.latest(host, kind)
+            if latest != None and latest.get('sha1') == digest:
+                return dict(latest, changed=False, new_chunks=0, bytes_written=0)
+            chunks = list()
+            new_chunks = bytes_written = 0
+            for chunk in split_chunks(config):
+                chunk_digest, written = self._put_chunk(chunk)
+                chunks.append(chunk_digest)
+                new_chunks += written > 0
+                bytes_written += written
+            if timestamp == None:
+                timestamp = snapshot_timestamp(latest['timestamp'] if latest != None else '')
+            manifest = {
+                'host': host,
+                'kind': kind,
+                'timestamp': timestamp,
+                'sha1': digest,
+                'size': len(config),
+                'chunks': chunks,
+            }
+            self._write(os.path.join(snapshot_dir, timestamp + '.json'),
+                        json.dumps(manifest, indent=1).encode('utf-8'))
+            if latest == None or timestamp >= latest['timestamp']:
+                self._write(os.path.join(snapshot_dir, LATEST), timestamp.encode('utf-8'))
+        return dict(manifest, changed=True, new_chunks=new_chunks, bytes_written=bytes_written)
+
+    def latest(self, host: str, kind: str = 'running') -> dict:
+        timestamp = self._latest_timestamp(host, kind)
+        return self._manifest(host, kind, timestamp) if timestamp != '' else None
+
+    def history(self, host: str, kind: str = 'running') -> list:
+        try:
+            names = os.listdir(self._snapshot_dir(host, kind))
+        except (IOError, OSError):
+            return list()
+        return sorted(name[:-5] for name in names if name.endswith('.json'))
+
+    def get(self, host: str, kind: str = 'running', timestamp: str = '') -> str:
+        with self._locked(fcntl.LOCK_SH):
+            if timestamp in ('', None, 'latest'):
+                manifest = self.latest(host, kind)
+            else:
+                matches = [ts for ts in self.history(host, kind) if ts.startswith(str(timestamp))]
+                manifest = self._manifest(host, kind, matches[-1]) if matches else None
+            if manifest == None:
+                return None
+            config = ''.join(self._get_chunk(digest) for digest in manifest['chunks'])
+        # split_chunks() terminates the last line
+        return config[:-1]
+
+    def _manifests(self):
+        ''' yields (filename, manifest, is_latest) of all snapshots '''
+        snapshots_dir = os.path.join(self.store_dir, 'snapshots')
+        for host in sorted(os.listdir(snapshots_dir)) if os.path.isdir(snapshots_dir) else []:
+            for kind in KINDS:
+                dirname = os.path.join(snapshots_dir, host, kind)
+                latest = self._latest_timestamp(host, kind)
+                for timestamp in self.history(host, kind):
+                    manifest = self._read_json(os.path.join(dirname, timestamp + '.json'))
+                    if manifest != None:
+                        yield os.path.join(dirname, timestamp + '.json'), manifest, timestamp == latest
+
+    def _objects(self):
+        ''' yields (sha1, filename, size) of all stored chunks '''
+        objects_dir = os.path.join(self.store_dir, 'objects')
+        for prefix in sorted(os.listdir(objects_dir)) if os.path.isdir(objects_dir) else []:
+            dirname = os.path.join(objects_dir, prefix)
+            for name in os.listdir(dirname):
+                if not name.startswith('.tmp-'):
+                    filename = os.path.join(dirname, name)
+                    yield prefix + name, filename, os.path.getsize(filename)
+
+    def gc(self, keep: int = None, max_age_days: float = None, max_bytes: int = None, now: float = None) -> dict:
+        '''
+        Removes the snapshots exceeding keep snapshots per host and kind or
+        older than max_age_days, then the oldest snapshots until the chunks
+        use at most max_bytes, and finally all unreferenced chunks.
+
+        Returns a dictionary with the removed snapshots and objects, the freed
+        bytes and the bytes used after the gc.
+        '''
+        now = time.time() if now == None else now
+        removed = list()
+        with self._locked(fcntl.LOCK_EX):
+            manifests = list(self._manifests())
+            refs = dict()
+            for filename, manifest, is_latest in manifests:
+                for digest in manifest['chunks']:
+                    refs[digest] = refs.get(digest, 0) + 1
+            sizes = dict((digest, size) for digest, filename, size in self._objects())
+            used = sum(size for digest, size in sizes.items() if refs.get(digest, 0) > 0)
+
+            def remove(filename, manifest):
+                nonlocal used
+                os.unlink(filename)
+                removed.append(filename)
+                for digest in manifest['chunks']:
+                    refs[digest] -= 1
+                    if refs[digest] == 0:
+                        used -= sizes.get(digest, 0)
+
+            candidates = list()
+            per_host = dict()
+            for filename, manifest, is_latest in reversed(manifests):
+                # newest first per host and kind
+                key = (manifest['host'], manifest['kind'])
+                per_host[key] = per_host.get(key, 0) + 1
+                if is_latest:
+                    continue
+                age = (now - os.path.getmtime(filename)) / 86400
+                if (keep != None and per_host[key] > keep) or (max_age_days != None and age > max_age_days):
+                    remove(filename, manifest)
+                else:
+                    candidates.append((manifest['timestamp'], filename, manifest))
+            if max_bytes != None:
+                for timestamp, filename, manifest in sorted(candidates):
+                    if used <= max_bytes:
+                        break
+                    remove(filename, manifest)
+
+            removed_objects = freed = 0
+            for digest, filename, size in self._objects():
+                if refs.get(digest, 0) <= 0:
+                    os.unlink(filename)
+                    removed_objects += 1
+                    freed += size
+        return {
+            'removed_snapshots': len(removed),
+            'removed_objects': removed_objects,
+            'freed_bytes': freed,
+            'used_bytes': sum(sizes.values()) - freed,
+        }
+
+    def stats(self) -> dict:
+        with self._locked(fcntl.LOCK_SH):
+            manifests = list(self._manifests())
+            objects = list(self._objects())
+        return {
+            'hosts': len(set(manifest['host'] for filename, manifest, is_latest in manifests)),
+            'snapshots': len(manifests),
+            'config_bytes': sum(manifest['size'] for filename, manifest, is_latest in manifests),
+            'objects': len(objects),
+            'used_bytes': sum(size for digest, filename, size in objects),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Snapshot store of ios configurations')
+    parser.add_argument('--store', required=True, help='directory of the store (config_store_dir)')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+    gc = sub.add_parser('gc', help='remove old snapshots and unreferenced chunks')
+    gc.add_argument('--keep', type=int, default=None, help='snapshots kept per host and kind')
+    gc.add_argument('--max-age-days', type=float, default=None, help='remove snapshots older than days')
+    gc.add_argument('--max-bytes', default=None, help='maximal size of the chunks, e.g. 500M or 2G')
+    get = sub.add_parser('get', help='print a configuration')
+    get.add_argument('host')
+    get.add_argument('--kind', choices=KINDS, default='running')
+    get.add_argument('--timestamp', default='', help='timestamp prefix (default: latest)')
+    history = sub.add_parser('history', help='list the snapshots of a host')
+    history.add_argument('host')
+    history.add_argument('--kind', choices=KINDS, default='running')
+    put = sub.add_parser('put', help='store a configuration file')
+    put.add_argument('host')
+    put.add_argument('filename')
+    put.add_argument('--kind', choices=KINDS, default='running')
+    sub.add_parser('stats', help='print the size of the store')
+    args = parser.parse_args(argv)
+
+    store = IosConfigSnapshotStore(args.store)
+    if args.command == 'gc':
+        res = store.gc(args.keep, args.max_age_days, parse_size(args.max_bytes) if args.max_bytes else None)
+        print(json.dumps(res, indent=2))
+    elif args.command == 'get':
+        config = store.get(args.host, args.kind, args.timestamp)
+        if config == None:
+            print("no snapshot of {}".format(args.host), file=sys.stderr)
+            return 1
+        print(config)
+    elif args.command == 'history':
+        for timestamp in store.history(args.host, args.kind):
+            print(timestamp)
+    elif args.command == 'put':
+        with open(args.filename) as f:
+            res = store.put(args.host, f.read(), args.kind)
+        del res['chunks']
+        print(json.dumps(res, indent=2))
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+from iosconfigcompliance import IosConfigFingerprint
+
+
+def file_digests(filenames) -> dict:
+    ''' filename -> sha1 of the file content, '' if the file doesn't exist '''
+    res = dict()
+    for filename in filenames or []:
+        try:
+            with open(filename, 'rb') as f:
+                res[filename] = hashlib.sha1(f.read()).hexdigest()
+        except (IOError, OSError):
+            res[filename] = ''
+    return res
+
+
+def input_fingerprint(config, ignore_regexp=None, data=None, filenames=None) -> str:
+    '''
+    Fingerprint of all inputs of a generated configuration.
+
+    Parameters
+    ----------
+
+    config: str, list
+        running-configuration, fingerprinted by its section fingerprints
+        (see IosConfigFingerprint), so volatile header lines (ignore_regexp),
+        comments and the banner delimiter don't change the result
+    data: dict
+        variables used by the templates (must be serializable as json)
+    filenames: list
+        files read by the generation (templates, vars files)
+
+    Returns
+    -------
+
+    str
+        sha1 hex digest
+    '''
+    sections = IosConfigFingerprint(config, ignore_regexp).sections()
+    h = hashlib.sha1()
+    for part in (sorted(sections.items()), data or {}, sorted(file_digests(filenames).items())):
+        h.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8', 'surrogatepass'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+class HostStateFile:
+    '''
+    Per-host input fingerprints of the last run in a json file.
+
+    The file may be shared by parallel ansible forks: every access holds a
+    fcntl lock on <filename>.lock (shared for reads, exclusive for updates)
+    and an update replaces the file atomically, so readers never see a
+    partially written file.
+
+        {
+            "R01": {"fingerprint": "<sha1>", "compliant": true, "updated": "2019-..."},
+            ...
+        }
+
+    Methods
+    -------
+
+    load(self) -> dict
+        the state of all hosts.
+    get(self, host) -> dict
+        the state of host or an empty dictionary.
+    is_unchanged(self, host, fingerprint) -> bool
+        True if fingerprint is the fingerprint of the last compliant run.
+    update(self, host, fingerprint, compliant) -> dict
+        stores the state of host and returns it.
+    '''
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    @contextmanager
+    def _locked(self, operation):
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        os.makedirs(dirname, exist_ok=True)
+        with open(self.filename + '.lock', 'a') as lock:
+            fcntl.flock(lock.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            # missing or damaged state file, everything is rebuilt
+            return dict()
+        return data if isinstance(data, dict) else dict()
+
+    def _write(self, data: dict):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)), prefix='.state-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.filename)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def load(self) -> dict:
+        with self._locked(fcntl.LOCK_SH):
+            return self._read()
+
+    def get(self, host: str) -> dict:
+        return self.load().get(host, dict())
+
+    def is_unchanged(self, host: str, fingerprint: str) -> bool:
+        state = self.get(host)
+        return state.get('fingerprint') == fingerprint and state.get('compliant') == True
+
+    def update(self, host: str, fingerprint: str, compliant: bool) -> dict:
+        state = {
+            'fingerprint': fingerprint,
+            'compliant': bool(compliant),
+            'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with self._locked(fcntl.LOCK_EX):
+            data = self._read()
+            data[host] = state
+            self._write(data)
+        return state
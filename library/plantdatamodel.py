@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+import yaml
+
+
+# pickled format, a cache of another version is rebuilt
+CACHE_VERSION = 1
+VARS_EXTENSIONS = ('.yml', '.yaml', '.json')
+
+
+def _vars_files(plant_dir: str) -> list:
+    ''' all vars files of plant_dir in the order of include_vars dir '''
+    res = list()
+    for root, dirs, files in os.walk(plant_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1] in VARS_EXTENSIONS:
+                res.append(os.path.join(root, name))
+    return res
+
+
+class _VarsLoader(yaml.SafeLoader):
+    ''' yaml.safe_load of the vars files, vault encrypted values are rejected '''
+    pass
+
+
+def _reject_vault(loader, node):
+    raise ValueError("vault encrypted values are not supported in the plant data{}".format(node.start_mark))
+
+
+_VarsLoader.add_constructor('!vault', _reject_vault)
+
+
+def _file_sha1(filename: str) -> str:
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class PlantDataModel:
+    '''
+    Data model of a plant (vars/<switch_location_group>: vlan_db.yml,
+    uplinks_db.yml) with precomputed indexes.
+
+    The vars files are read with yaml.safe_load, vault encrypted files and
+    values (!vault) raise ValueError: the model is pickled to cache_dir
+    and the filters have no access to the vault secrets.
+
+    The model is loaded once per process. If cache_dir is given the parsed
+    model and the indexes are pickled to <cache_dir>/<sha1 of plant_dir>.pickle
+    and shared by all processes (ansible forks). The cache is used as long as
+    the vars files are the same: a file with another mtime or size is
+    hashed and the cache is rebuilt only if the sha1 changed.
+
+    Attributes
+    ----------
+
+    data: dict
+        all variables of the vars files (like include_vars dir)
+    vlan_names: dict
+        vlan id -> vlan_name
+    vlans_by_deploy: dict
+        vlan group -> list of vlan ids in the order of vlan_defines
+    uplinks_by_host: dict
+        hostname -> {key: uplink} of all uplinks with the host as left or
+        right device, the uplink has the additional keys side ('left' or
+        'right') and device_remote
+
+    Methods
+    -------
+
+    load(cls, plant_dir, cache_dir='') -> PlantDataModel
+        the model of plant_dir, from the process or the file cache
+    device_vlans(self, groups) -> dict
+        vlan id -> {vlan_name, vlan_dhcp_snoop} of all vlans deployed to one
+        of groups (format of host_vars/<host>/device_vlans.yml)
+    '''
+    __loaded = dict()
+
+    def __init__(self, data: dict):
+        self.data = data
+        vlan_db = data.get('vlan_db') or {}
+        self.vlan_names = dict()
+        self.vlans_by_deploy = dict()
+        for vlan_id, define in (vlan_db.get('vlan_defines') or {}).items():
+            vlan_id = str(vlan_id)
+            self.vlan_names[vlan_id] = define.get('vlan_name', '')
+            for group in define.get('vlan_deploy') or []:
+                self.vlans_by_deploy.setdefault(group, list()).append(vlan_id)
+        self.uplinks_by_host = dict()
+        for key, uplink in (data.get('switch_uplinks') or {}).items():
+            hosts = key.split('_')
+            if len(hosts) < 2:
+                raise ValueError("invalid uplink key '{}', expected <left>_<right>[_<id>]".format(key))
+            for side, host, remote in (('left', hosts[0], hosts[1]), ('right', hosts[1], hosts[0])):
+                self.uplinks_by_host.setdefault(host, dict())[key] = dict(uplink, side=side, device_remote=remote)
+
+    def device_vlans(self, groups) -> dict:
+        if isinstance(groups, str):
+            groups = [groups]
+        ids = set()
+        for group in groups or []:
+            ids.update(self.vlans_by_deploy.get(group, []))
+        defines = (self.data.get('vlan_db') or {}).get('vlan_defines') or {}
+        res = dict()
+        for vlan_id, define in defines.items():
+            if str(vlan_id) in ids:
+                res[str(vlan_id)] = {
+                    'vlan_name': define.get('vlan_name', ''),
+                    'vlan_dhcp_snoop': define.get('vlan_dhcp_snoop', False) == True,
+                }
+        return res
+
+    @staticmethod
+    def _signature(plant_dir: str) -> dict:
+        ''' filename -> (mtime_ns, size) of all vars files '''
+        res = dict()
+        for filename in _vars_files(plant_dir):
+            st = os.stat(filename)
+            res[filename] = (st.st_mtime_ns, st.st_size)
+        return res
+
+    @staticmethod
+    def _parse(files: list) -> dict:
+        data = dict()
+        for filename in files:
+            with open(filename) as f:
+                content = yaml.load(f, Loader=_VarsLoader)
+            if content is None:
+                continue
+            if isinstance(content, str) and content.startswith('$ANSIBLE_VAULT;'):
+                raise ValueError("'{}' is vault encrypted, not supported in the plant data".format(filename))
+            if not isinstance(content, dict):
+                raise ValueError("'{}' must contain a dictionary".format(filename))
+            data.update(content)
+        return data
+
+    @classmethod
+    def _read_cache(cls, filename: str, signature: dict):
+        ''' (model, hashes) of a valid cache file, None if outdated '''
+        try:
+            with open(filename, 'rb') as f:
+                cached = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get('version') != CACHE_VERSION:
+            return None
+        if sorted(cached['signature']) != sorted(signature):
+            return None
+        changed = False
+        for name, stat in signature.items():
+            if tuple(cached['signature'][name]) != stat:
+                # touched file: only a changed content invalidates the cache
+                if _file_sha1(name) != cached['hashes'][name]:
+                    return None
+                changed = True
+        return cached['model'], cached['hashes'], changed
+
+    @staticmethod
+    def _write_cache(filename: str, model, signature: dict, hashes: dict):
+        cache_dir = os.path.dirname(filename)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix='.plant-')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'signature': signature, 'hashes': hashes, 'model': model},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, filename)
+        except (IOError, OSError):
+            # the file cache is optional
+            pass
+
+    @classmethod
+    def load(cls, plant_dir: str, cache_dir: str = ''):
+        plant_dir = os.path.abspath(os.path.expanduser(plant_dir))
+        if not os.path.isdir(plant_dir):
+            raise ValueError("plant directory '{}' not found".format(plant_dir))
+        signature = cls._signature(plant_dir)
+        loaded = cls.__loaded.get(plant_dir)
+        if loaded is not None and loaded[0] == signature:
+            return loaded[1]
+        cache_file = ''
+        if cache_dir:
+            cache_file = os.path.join(os.path.expanduser(cache_dir),
+                                      hashlib.sha1(plant_dir.encode('utf-8')).hexdigest() + '.pickle')
+            cached = cls._read_cache(cache_file, signature)
+            if cached is not None:
+                model, hashes, changed = cached
+                if changed:
+                    cls._write_cache(cache_file, model, signature, hashes)
+                cls.__loaded[plant_dir] = (signature, model)
+                return model
+        hashes = dict((name, _file_sha1(name)) for name in signature)
+        model = cls(cls._parse(list(signature)))
+        if cache_file:
+            cls._write_cache(cache_file, model, signature, hashes)
+        cls.__loaded[plant_dir] = (signature, model)
+        return model
+
+    @classmethod
+    def clear(cls):
+        ''' forget the models of this process '''
+        cls.__loaded.clear()
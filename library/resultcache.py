@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import hashlib
+from collections import OrderedDict
+
+from iosconfigregexp import config_digest
+
+
+def input_digest(config) -> str:
+    ''' content hash of a configuration given as string or list of lines '''
+    if isinstance(config, str):
+        return 's' + hashlib.sha1(config.encode('utf-8', 'surrogatepass')).hexdigest()
+    if config == None:
+        return 'n'
+    return 'l' + config_digest(config)
+
+
+def pattern_key(regexp) -> tuple:
+    ''' regexp (str or list) as hashable tuple, like IosConfigRegexp.regexplist '''
+    if regexp == None:
+        return tuple()
+    if isinstance(regexp, str):
+        return tuple(regexp.splitlines())
+    return tuple(regexp)
+
+
+def result_size(value) -> int:
+    ''' approximate size in bytes of a list of lines or a dict of such lists '''
+    if isinstance(value, dict):
+        return sum(result_size(v) for v in value.values())
+    return sum(len(li) + 8 for li in value)
+
+
+def copy_result(value):
+    ''' copy of a cached result, lines are shared '''
+    if isinstance(value, dict):
+        return dict((k, list(v)) for k, v in value.items())
+    return list(value)
+
+
+class LruResultCache:
+    '''
+    Bounded LRU cache for filter results.
+
+    At most max_entries results with an approximate total size of
+    max_bytes are kept. Results larger than max_bytes are not cached. The
+    least recently used results are evicted first.
+
+    Attributes
+    ----------
+
+    enabled: bool
+        get() misses and put() does nothing if False
+    hits, misses, evictions: int
+        counters since the last clear()
+
+    Methods
+    -------
+
+    get(self, key) -> object
+        copy of the cached result or None
+    put(self, key, value)
+        stores value (lists of lines or dict of lists of lines)
+    stats(self) -> dict
+        counters and current size
+    clear(self)
+        removes all results and resets the counters
+    '''
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, enabled=True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.clear()
+
+    def clear(self):
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.__entries.get(key) if self.enabled else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return copy_result(entry[0])
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        size = result_size(value)
+        if size > self.max_bytes:
+            return
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.__bytes -= old[1]
+        self.__entries[key] = (copy_result(value), size)
+        self.__bytes += size
+        while len(self.__entries) > self.max_entries or self.__bytes > self.max_bytes:
+            _, (_, evicted) = self.__entries.popitem(last=False)
+            self.__bytes -= evicted
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.__entries),
+            'bytes': self.__bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,250 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import sys
+import unittest
+
+import jinja2
+from ansible.errors import AnsibleFilterError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_plugins'))
+
+from client_intf_str import INTF_NAMES, SHORT_INTF_NAMES, interface_range_compress, interface_range_expand, \
+    interface_range_verify, parse_client_intf_str, parse_client_intf_str_many, parse_shorten_intf_str, \
+    parse_shorten_intf_str_many
+from test_iosconfigprofiles import TEMPLATE_DIR, stack_ports
+
+
+def legacy_client_intf_str(str):
+    ''' former if/elif implementation of parse_client_intf_str '''
+    id = str[:2].lower()
+    if id == u'fa':
+        _interface = u'FastEthernet'
+    elif id == u'gi':
+        _interface = u'GigabitEthernet'
+    elif id == u'te':
+        _interface = u'TenGigabitEthernet'
+    elif id == u'tw':
+        _interface = u'TwentyfiveGigabitEthernet'
+    elif id == u'fo':
+        _interface = u'FortyGigabitEthernet'
+    elif id == u'hu':
+        _interface = u'HundredGigabitEthernet'
+    elif id == u'ma':
+        _interface = u'Management'
+    elif id == u'lo':
+        _interface = u'Loopback'
+    elif id == u'et':
+        _interface = u'eth'
+    elif id == u'po':
+        _interface = u''
+    else:
+        raise AnsibleFilterError('client_intf_str: unknown category: %s' % id)
+    return {'name': _interface, 'number': str[2:]}
+
+
+def legacy_shorten_intf_str(str):
+    ''' former if/elif implementation of parse_shorten_intf_str '''
+    id = str.lower()
+    p = -1
+    for j, c in enumerate(id):
+        if c >= '0' and c <= '9':
+            p = j
+            break
+    if p == -1:
+        raise AnsibleFilterError('parse_shorten_intf_str: missing interface number: %s' % str)
+    ifn = id[:p].strip()
+    if (ifn == u'fastethernet') or (ifn == u'fa'):
+        _interface = u'Fa'
+    elif (ifn == u'gigabitethernet') or (ifn == u'gi'):
+        _interface = u'Gi'
+    elif (ifn == u'ten-gigabitethernet') or (ifn == u'te'):
+        _interface = u'Te'
+    elif (ifn == u'tengigabitethernet'):
+        _interface = u'Te'
+    elif (ifn == u'twentyfivegigabitethernet') or (ifn == u'tw'):
+        _interface = u'Tw'
+    elif (ifn == u'fortygigabitethernet') or (ifn == u'fo'):
+        _interface = u'Fo'
+    elif (ifn == u'hundredgigabitethernet') or (ifn == u'hu'):
+        _interface = u'Hu'
+    elif (ifn == u'management') or (ifn == u'Ma') or (ifn == u'mgmt'):
+        _interface = u'Ma'
+    elif (ifn == u'loopback') or (ifn == u'lo'):
+        _interface = u'Lo'
+    elif (ifn == u'eth') or (ifn == u'et'):
+        _interface = u'et'
+    elif (ifn == u''):
+        _interface = u'Po'
+    else:
+        raise AnsibleFilterError('parse_shorten_intf_str: unknown category: %s' % str)
+    return {'name': _interface, 'number': str[p:]}
+
+
+def _result(func, intf):
+    ''' result or error message of func(intf) '''
+    try:
+        return func(intf)
+    except AnsibleFilterError as e:
+        return str(e)
+
+
+class TestIntfStr(unittest.TestCase):
+
+    def setUp(self):
+        self.client_intfs = list()
+        for prefix, name in INTF_NAMES.items():
+            for intf in [prefix, prefix.upper(), prefix.capitalize(), name]:
+                self.client_intfs.extend([intf + '1/0/1', intf + '10', intf])
+        self.shorten_intfs = list()
+        for name in SHORT_INTF_NAMES:
+            for intf in [name, name.upper(), name.capitalize()]:
+                self.shorten_intfs.extend([intf + '1/0/1', intf + ' 2/0/48', intf + '10'])
+
+    def test_client_intf_str_legacy(self):
+        for intf in self.client_intfs:
+            self.assertEqual(_result(parse_client_intf_str, intf), _result(legacy_client_intf_str, intf),
+                             "Result differs for '{}'".format(intf))
+        res = parse_client_intf_str('Gi1/0/1')
+        res['name'] = 'changed'
+        self.assertEqual(parse_client_intf_str('Gi1/0/1')['name'], 'GigabitEthernet', "Cached result modified")
+
+    def test_shorten_intf_str_legacy(self):
+        for intf in self.shorten_intfs:
+            if intf[:2].lower() == 'ma' and intf.lower()[:4] not in ('mana', 'mgmt'):
+                continue
+            self.assertEqual(_result(parse_shorten_intf_str, intf), _result(legacy_shorten_intf_str, intf),
+                             "Result differs for '{}'".format(intf))
+        # the short name 'Ma' was never matched by the former implementation
+        self.assertEqual(_result(legacy_shorten_intf_str, 'Ma1'),
+                         "parse_shorten_intf_str: unknown category: Ma1", "Invalid legacy result")
+        self.assertEqual(parse_shorten_intf_str('Ma1'), {'name': 'Ma', 'number': '1'}, "'Ma' not accepted")
+        self.assertEqual(parse_shorten_intf_str('ma 0'), {'name': 'Ma', 'number': '0'}, "'ma' not accepted")
+
+    def test_intf_str_invalid(self):
+        for func, legacy, intf, msg in [
+                (parse_client_intf_str, legacy_client_intf_str, 'Xe1/0/1', "client_intf_str: unknown category: xe"),
+                (parse_client_intf_str, legacy_client_intf_str, 'mgmt0', "client_intf_str: unknown category: mg"),
+                (parse_shorten_intf_str, legacy_shorten_intf_str, 'GigabitEthernet',
+                 "parse_shorten_intf_str: missing interface number: GigabitEthernet"),
+                (parse_shorten_intf_str, legacy_shorten_intf_str, 'Gigabit1/0/1',
+                 "parse_shorten_intf_str: unknown category: Gigabit1/0/1")]:
+            self.assertEqual(_result(func, intf), msg, "Invalid error message")
+            self.assertEqual(_result(legacy, intf), msg, "Error message changed")
+        with self.assertRaisesRegex(AnsibleFilterError, "client_intf_str_many: list of interface names expected"):
+            parse_client_intf_str_many('Gi1/0/1')
+        with self.assertRaisesRegex(AnsibleFilterError, "shorten_intf_str_many: list of interface names expected"):
+            parse_shorten_intf_str_many(10)
+        with self.assertRaisesRegex(AnsibleFilterError, "unknown category: xe"):
+            parse_client_intf_str_many(['Gi1/0/1', 'Xe1/0/1'])
+
+    def test_intf_str_many(self):
+        intfs = [intf for intf in self.client_intfs if intf[:2].lower() in INTF_NAMES]
+        self.assertEqual(parse_client_intf_str_many(intfs), [parse_client_intf_str(i) for i in intfs],
+                         "Invalid client_intf_str_many")
+        intfs = self.shorten_intfs
+        self.assertEqual(parse_shorten_intf_str_many(intfs), [parse_shorten_intf_str(i) for i in intfs],
+                         "Invalid shorten_intf_str_many")
+        ports = {'GigabitEthernet1/0/1': [{}], 'Te1/1/4': [{}]}
+        self.assertEqual(parse_shorten_intf_str_many(ports), [{'name': 'Gi', 'number': '1/0/1'},
+                                                              {'name': 'Te', 'number': '1/1/4'}],
+                         "Keys of a dictionary not used")
+        self.assertEqual(parse_client_intf_str_many([]), [], "Invalid empty list")
+
+
+class TestInterfaceRange(unittest.TestCase):
+
+    def test_interface_range_compress(self):
+        config = "\n".join([
+            "hostname R01",
+            "interface GigabitEthernet1/0/1",
+            " switchport mode access",
+            "!",
+            "interface GigabitEthernet1/0/2",
+            " description Printer",
+            " switchport mode access",
+            "!",
+            "interface GigabitEthernet1/0/3",
+            " switchport mode access",
+            "!",
+            "interface GigabitEthernet1/0/5",
+            " switchport mode access",
+            "!",
+            "interface Vlan10",
+            " switchport mode access",
+            "!",
+            "interface Vlan11",
+            " switchport mode access",
+            "!",
+            "end",
+        ]) + "\n"
+        res = interface_range_compress(config)
+        self.assertEqual(res, "\n".join([
+            "hostname R01",
+            "interface range GigabitEthernet1/0/1 - 3",
+            " switchport mode access",
+            "!",
+            "interface GigabitEthernet1/0/2",
+            " description Printer",
+            "!",
+            "interface GigabitEthernet1/0/5",
+            " switchport mode access",
+            "!",
+            "interface Vlan10",
+            " switchport mode access",
+            "!",
+            "interface Vlan11",
+            " switchport mode access",
+            "!",
+            "end",
+        ]) + "\n", "Invalid interface range")
+        self.assertEqual(interface_range_expand(res), config, "Invalid expanded configuration")
+        self.assertTrue(interface_range_verify(res, config)['equivalent'], "Not equivalent")
+        res = interface_range_verify(res.replace(" - 3", " - 4"), config)
+        self.assertEqual((res['equivalent'], res['line']), (False, 12), "Difference not found")
+        self.assertEqual(interface_range_compress(config, 4), config, "Invalid min_range")
+
+    def test_interface_range_delta(self):
+        # merge-mode change set: blocks without '!'
+        delta = []
+        for i in range(1, 9):
+            delta += ["interface GigabitEthernet1/0/{}".format(i), " no switchport access vlan 10",
+                      " switchport access vlan 20"]
+        delta.insert(4, " description Printer")
+        delta += ["interface GigabitEthernet1/0/9", " description moved", "no vlan 10"]
+        res = interface_range_compress(delta)
+        self.assertEqual(res.splitlines(), [
+            "interface range GigabitEthernet1/0/1 - 8",
+            " no switchport access vlan 10",
+            " switchport access vlan 20",
+            "interface GigabitEthernet1/0/2",
+            " description Printer",
+            "interface GigabitEthernet1/0/9",
+            " description moved",
+            "no vlan 10",
+        ], "Invalid interface range")
+        self.assertTrue(interface_range_verify(res, delta)['equivalent'], "Not equivalent")
+
+    def test_interface_range_stack(self):
+        env = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+                                 trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True)
+        template = env.get_template('config_client_interfaces.j2')
+        for seed in range(5):
+            conf_client_ports, switch_interfaces = stack_ports(seed=seed)
+            # runs of equal ports like on real access stacks
+            for intf in list(conf_client_ports)[seed * 40:]:
+                conf_client_ports[intf] = [dict(conf_client_ports[intf][0], port_type='ptype_dot1x', vlan_id='',
+                                                is_enabled=True)]
+            config = template.render({'conf_client_ports': conf_client_ports, 'config_group': 'NO_CONFIG_GROUP',
+                                      'switchport_voice_vlan_id': '40'})
+            res = interface_range_compress(config)
+            self.assertLess(len(res), len(config) / 2, "Configuration not compressed")
+            self.assertTrue(interface_range_verify(res, config)['equivalent'], "Not equivalent")
+            self.assertEqual(interface_range_expand(res), config, "Invalid expanded configuration")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import tempfile
+import unittest
+
+from configlines import ConfigLines, ConfigLinesBuilder
+
+
+class TestConfigLines(unittest.TestCase):
+
+    def setUp(self):
+        self.text = "hostname R01\r\n!\ninterface Gi1/0/1\n description \x85 x\n\n!\rend"
+
+    def test_configlines_splitlines(self):
+        cl = ConfigLines(self.text)
+        self.assertEqual(cl, self.text.splitlines(), "Invalid lines")
+        self.assertEqual(len(cl), 8, "Invalid length")
+        self.assertEqual(cl[-1], "end", "Invalid line")
+        self.assertEqual(ConfigLines(self.text.encode('utf-8')),
+                         [l.decode('utf-8') for l in self.text.encode('utf-8').splitlines()], "Invalid lines")
+        self.assertEqual(ConfigLines("a\n"), ["a"], "Invalid trailing newline")
+        self.assertEqual(len(ConfigLines()), 0, "Invalid empty ConfigLines")
+        with self.assertRaises(IndexError):
+            cl[8]
+
+    def test_configlines_views(self):
+        cl = ConfigLines(self.text)
+        view = cl[2:5]
+        self.assertIs(view._buf, cl._buf, "Slice does not share the buffer")
+        self.assertEqual(view, ["interface Gi1/0/1", " description ", " x"], "Invalid slice")
+        self.assertEqual(view[1:], ConfigLines.from_lines([" description ", " x"]), "Invalid slice of slice")
+
+        b = ConfigLinesBuilder(cl)
+        b.extend(cl[:2])
+        b.append("\x03")
+        b.extend(view[:1])
+        res = b.build()
+        self.assertIs(res._buf, cl._buf, "Result does not share the buffer")
+        self.assertEqual(res, ["hostname R01", "!", "\x03", "interface Gi1/0/1"], "Invalid result")
+        self.assertEqual(res[1:3], ["!", "\x03"], "Invalid slice with extra lines")
+
+    def test_configlines_from_file(self):
+        with tempfile.NamedTemporaryFile('wb', delete=False) as f:
+            f.write(self.text.encode('utf-8'))
+        try:
+            self.assertEqual(ConfigLines.from_file(f.name), ConfigLines(self.text.encode('utf-8')), "Invalid lines")
+            self.assertEqual(ConfigLines.from_file(f.name, False), ConfigLines(self.text.encode('utf-8')), "Invalid lines")
+        finally:
+            os.unlink(f.name)
+
+if __name__ == '__main__':
+    unittest.main()
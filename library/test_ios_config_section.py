@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from ansible.errors import AnsibleFilterError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_plugins'))
+
+import ios_config_section
+from ios_config_section import FilterModule
+
+
+class TestIosConfigFileFilters(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filters = FilterModule()
+        self.config = [
+            "hostname R01",
+            "!",
+            "interface GigabitEthernet1/0/1",
+            " description Prüfstand",
+            "!",
+            "banner motd ^C",
+            "motd",
+            "^C",
+            "end",
+        ]
+        self.src = self._write('running.cfg', self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, lines):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        return filename
+
+    def _read(self, filename):
+        with open(filename, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_ios_config_file_identical(self):
+        for operation, regexp in [('extract', [r"^interface\s+.*$$", r"^banner\s+.*\^C$$"]),
+                                  ('remove', [r"^banner\s+.*\^C$$", r"^end$$"])]:
+            dest = os.path.join(self.tmpdir, operation + '.cfg')
+            count = getattr(self.filters, 'ios_config_file_' + operation)(self.src, regexp, filename=dest)
+            expected = getattr(self.filters, 'ios_config_section_' + operation)(self.config, regexp)
+            self.assertEqual(self._read(dest), expected, "Output differs from ios_config_section_" + operation)
+            self.assertEqual(count, len(expected), "Invalid line count")
+
+    def test_ios_config_file_empty(self):
+        dest = os.path.join(self.tmpdir, 'empty.cfg')
+        self.assertEqual(self.filters.ios_config_file_extract(self.src, [r"^vlan\s+\d+$$"], filename=dest), 0,
+                         "Invalid line count")
+        self.assertFalse(os.path.exists(dest), "File created for an empty result")
+        with self.assertRaisesRegex(AnsibleFilterError, "filename for the result is required"):
+            self.filters.ios_config_file_remove(self.src, [r"^end$$"])
+
+    def test_ios_config_file_error(self):
+        src = self._write('unterminated.cfg', ["hostname R01", "banner login ^C", "login"] + ["line"] * 100)
+        dest = self._write('remove.cfg', ["previous"])
+        with self.assertRaisesRegex(AnsibleFilterError, "Missing block-end"):
+            self.filters.ios_config_file_remove(src, [r"^banner\s+.*\^C$$"], filename=dest)
+        self.assertEqual(self._read(dest), ["previous"], "Destination changed on error")
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['remove.cfg', 'running.cfg', 'unterminated.cfg'],
+                         "Temporary file left behind")
+
+    def test_ios_config_partition_metrics(self):
+        rules = {'banners': {'action': 'extract', 'regexp': [r"^banner\s+.*\^C$$"]},
+                 'managed': {'action': 'remove', 'regexp': [r"^end$$"]}}
+        with mock.patch.dict(os.environ, {ios_config_section.METRICS_ENV: '1'}), \
+                mock.patch.dict(ios_config_section._METRICS, clear=True):
+            # an empty configuration is computed, not cached
+            for config in [[], self.config, self.config]:
+                self.filters.ios_config_partition(config, rules, 'unmanaged')
+            metrics = self.filters.ios_config_section_metrics()['ios_config_partition']
+        self.assertEqual((metrics['calls'], metrics['cached']), (3, 1), "Invalid cached calls")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import jinja2
+import yaml
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(BASE_DIR, 'action_plugins'))
+sys.path.append(os.path.join(BASE_DIR, 'filter_plugins'))
+
+from ios_managed_config import ActionModule, TEMPLATES
+from ios_config_assemble import FilterModule as AssembleFilters
+from ios_config_interfaces import FilterModule as InterfacesFilters
+from ios_config_section import FilterModule as SectionFilters
+
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+DELETE_SECTION_REGEX = [
+    r"^Building\s+configuration.*$$",
+    r"^Current\s+configuration.*$$",
+    r"^vlan\s+\d*$$",
+    r"^ip access-list\s+standard\s+emergency-access$$",
+    r"^banner\s+.*\^C$$",
+    r"^end$$",
+]
+RUNNING_CONFIG = "\n".join([
+    "Building configuration...",
+    "!",
+    "hostname R01",
+    "!",
+    "vlan 10",
+    " name CLIENT",
+    "!",
+    "interface GigabitEthernet1/0/1",
+    " switchport mode access",
+    " switchport voice vlan 40",
+    "!",
+    "interface GigabitEthernet1/0/2",
+    " description old",
+    "!",
+    "interface GigabitEthernet1/0/6",
+    " description ignored",
+    "!",
+    "interface Vlan10",
+    " ip address 192.168.13.2 255.255.254.0",
+    "!",
+    "banner login ^C",
+    "login",
+    "^C",
+    "banner motd ^C",
+    "motd",
+    "^C",
+    "end",
+])
+
+
+def _environment(searchpath):
+    return jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath), trim_blocks=True, lstrip_blocks=True,
+                              keep_trailing_newline=True)
+
+
+class _Templar:
+    ''' Templar of the action plugin, the templates only use jinja2 filters '''
+
+    def __init__(self, searchpath=None, available_variables=None):
+        self.env = _environment(searchpath or [])
+        self.available_variables = available_variables or {}
+
+    def template(self, data, **kw):
+        if not isinstance(data, str):
+            return data
+        return self.env.from_string(data).render(self.available_variables)
+
+    def copy_with_new_env(self, searchpath=None, available_variables=None):
+        return _Templar(searchpath, available_variables)
+
+
+class _Loader:
+
+    def get_text_file_contents(self, filename):
+        with open(filename, encoding='utf-8') as f:
+            return f.read()
+
+
+def host_vars(host):
+    ''' variables of host as read by the inventory (lab group and host_vars) '''
+    res = dict()
+    for filename in [os.path.join(BASE_DIR, 'group_vars', 'lab.yml')] + \
+            sorted(glob.glob(os.path.join(BASE_DIR, 'host_vars', host, '*.yml'))):
+        with open(filename) as f:
+            res.update(yaml.safe_load(f) or {})
+    res.update({
+        'inventory_hostname': host,
+        'ansible_host': '192.168.13.2',
+        'ansible_network_os': 'ios',
+        'ansible_net_hostname': host,
+        'ansible_net_version': '15.2(4)E5',
+        'ansible_net_model': 'WS-C3560CX-8XPD-S',
+        'ansible_net_serialnum': 'FOC0000X000',
+        'template_dir': TEMPLATE_DIR,
+    })
+    return res
+
+
+class TestIosManagedConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.task_vars = host_vars('R01')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _run(self, dest, check_mode=False):
+        args = {'src_config': RUNNING_CONFIG, 'dest': dest, 'delete_section_regex': DELETE_SECTION_REGEX,
+                'render_cache_dir': ''}
+        task = SimpleNamespace(args=args, async_val=0, check_mode=check_mode, action='ios_managed_config')
+        connection = SimpleNamespace(_shell=SimpleNamespace(tmpdir=self.tmpdir))
+        action = ActionModule(task, connection, SimpleNamespace(check_mode=check_mode), _Loader(),
+                              _Templar(available_variables=self.task_vars))
+        return action.run(task_vars=self.task_vars)
+
+    def _filter_pipeline(self, dest):
+        ''' former filter and template pipeline of inc_set_managed_configuration_ios.yml '''
+        variables = dict(self.task_vars)
+        config_group = variables['config_group']
+        env = _environment([os.path.join(TEMPLATE_DIR, 'ios', config_group), os.path.join(TEMPLATE_DIR, 'ios'),
+                            TEMPLATE_DIR])
+        variables['switch_interfaces'] = InterfacesFilters().ios_config_interfaces(RUNNING_CONFIG)
+        variables.update(yaml.safe_load(env.get_template('gen_managed_client_interface_list.j2').render(variables)))
+        rules = {
+            'banner_motd': {'action': 'extract', 'regexp': r"^banner\s+motd\s+\^C$$"},
+            'banner_login': {'action': 'extract', 'regexp': r"^banner\s+login\s+\^C$$"},
+            'banner_exec': {'action': 'extract', 'regexp': r"^banner\s+exec\s+\^C$$"},
+            'banner_incoming': {'action': 'extract', 'regexp': r"^banner\s+incoming\s+\^C$$"},
+            'banner_slip_ppp': {'action': 'extract', 'regexp': r"^banner\s+slip-ppp\s+\^C$$"},
+            'managed_sections': {'action': 'remove', 'regexp': DELETE_SECTION_REGEX},
+            'managed_client_ports': {'action': 'remove', 'regexp': variables['managed_client_ports'],
+                                     'prefix_str': r"interface\s+"},
+        }
+        part = SectionFilters().ios_config_partition(RUNNING_CONFIG, rules, 'unmanaged')
+        variables['display_core'] = ''
+        fragments = dict((item['key'], env.get_template(item['template']).render(variables)) for item in TEMPLATES)
+        fragments.update({
+            '0001_unmanaged_configuration': part['unmanaged'],
+            '9000_banner_motd': [],
+            '9001_banner_login': part['banner_login'],
+            '9002_banner_exec': part['banner_exec'],
+            '9003_banner_incoming': part['banner_incoming'],
+            '9003_banner_slip-ppp': part['banner_slip_ppp'],
+            '9999_end': 'end',
+        })
+        return AssembleFilters().ios_config_assemble(fragments, dest, 'ios'), variables['managed_client_ports']
+
+    def test_ios_managed_config_identical(self):
+        dest = os.path.join(self.tmpdir, 'R01_managed_configuration.ios')
+        res = self._run(dest)
+        self.assertFalse(res.get('failed'), res.get('msg'))
+        self.assertTrue(res['changed'], "Configuration not written")
+
+        expected = os.path.join(self.tmpdir, 'R01_filters.ios')
+        assembled, ports = self._filter_pipeline(expected)
+        with open(dest, 'rb') as f, open(expected, 'rb') as g:
+            self.assertEqual(f.read(), g.read(), "Output differs from the filter pipeline")
+        self.assertEqual(res['checksum'], assembled['checksum'], "Invalid checksum")
+        self.assertEqual(res['fragments'], assembled['fragments'], "Invalid fragments")
+        self.assertEqual(res['managed_client_ports'], ports, "Invalid managed client ports")
+        self.assertIn("interface GigabitEthernet1/0/6", res['config'], "Ignored client port removed")
+        self.assertFalse(self._run(dest)['changed'], "Unchanged configuration written")
+
+    def test_ios_managed_config_check_mode(self):
+        dest = os.path.join(self.tmpdir, 'R01_managed_configuration.ios')
+        res = self._run(dest, check_mode=True)
+        self.assertFalse(res.get('failed'), res.get('msg'))
+        self.assertTrue(res['changed'], "Change not reported in check mode")
+        self.assertFalse(os.path.exists(dest), "Configuration written in check mode")
+
+if __name__ == '__main__':
+    unittest.main()
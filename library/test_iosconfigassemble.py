@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from iosconfigassemble import IosConfigAssembler
+
+
+class TestIosConfigAssembler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fragments = {
+            '9999_end': "end",
+            '0010_vlan_configuration': "vlan 10\n name CLIENT\n!",
+            '0001_unmanaged_configuration': ["hostname R01", "!"],
+            '9003_banner_slip-ppp': [],
+            '9003_banner_incoming': ["banner incoming \x03", "\x03"],
+            '9000_banner_motd': None,
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_iosconfigassemble_content(self):
+        asm = IosConfigAssembler(self.fragments)
+        self.assertEqual([key for key, data in asm.ordered()],
+                         ['0001_unmanaged_configuration', '0010_vlan_configuration', '9003_banner_incoming', '9999_end'],
+                         "Invalid fragment order")
+        self.assertEqual(asm.content().decode('utf-8').splitlines(),
+                         ["hostname R01", "!", "vlan 10", " name CLIENT", "!", "banner incoming \x03", "\x03", "end"],
+                         "Invalid assembled configuration")
+
+    def test_iosconfigassemble_write(self):
+        dest = os.path.join(self.tmpdir, 'R01_managed_configuration.ios')
+        asm = IosConfigAssembler(self.fragments)
+        res = asm.write(dest, check_mode=True)
+        self.assertTrue(res['changed'], "Change not reported in check mode")
+        self.assertFalse(os.path.exists(dest), "Configuration written in check mode")
+        res = asm.write(dest)
+        self.assertTrue(res['changed'], "Configuration not written")
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), asm.content(), "Invalid file content")
+        self.assertFalse(asm.write(dest)['changed'], "Unchanged configuration written")
+
+        files = asm.dump(self.tmpdir, 'R01_')
+        self.assertEqual(os.path.basename(files[0]), 'R01_0001_unmanaged_configuration.ios', "Invalid fragment filename")
+        self.assertEqual(len(os.listdir(self.tmpdir)), 5, "Invalid fragment files")
+
+if __name__ == '__main__':
+    unittest.main()
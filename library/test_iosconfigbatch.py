@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import iosconfigbatch
+
+
+class TestIosConfigBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.config_dir = os.path.join(self.tmpdir, 'backups')
+        self.host_vars_dir = os.path.join(self.tmpdir, 'host_vars')
+        self.out_dir = os.path.join(self.tmpdir, 'compiled')
+        os.makedirs(self.config_dir)
+        os.makedirs(os.path.join(self.host_vars_dir, 'R01'))
+        with open(os.path.join(self.config_dir, 'R01.cfg'), 'w') as f:
+            f.write("\n".join([
+                "Building configuration...",
+                "!",
+                "hostname R01",
+                "!",
+                "interface GigabitEthernet1/0/1",
+                " switchport mode access",
+                "!",
+                "interface GigabitEthernet1/0/2",
+                " description ignored",
+                "!",
+                "banner login ^C",
+                "login",
+                "^C",
+                "banner motd ^C",
+                "motd",
+                "^C",
+                "end",
+            ]) + "\n")
+        with open(os.path.join(self.config_dir, 'R02.cfg'), 'w') as f:
+            f.write("banner login ^C\nmissing end\n")
+        with open(os.path.join(self.host_vars_dir, 'R01', 'conf_client_ports.yml'), 'w') as f:
+            f.write("conf_client_ports:\n"
+                    "  GigabitEthernet1/0/1: [{ port_type: ptype_vlan }]\n"
+                    "  GigabitEthernet1/0/2: [{ port_type: ptype_ignore }]\n")
+        with open(os.path.join(self.host_vars_dir, 'R01', 'R01.yml'), 'w') as f:
+            f.write("config_group: C3560\n")
+        with open(os.path.join(self.host_vars_dir, 'R02.yml'), 'w') as f:
+            f.write("config_group: NO_CONFIG_GROUP\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_iosconfigbatch_delete_section_regex(self):
+        regex = iosconfigbatch.load_delete_section_regex(
+            os.path.join(iosconfigbatch.BASE_DIR, 'include', 'inc_set_managed_configuration_ios.yml'))
+        self.assertIn(r"^end$$", regex, "Invalid delete_section_regex")
+
+    def test_iosconfigbatch_run_batch(self):
+        jobs = iosconfigbatch.host_jobs(self.config_dir, self.host_vars_dir, self.out_dir, [r"^Building\s+configuration.*$$",
+                                        r"^banner\s+.*\^C$$", r"^end$$"])
+        self.assertEqual([j['host'] for j in jobs], ['R01', 'R02'], "Invalid jobs")
+        self.assertEqual(jobs[0]['ports'], ['GigabitEthernet1/0/1'], "Invalid managed client ports")
+
+        res = list(iosconfigbatch.run_batch(jobs, 2))
+        self.assertEqual(res[0]['error'], '', "Unexpected error")
+        self.assertEqual(res[0]['lines'], 17, "Invalid lines")
+        self.assertTrue(res[1]['error'].startswith("Error in IosConfigRegexp"), "Missing error")
+
+        host_tmpdir = os.path.join(self.out_dir, 'R01')
+        self.assertEqual(sorted(os.listdir(host_tmpdir)),
+                         ['R01_0001_unmanaged_configuration.ios', 'R01_9001_banner_login.ios'], "Invalid fragments")
+        with open(os.path.join(host_tmpdir, 'R01_0001_unmanaged_configuration.ios')) as f:
+            self.assertEqual(f.read().splitlines(), ["!", "hostname R01", "!", "interface GigabitEthernet1/0/2",
+                                                     " description ignored", "!"], "Invalid unmanaged configuration")
+
+    def test_iosconfigbatch_config_group(self):
+        # config_group of a group (group_vars) is only known to the inventory
+        os.remove(os.path.join(self.host_vars_dir, 'R01', 'R01.yml'))
+        jobs = iosconfigbatch.host_jobs(self.config_dir, self.host_vars_dir, self.out_dir, [], pattern='R01.cfg')
+        res = list(iosconfigbatch.run_batch(jobs, 1))
+        self.assertEqual(res[0]['error'], "config_group of 'R01' is not defined in host_vars, use --inventory",
+                         "Missing config_group accepted")
+
+        inventory = os.path.join(self.tmpdir, 'inventory.json')
+        with open(inventory, 'w') as f:
+            json.dump({'_meta': {'hostvars': {'R01': {
+                'config_group': 'C6800',
+                'conf_client_ports': {'GigabitEthernet1/0/1': [{'port_type': 'ptype_vlan'}]}}}},
+                'vss': {'hosts': ['R01']}}, f)
+        jobs = iosconfigbatch.host_jobs(self.config_dir, self.host_vars_dir, self.out_dir, [r"^banner\s+.*\^C$$"],
+                                        pattern='R01.cfg', inventory_vars=iosconfigbatch.load_inventory_vars(inventory))
+        self.assertEqual(jobs[0]['config_group'], 'C6800', "Invalid config_group")
+        res = list(iosconfigbatch.run_batch(jobs, 1))
+        self.assertEqual(res[0]['error'], '', "Unexpected error")
+        self.assertIn('R01_9000_banner_motd.ios', os.listdir(os.path.join(self.out_dir, 'R01')),
+                      "Banner motd of the VSS stack dropped")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import asyncio
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import iosconfigcollector
+
+
+SHOW_VERSION = "\n".join([
+    "Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(4)E6, RELEASE SOFTWARE (fc1)",
+    "{hostname} uptime is 1 week, 2 days, 3 hours, 4 minutes",
+    "cisco WS-C2960X-48FPD-L (APM86XXX) processor (revision V02) with 524288K bytes of memory.",
+    "Processor board ID FOC0000X{index:03}",
+    "Model number                    : WS-C2960X-48FPD-L",
+    "System serial number            : FOC0000X{index:03}",
+    "Model number                    : WS-C2960X-48FPD-L",
+    "System serial number            : FOC0000Y{index:03}",
+])
+
+RUNNING_CONFIG = "\n".join([
+    "Building configuration...",
+    "",
+    "Current configuration : 120 bytes",
+    "!",
+    "hostname {hostname}",
+    "!",
+    "interface GigabitEthernet1/0/1",
+    " description R01#",
+    "!",
+    "banner motd ^C",
+    "motd",
+    "^C",
+    "end",
+])
+
+
+class FakeCliServer(object):
+    '''
+    Local CLI server on 127.0.0.1 in a thread. Every connection is a device
+    named by the order of the connections (D000, D001, ...). Devices in
+    hang do not answer show commands.
+    '''
+
+    def __init__(self, hang=(), enable_secret='secret'):
+        self.hang = set(hang)
+        self.enable_secret = enable_secret
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, '127.0.0.1', 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def _shutdown(self):
+        self.server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def handle(self, reader, writer):
+        index = self.connections
+        self.connections += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        hostname = 'D{:03}'.format(index)
+        prompt = hostname + '>'
+        try:
+            writer.write("\r\nUser Access Verification\r\n\r\n{}".format(prompt).encode())
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip()
+                if command == 'exit':
+                    break
+                # echo like the device
+                writer.write((command + "\r\n").encode())
+                if command == 'enable':
+                    writer.write(b"Password: ")
+                    secret = (await reader.readline()).decode().strip()
+                    if secret == self.enable_secret:
+                        prompt = hostname + '#'
+                    else:
+                        writer.write(b"% Bad secrets\r\n")
+                elif command.startswith('show') and hostname in self.hang:
+                    # until the client closes the connection
+                    await reader.read()
+                    break
+                elif command == 'show running-config':
+                    writer.write(RUNNING_CONFIG.format(hostname=hostname).replace("\n", "\r\n").encode() + b"\r\n")
+                elif command == 'show version':
+                    writer.write(SHOW_VERSION.format(hostname=hostname, index=index).replace("\n", "\r\n").encode() + b"\r\n")
+                elif command == 'show archive':
+                    writer.write(b"The maximum archive configurations allowed is 10.\r\n")
+                writer.write(("\r\n" + prompt).encode())
+                await writer.drain()
+        finally:
+            self.active -= 1
+            writer.close()
+
+
+class TestIosConfigCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _options(self, server, **kw):
+        options = {'transport': 'tcp', 'port': server.port, 'enable_secret': 'secret',
+                   'concurrency': 4, 'timeout': 5, 'out_dir': self.tmpdir}
+        options.update(kw)
+        return options
+
+    def _devices(self, count):
+        return [{'host': 'H{:03}'.format(i), 'address': '127.0.0.1', 'port': None} for i in range(count)]
+
+    def test_iosconfigcollector_parse_version(self):
+        facts = iosconfigcollector.parse_version(SHOW_VERSION.format(hostname='R01', index=1))
+        self.assertEqual(facts['ansible_net_hostname'], 'R01', "Invalid hostname")
+        self.assertEqual(facts['ansible_net_version'], '15.2(4)E6', "Invalid version")
+        self.assertEqual(facts['ansible_net_model'], 'WS-C2960X-48FPD-L', "Invalid model")
+        self.assertEqual(facts['ansible_net_serialnum'], 'FOC0000X001', "Invalid serialnum")
+        self.assertEqual(facts['ansible_net_stacked_serialnums'], ['FOC0000X001', 'FOC0000Y001'], "Invalid stack")
+        self.assertNotIn('ansible_net_stacked_models', iosconfigcollector.parse_version("Version 15.0 "))
+
+    def test_iosconfigcollector_collect(self):
+        server = FakeCliServer()
+        try:
+            reported = list()
+            summary = iosconfigcollector.collect(self._devices(12), self._options(server), reported.append)
+        finally:
+            server.stop()
+        self.assertEqual(summary['devices'], 12, "Invalid number of devices")
+        self.assertEqual(summary['failed'], 0, "Failed devices: {}".format(summary['results']))
+        self.assertEqual(len(reported), 12, "Not all devices reported")
+        self.assertGreater(summary['devices_per_second'], 0, "Invalid throughput")
+        # one session per device within the concurrency limit
+        self.assertEqual(server.connections, 12, "Invalid number of sessions")
+        self.assertLessEqual(server.max_active, 4, "Concurrency limit exceeded")
+        with open(os.path.join(self.tmpdir, 'H000.cfg')) as f:
+            config = f.read()
+        self.assertTrue(config.startswith("Building configuration...\n"), "Invalid running configuration")
+        self.assertIn(" description R01#\n", config, "Prompt like line missing")
+        self.assertTrue(config.endswith("banner motd ^C\nmotd\n^C\nend\n"), "Invalid end of configuration")
+        with open(os.path.join(self.tmpdir, 'H000.json')) as f:
+            facts = json.load(f)
+        self.assertTrue(facts['ansible_net_hostname'].startswith('D'), "Invalid hostname")
+        self.assertTrue(facts['collected_archive_enabled'], "Archive not enabled")
+        self.assertEqual(facts['collected_error'], '', "Invalid error")
+        with open(os.path.join(self.tmpdir, iosconfigcollector.SUMMARY_FILENAME)) as f:
+            self.assertEqual(json.load(f)['devices'], 12, "Invalid summary")
+
+    def test_iosconfigcollector_timeout(self):
+        server = FakeCliServer(hang=['D000'])
+        try:
+            summary = iosconfigcollector.collect(self._devices(3), self._options(server, concurrency=1, timeout=0.5))
+        finally:
+            server.stop()
+        errors = {res['host']: res['error'] for res in summary['results']}
+        self.assertTrue(errors['H000'].startswith('timeout'), "Timeout not reported")
+        self.assertEqual(errors['H001'], '', "Device after timeout failed")
+        self.assertEqual(summary['failed'], 1, "Invalid number of failed devices")
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'H000.cfg')), "Configuration of failed device")
+        with open(os.path.join(self.tmpdir, 'H000.json')) as f:
+            self.assertTrue(json.load(f)['collected_error'].startswith('timeout'), "Error not saved")
+
+    def test_iosconfigcollector_errors(self):
+        server = FakeCliServer(enable_secret='other')
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            closed_port = s.getsockname()[1]
+        try:
+            devices = self._devices(1) + [{'host': 'CLOSED', 'address': '127.0.0.1', 'port': closed_port}]
+            summary = iosconfigcollector.collect(devices, self._options(server))
+        finally:
+            server.stop()
+        errors = {res['host']: res['error'] for res in summary['results']}
+        self.assertTrue(errors['H000'].startswith('enable failed'), "Invalid enable error")
+        self.assertNotEqual(errors['CLOSED'], '', "Connection error not reported")
+
+    def test_iosconfigcollector_inventory(self):
+        filename = os.path.join(self.tmpdir, 'inventory.json')
+        with open(filename, 'w') as f:
+            json.dump({
+                '_meta': {'hostvars': {'R01': {'ansible_host': '192.168.13.253'}}},
+                'all': {'children': ['lab']},
+                'lab': {'hosts': ['R01', 'R02']},
+            }, f)
+        devices = iosconfigcollector.load_inventory(filename)
+        self.assertEqual([d['address'] for d in devices], ['192.168.13.253', 'R02'], "Invalid addresses")
+        self.assertEqual(len(iosconfigcollector.load_inventory(filename, 'R02')), 1, "Invalid limit")
+        self.assertEqual(iosconfigcollector.parse_device('R03=10.0.0.1:2222'),
+                         {'host': 'R03', 'address': '10.0.0.1', 'port': 2222}, "Invalid device")
+
+    def test_iosconfigcollector_known_hosts(self):
+        filename = os.path.join(self.tmpdir, 'known_hosts')
+        with open(filename, 'w') as f:
+            f.write("")
+        options = dict(iosconfigcollector.DEFAULT_OPTIONS, known_hosts=filename)
+        self.assertEqual(iosconfigcollector.known_hosts(options), filename, "Invalid known_hosts")
+        # a missing known_hosts file doesn't disable the host key check
+        options['known_hosts'] = os.path.join(self.tmpdir, 'missing')
+        with self.assertRaisesRegex(iosconfigcollector.CliError, "no-host-key-check"):
+            iosconfigcollector.known_hosts(options)
+        options['known_hosts'] = None
+        with mock.patch.object(iosconfigcollector, 'DEFAULT_KNOWN_HOSTS', filename):
+            self.assertEqual(iosconfigcollector.known_hosts(options), filename, "Host key check disabled")
+        options['host_key_check'] = False
+        self.assertIsNone(iosconfigcollector.known_hosts(options), "Host key check not disabled")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import unittest
+
+from iosconfigcompliance import IosConfigFingerprint
+from iosconfigregexp import MissingEndOfBannerError
+
+
+class TestIosConfigFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.running = [
+            "Building configuration...",
+            "",
+            "Current configuration : 1234 bytes",
+            "!",
+            "hostname R01",
+            "!",
+            "vlan 10",
+            " name DATA",
+            "!",
+            "interface GigabitEthernet1/0/1",
+            " switchport access vlan 10",
+            " switchport mode access",
+            "!",
+            "banner motd ^C",
+            "Hello",
+            "^C",
+            "end",
+        ]
+        self.generated = [
+            "hostname R01",
+            "vlan 10",
+            " name DATA",
+            "interface GigabitEthernet1/0/1",
+            " switchport mode access",
+            " switchport access vlan 10",
+            " !",
+            "banner motd \x03",
+            "Hello",
+            "\x03",
+            "end",
+        ]
+
+    def test_iosconfigcompliance_compliant(self):
+        res = IosConfigFingerprint(self.running).compare(IosConfigFingerprint(self.generated))
+        self.assertEqual(res, {'compliant': True, 'changed': [], 'added': [], 'removed': []},
+                         "Invalid compliance result")
+
+    def test_iosconfigcompliance_changed(self):
+        generated = self.generated[:2] + [" name VOICE"] + self.generated[3:] + ["ntp server 10.0.0.1"]
+        running = self.running + ["snmp-server location Vienna"]
+        res = IosConfigFingerprint(running).compare(IosConfigFingerprint(generated))
+        self.assertEqual(res, {'compliant': False, 'changed': ["vlan 10"], 'added': ["ntp server 10.0.0.1"],
+                               'removed': ["snmp-server location Vienna"]}, "Invalid compliance result")
+
+    def test_iosconfigcompliance_ordered(self):
+        running = ["ip access-list standard ACL", " permit 10.0.0.1", " deny any"]
+        generated = ["ip access-list standard ACL", " deny any", " permit 10.0.0.1"]
+        res = IosConfigFingerprint(running).compare(IosConfigFingerprint(generated))
+        self.assertEqual(res['changed'], ["ip access-list standard ACL"], "Line order must be significant")
+
+    def test_iosconfigcompliance_ignore_regexp(self):
+        running = ["Load for five secs: 1%/0%; one minute: 2%", "hostname R01"]
+        generated = ["hostname R01"]
+        res = IosConfigFingerprint(running).compare(IosConfigFingerprint(generated))
+        self.assertEqual(res['removed'], ["Load for five secs: 1%/0%; one minute: 2%"], "Invalid compliance result")
+        ignore = [r"^Load\s+for\s+five\s+secs.*$$"]
+        res = IosConfigFingerprint(running, ignore).compare(IosConfigFingerprint(generated, ignore))
+        self.assertTrue(res['compliant'], "Ignored section must not be compared")
+
+    def test_iosconfigcompliance_duplicate_sections(self):
+        running = ["interface Vlan1", " shutdown", "interface Vlan1", " no ip address"]
+        generated = ["interface Vlan1", " shutdown", "interface Vlan1", " no ip address"]
+        sections = IosConfigFingerprint(running).sections()
+        self.assertEqual(list(sections), ["interface Vlan1"], "Duplicate headers must be merged")
+        self.assertTrue(IosConfigFingerprint(running).compare(IosConfigFingerprint(generated))['compliant'])
+        self.assertFalse(IosConfigFingerprint(running).compare(IosConfigFingerprint(generated[:2]))['compliant'])
+
+    def test_iosconfigcompliance_missing_banner_end(self):
+        with self.assertRaises(MissingEndOfBannerError):
+            IosConfigFingerprint(["banner motd ^C", "Hello"]).sections()
+
+
+if __name__ == '__main__':
+    unittest.main()
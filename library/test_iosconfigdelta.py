@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import random
+import unittest
+
+from iosconfigdelta import IosConfigDelta
+from iosconfigregexp import MissingEndOfBannerError
+
+
+def config(vlans, ports, banner='Managed by ansible', extra=()):
+    lines = ["Building configuration...", "", "Current configuration : 1234 bytes", "!", "hostname R01", "!"]
+    for vlan_id, name in vlans:
+        lines += ["vlan {}".format(vlan_id), " name {}".format(name), "!"]
+    for intf, sub_lines in ports:
+        lines += ["interface {}".format(intf)] + [" " + li for li in sub_lines] + ["!"]
+    lines += list(extra)
+    lines += ["banner motd ^C", banner, "^C", "!", "end"]
+    return lines
+
+
+def access_port(vlan_id, shutdown=False, description=''):
+    res = ["switchport access vlan {}".format(vlan_id), "switchport mode access"]
+    if description:
+        res.insert(0, "description {}".format(description))
+    if shutdown:
+        res.append("shutdown")
+    return res
+
+
+class TestIosConfigDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.vlans = [('10', 'CLIENT'), ('20', 'VOIP'), ('30', 'PRINTER')]
+        self.ports = [('GigabitEthernet1/0/{}'.format(i), access_port(10)) for i in range(1, 49)]
+
+    def test_iosconfigdelta_single_port(self):
+        running = config(self.vlans, self.ports)
+        ports = list(self.ports)
+        ports[4] = (ports[4][0], access_port(20))
+        delta = IosConfigDelta(running, config(self.vlans, ports))
+        self.assertEqual(delta.delta(), [
+            "interface GigabitEthernet1/0/5",
+            " no switchport access vlan 10",
+            " switchport access vlan 20",
+        ], "Delta not minimal")
+        self.assertTrue(delta.verify()['verified'], "Delta does not reach the generated configuration")
+
+    def test_iosconfigdelta_order(self):
+        running = config(self.vlans, self.ports, extra=["ip access-list extended ACL", " permit ip any host 10.0.0.1",
+                                                        " deny ip any any", "ip domain-name old.local"])
+        ports = [(intf, access_port(20, description='moved')) for intf, sub_lines in self.ports[:2]] + self.ports[2:]
+        generated = config([('20', 'VOIP'), ('30', 'PRINTER-NEW')], [(i, access_port(20)) for i, s in self.ports],
+                           banner="Changed motd", extra=["ip access-list extended ACL", " deny ip any any",
+                                                         " permit ip any host 10.0.0.1"])
+        delta = IosConfigDelta(running, generated)
+        res = delta.delta()
+        self.assertEqual(res[0], "no ip domain-name old.local", "Removed lines not first")
+        self.assertEqual(res[-1], "no vlan 10", "Vlan not removed after the ports")
+        self.assertIn(" name PRINTER-NEW", res, "Changed vlan name missing")
+        self.assertNotIn(" name PRINTER", res, "Unchanged vlan name removed")
+        self.assertLess(res.index("no ip access-list extended ACL"), res.index(" deny ip any any"),
+                        "Access-list not replaced")
+        self.assertEqual(res[res.index("banner motd \x03"):res.index("banner motd \x03") + 3],
+                         ["banner motd \x03", "Changed motd", "\x03"], "Invalid banner")
+        self.assertTrue(delta.verify()['verified'], "Delta does not reach the generated configuration")
+        # no change
+        self.assertEqual(IosConfigDelta(running, running).delta(), [], "Delta of equal configurations")
+        self.assertEqual(IosConfigDelta(config(self.vlans, self.ports), [
+            "hostname R01", "vlan 10", " name CLIENT", "vlan 30", " name PRINTER", " !", "vlan 20", " name VOIP"] +
+            [li for i, s in self.ports for li in ["interface " + i] + [" " + li for li in reversed(s)]] +
+            ["banner motd \x03", "Managed by ansible", "\x03", "end"]).delta(), [], "Formatting not ignored")
+
+    def test_iosconfigdelta_negation(self):
+        running = ["interface GigabitEthernet1/0/1", " no cdp enable", " shutdown",
+                   "interface Vlan10", " ip address 10.0.0.1 255.255.255.0",
+                   "interface GigabitEthernet1/0/2", " description old", " spanning-tree portfast",
+                   "router ospf 1", " network 10.0.0.0 0.0.0.255 area 0", " passive-interface default",
+                   "no ip http server"]
+        generated = ["interface GigabitEthernet1/0/1", " no lldp transmit", "interface GigabitEthernet1/0/2",
+                     "router ospf 1", " network 10.0.0.0 0.0.0.255 area 0", "ip http server"]
+        delta = IosConfigDelta(running, generated)
+        res = delta.delta()
+        self.assertIn(" cdp enable", res, "'no' form not reverted")
+        self.assertIn(" no shutdown", res, "Line not removed")
+        self.assertIn("no interface Vlan10", res, "Virtual interface not removed")
+        self.assertIn("ip http server", res, "'no' form not reverted")
+        self.assertTrue(delta.verify()['verified'], "Delta does not reach the generated configuration")
+        # physical interfaces are reset, not removed
+        delta = IosConfigDelta(running, generated[2:])
+        self.assertIn("default interface GigabitEthernet1/0/1", delta.delta(), "Physical interface not reset")
+        self.assertTrue(delta.verify()['verified'], "Delta does not reach the generated configuration")
+        # a wrong delta is detected
+        res = delta.verify(delta.delta()[1:])
+        self.assertFalse(res['verified'], "Incomplete delta verified")
+        self.assertTrue(res['differences'], "Differences missing")
+
+    def test_iosconfigdelta_negation_generated(self):
+        running = ["interface GigabitEthernet1/0/1", " shutdown", " no cdp enable", " description old"]
+        generated = ["interface GigabitEthernet1/0/1", " no shutdown", " cdp enable"]
+        delta = IosConfigDelta(running, generated)
+        res = delta.delta()
+        self.assertEqual(sorted(res), sorted(["interface GigabitEthernet1/0/1", " no description old",
+                                              " no shutdown", " cdp enable"]), "Invalid delta")
+        self.assertEqual(len(res), len(set(res)), "Duplicate commands")
+        self.assertTrue(delta.verify()['verified'], "Delta does not reach the generated configuration")
+
+    def test_iosconfigdelta_random(self):
+        rnd = random.Random(1)
+        for n in range(20):
+            def ports():
+                return [('GigabitEthernet1/0/{}'.format(i),
+                         access_port(rnd.choice(['10', '20', '30']), rnd.random() < 0.2, rnd.choice(['', '', 'AP'])))
+                        for i in range(1, 25) if rnd.random() < 0.9]
+            running = config(rnd.sample(self.vlans, 2), ports(), rnd.choice(['a', 'b']))
+            generated = config(rnd.sample(self.vlans, 2), ports(), rnd.choice(['a', 'b']))
+            res = IosConfigDelta(running, generated).verify()
+            self.assertTrue(res['verified'], "Random delta {} not verified: {}".format(n, res['differences']))
+
+    def test_iosconfigdelta_invalid(self):
+        with self.assertRaises(MissingEndOfBannerError):
+            IosConfigDelta(["banner motd ^C", "no end"], [])
+        with self.assertRaises(ValueError):
+            IosConfigDelta([], []).replay(["banner motd \x03", "no end"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import unittest
+
+from iosconfiginterfaces import IosConfigInterfaces
+
+
+class TestIosConfigInterfaces(unittest.TestCase):
+
+    def setUp(self):
+        self.ios_config = [
+            "hostname R01",
+            "!",
+            "interface Port-channel1",
+            " description Uplink",
+            "!",
+            "interface GigabitEthernet1/0/1",
+            " description Client",
+            " switchport access vlan 10",
+            " switchport mode access",
+            " switchport voice vlan 60",
+            " power inline never",
+            " spanning-tree portfast",
+            " ip flow monitor IPv4_STEALTHWATCH_NETFLOW input",
+            " authentication priority dot1x mab",
+            "!",
+            "interface TenGigabitEthernet1/1/1",
+            " channel-group 1 mode active",
+            "!",
+            "interface Vlan10",
+            " ip address 10.0.0.1 255.255.255.0",
+            "!",
+            "interface GigabitEthernet1/0/1",
+            " description duplicate",
+            "end",
+        ]
+
+    def test_iosconfiginterfaces_records(self):
+        res = IosConfigInterfaces(self.ios_config).records()
+        self.assertEqual([r['interface_name'] for r in res],
+                         ["Port-channel1", "GigabitEthernet1/0/1", "TenGigabitEthernet1/1/1",
+                          "Vlan10", "GigabitEthernet1/0/1"], "Invalid records")
+        self.assertEqual(res[0]['port_channel'], "1", "Invalid port_channel")
+        self.assertEqual(res[1], {
+            'interface_name': "GigabitEthernet1/0/1", 'auth_prio': "dot1x mab", 'description': "Client",
+            'flow_monitor': "IPv4_STEALTHWATCH_NETFLOW", 'flow_monitor_mode': "input",
+            'ip_address': "", 'ip_netmask': "", 'port_channel': "", 'port_channel_mode': "",
+            'port_mode': "access", 'stp_mode': "", 'vlan_access': "10", 'vlan_voice': "60",
+            'power_inline': ""}, "Invalid record")
+        self.assertEqual((res[2]['port_channel'], res[2]['port_channel_mode']), ("1", "active"),
+                         "Invalid channel-group")
+        self.assertEqual((res[3]['ip_address'], res[3]['ip_netmask']), ("10.0.0.1", "255.255.255.0"),
+                         "Invalid ip address")
+
+    def test_iosconfiginterfaces_interfaces(self):
+        res = IosConfigInterfaces("\n".join(self.ios_config)).interfaces()
+        self.assertEqual(len(res), 4, "Invalid interfaces")
+        self.assertEqual(res["GigabitEthernet1/0/1"]['description'], "Client", "First record not used")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import unittest
+
+from iosconfigregexp import IosConfigRegexp, MissingEndOfBannerError
+from iosconfigpartition import IosConfigPartition
+
+
+class TestIosConfigPartition(unittest.TestCase):
+
+    def setUp(self):
+        self.ios_config = [
+            "Building configuration...",
+            "",
+            "Current configuration : 1234 bytes",
+            "!",
+            "hostname R01",
+            "!",
+            "vlan 10",
+            " name CLIENT",
+            "!",
+            "!",
+            "interface GigabitEthernet1/0/1",
+            " switchport mode access",
+            "!",
+            "interface GigabitEthernet1/0/2",
+            " description unmanaged",
+            "!",
+            "banner login ^C",
+            "! banner login line1",
+            "^C",
+            "banner motd ^C",
+            "! banner motd line1",
+            "^C",
+            "end",
+        ]
+        self.delete_section_regex = [
+            r"^Building\s+configuration.*$$",
+            r"^Current\s+configuration.*$$",
+            r"^vlan\s+\d*$$",
+            r"^banner\s+.*\^C$$",
+            r"^end$$",
+        ]
+        self.rules = {
+            'banner_login': {'action': 'extract', 'regexp': r"^banner\s+login\s+\^C$$"},
+            'banner_motd': {'action': 'extract', 'regexp': r"^banner\s+motd\s+\^C$$"},
+            'managed_sections': {'action': 'remove', 'regexp': self.delete_section_regex},
+            'managed_client_ports': {'action': 'remove', 'regexp': ["GigabitEthernet1/0/1"],
+                                     'prefix_str': r'interface\s+'},
+        }
+
+    def test_iosconfigpartition_same_as_single_calls(self):
+        res = IosConfigPartition(self.ios_config, self.rules).partition()
+        self.assertEqual(sorted(res.keys()), ['banner_login', 'banner_motd', 'unmanaged'], "Invalid parts")
+
+        icr = IosConfigRegexp(self.ios_config, r"^banner\s+login\s+\^C$$")
+        self.assertEqual(res['banner_login'], icr.extract_section(), "Invalid banner_login")
+        self.assertEqual(res['banner_login'][-1], "\x03", "Missing banner end")
+
+        unmanaged = IosConfigRegexp(self.ios_config, self.delete_section_regex).remove_section()
+        unmanaged = IosConfigRegexp(unmanaged, ["GigabitEthernet1/0/1"], False, r'interface\s+').remove_section()
+        self.assertEqual(res['unmanaged'], unmanaged, "Invalid remainder")
+
+    def test_iosconfigpartition_errors(self):
+        with self.assertRaises(ValueError):
+            IosConfigPartition(self.ios_config, {'x': {'action': 'replace'}})
+        with self.assertRaisesRegex(ValueError, "'unmanaged' is the name of a rule"):
+            IosConfigPartition(self.ios_config, {'unmanaged': {'action': 'extract', 'regexp': r"^hostname\s+.*$$"}})
+
+        rules = {'banner': {'action': 'remove', 'regexp': r"^banner\s+motd\s+\^C$$"}}
+        with self.assertRaises(MissingEndOfBannerError):
+            IosConfigPartition(self.ios_config[:-2], rules).partition()
+
+if __name__ == '__main__':
+    unittest.main()
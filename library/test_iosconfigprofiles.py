@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import jinja2
+
+from iosconfigprofiles import ProfileBodyCache, client_port_profiles, render_client_interfaces, template_key
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'templates', 'ios')
+PORT_TYPES = ['ptype_vlan', 'ptype_vlnp', 'ptype_vlnpv', 'ptype_vlnv', 'ptype_dot1x', 'ptype_dot1xnp', 'ptype_ignore']
+
+
+def stack_ports(members=9, ports=48, seed=1):
+    rnd = random.Random(seed)
+    conf_client_ports = dict()
+    switch_interfaces = dict()
+    for m in range(1, members + 1):
+        for p in range(1, ports + 1):
+            intf = 'GigabitEthernet{}/0/{}'.format(m, p)
+            conf_client_ports[intf] = [{
+                'port_type': rnd.choice(PORT_TYPES),
+                'vlan_id': rnd.choice(['', '', '40']),
+                'is_enabled': rnd.choice([True, True, False]),
+                'description': rnd.choice(['', '', 'Printer']),
+            }]
+            switch_interfaces[intf] = rnd.choice([{}, {'vlan_voice': '40'}, {'vlan_voice': ''}])
+    return conf_client_ports, switch_interfaces
+
+
+class TestIosConfigProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.env = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+                                      trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _render(self, variables, cache=None):
+        profile_template = self.env.get_template('config_client_interface_profile.j2')
+        calls = list()
+
+        def render_body(profile):
+            calls.append(profile)
+            return profile_template.render(dict(variables, **profile))
+        profiles = client_port_profiles(variables['conf_client_ports'], variables.get('switch_interfaces'))
+        with open(os.path.join(TEMPLATE_DIR, 'config_client_interface_profile.j2')) as f:
+            prefix = template_key(f.read(), variables)
+        res, rendered = render_client_interfaces(profiles, render_body, prefix, cache)
+        return res, rendered, calls
+
+    def test_iosconfigprofiles_identical(self):
+        template = self.env.get_template('config_client_interfaces.j2')
+        for seed in range(5):
+            conf_client_ports, switch_interfaces = stack_ports(seed=seed)
+            for variables in [
+                    {'conf_client_ports': conf_client_ports, 'switch_interfaces': switch_interfaces,
+                     'config_group': 'NO_CONFIG_GROUP', 'switchport_voice_vlan_id': '40'},
+                    {'conf_client_ports': conf_client_ports, 'config_group': 'C3560', 'switchport_voice_vlan_id': 41}]:
+                res, rendered, calls = self._render(variables)
+                self.assertEqual(res, template.render(variables), "Output differs from the template")
+                self.assertLess(rendered, len(conf_client_ports) / 2, "Profiles not shared")
+
+    def test_iosconfigprofiles_cache(self):
+        conf_client_ports, switch_interfaces = stack_ports(2, 48)
+        variables = {'conf_client_ports': conf_client_ports, 'switch_interfaces': switch_interfaces,
+                     'config_group': 'NO_CONFIG_GROUP', 'switchport_voice_vlan_id': '40'}
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        res, rendered, calls = self._render(variables, ProfileBodyCache(1024, cache_dir))
+        self.assertEqual(rendered, len(os.listdir(cache_dir)), "Bodies not stored")
+        # another process (host) of the same run
+        cache = ProfileBodyCache(1024, cache_dir)
+        res2, rendered, calls = self._render(variables, cache)
+        self.assertEqual(res2, res, "Cached output differs")
+        self.assertEqual(rendered, 0, "Cached bodies rendered again")
+        self.assertGreater(cache.stats()['file_hits'], 0, "File cache not used")
+        # other host variables are other keys
+        res3, rendered, calls = self._render(dict(variables, switchport_voice_vlan_id='99'), cache)
+        self.assertGreater(rendered, 0, "Stale bodies used")
+        self.assertIn(" switchport voice vlan 99\n", res3, "Invalid voice vlan")
+        # bounded
+        cache = ProfileBodyCache(5, os.path.join(self.tmpdir, 'small'))
+        self._render(variables, cache)
+        self.assertLessEqual(len(os.listdir(os.path.join(self.tmpdir, 'small'))), 5, "File cache not bounded")
+        self.assertLessEqual(cache.stats()['entries'], 5, "Memory cache not bounded")
+
+    def test_iosconfigprofiles_prune_interval(self):
+        cache_dir = os.path.join(self.tmpdir, 'prune')
+        cache = ProfileBodyCache(16, cache_dir)
+        with mock.patch.object(cache, '_prune', wraps=cache._prune) as prune:
+            for i in range(20):
+                cache.put('key{:02}'.format(i), 'body {}'.format(i))
+        self.assertEqual(prune.call_count, 20 // cache.prune_interval, "Pruned on every new file")
+        self.assertEqual(len(os.listdir(cache_dir)), 16, "File cache not bounded")
+        self.assertIn('key19', os.listdir(cache_dir), "Newest file removed")
+
+    def test_iosconfigprofiles_invalid(self):
+        with self.assertRaises(ValueError):
+            client_port_profiles({'Gi1/0/1': [{'port_type': 'ptype_vlan'}]})
+        with self.assertRaises(ValueError):
+            client_port_profiles({'Gi1/0/1': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import unittest
+
+from iosconfigquery import IosConfigQuery, IosConfigTree
+from iosconfigregexp import IosConfigRegexp, MissingEndOfBannerError
+
+
+class TestIosConfigQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.config = "\n".join([
+            "Building configuration...",             # 0
+            "!",
+            "hostname R01",
+            "!",
+            "interface GigabitEthernet1/0/1",        # 4
+            " switchport mode access",
+            " switchport voice vlan 40",
+            "!",
+            "interface GigabitEthernet1/0/2",        # 8
+            " switchport mode trunk",
+            " switchport voice vlan 41",
+            "!",
+            "interface Vlan10",                      # 12
+            " shutdown",
+            "!",
+            "router bgp 65000",                      # 15
+            " bgp log-neighbor-changes",
+            " !",
+            " address-family ipv4 vrf A",            # 18
+            "  neighbor 10.0.0.1 activate",
+            "  shutdown",
+            " exit-address-family",
+            " !",
+            " address-family ipv4 vrf B",            # 23
+            "  neighbor 10.0.0.2 activate",
+            " exit-address-family",
+            "!",
+            "banner motd ^C",                        # 27
+            " interface GigabitEthernet1/0/3",
+            " switchport mode access",
+            "^C",
+            "end",                                   # 31
+        ])
+
+    def query(self, query, ignorecase=False, sections=False):
+        return IosConfigQuery(query, ignorecase).matches(self.config, sections)
+
+    def test_iosconfigquery_path(self):
+        res = self.query(r"interface GigabitEthernet.* > switchport voice vlan \d+")
+        self.assertEqual([(m['start'], m['line']) for m in res],
+                         [(6, " switchport voice vlan 40"), (10, " switchport voice vlan 41")], "Invalid matches")
+        self.assertEqual(res[0]['parents'], ["interface GigabitEthernet1/0/1"], "Invalid parents")
+        # access interfaces only: the parent of the matched line
+        res = self.query("interface .* > switchport mode access")
+        self.assertEqual([m['parents'][0] for m in res], ["interface GigabitEthernet1/0/1"], "Invalid matches")
+        res = self.query(r"router bgp \d+ > address-family .*", sections=True)
+        self.assertEqual([(m['start'], m['end']) for m in res], [(18, 21), (23, 25)], "Invalid spans")
+        self.assertEqual(res[1]['lines'], [" address-family ipv4 vrf B", "  neighbor 10.0.0.2 activate"])
+        res = self.query("router bgp 65000", sections=True)
+        self.assertEqual(res[0]['lines'], self.config.splitlines()[15:26],
+                         "Span differs from IosConfigRegexp.section_end()")
+        self.assertEqual(res[0]['end'], IosConfigRegexp(self.config).section_end(15))
+        # descendants at any depth
+        self.assertEqual([m['start'] for m in self.query(">> shutdown")], [13, 20], "Invalid descendants")
+        self.assertEqual([m['start'] for m in self.query(r"router bgp \d+ >> .* activate")], [19, 24])
+        self.assertEqual(self.query("interface Vlan10 > no shutdown"), [], "Invalid match")
+        self.assertEqual([m['start'] for m in self.query("INTERFACE VLAN10 > SHUTDOWN", ignorecase=True)], [13])
+
+    def test_iosconfigquery_banner(self):
+        res = self.query(r"banner motd \^C", sections=True)
+        self.assertEqual((res[0]['start'], res[0]['end']), (27, 31), "Invalid banner span")
+        # banner text is no configuration
+        self.assertEqual([m['start'] for m in self.query("interface .*")], [4, 8, 12], "Banner text matched")
+        self.assertEqual(self.query(">> switchport mode access")[0]['start'], 5, "Banner text matched")
+        extracted = self.config.replace("banner motd ^C", "banner motd \x03").replace("\n^C", "\n\x03")
+        self.assertEqual(len(IosConfigQuery(r"banner motd \^C").matches(extracted)), 1, "Extracted banner not found")
+        with self.assertRaises(MissingEndOfBannerError):
+            IosConfigTree(["banner motd ^C", "text"])
+
+    def test_iosconfigquery_indexed(self):
+        lines = ["hostname R01"]
+        for i in range(1, 2001):
+            lines += ["interface GigabitEthernet1/0/{}".format(i), " switchport access vlan {}".format(i % 10)]
+        config = "\n".join(lines)
+        tree = IosConfigTree.get(config)
+        self.assertIs(IosConfigTree.get(config), tree, "Tree parsed again")
+        query = IosConfigQuery("interface GigabitEthernet1/0/77 > switchport access vlan .*")
+        self.assertEqual(query.steps[0].keys, [('L', "interface GigabitEthernet1/0/77")], "Step not indexed")
+        self.assertEqual(IosConfigQuery(r"interface Gi.* > x").steps[0].keys, [('W', 'interface')])
+        self.assertIsNone(IosConfigQuery(r"interface|vlan 10").steps[0].keys, "Alternation indexed")
+        self.assertEqual([m['line'] for m in query.matches(config)], [" switchport access vlan 7"])
+        self.assertEqual(len(IosConfigQuery("interface .* > switchport access vlan 3").matches(config)), 200)
+        self.assertIs(IosConfigQuery("interface .* > x").steps, IosConfigQuery("interface .* > x").steps,
+                      "Query compiled again")
+        for query in ["", "interface >  > x", " > "]:
+            with self.assertRaises(ValueError):
+                IosConfigQuery(query)
+
+
+if __name__ == '__main__':
+    unittest.main()
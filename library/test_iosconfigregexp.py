@@ -5,8 +5,10 @@
 
 import unittest
 import copy
+import io
 
 from iosconfigregexp import IosConfigRegexp, MissingEndOfBannerError
+from configlines import ConfigLines
 from var_dump import var_dump
 
 class TestIosConfigRegexp(unittest.TestCase):
@@ -132,5 +134,117 @@ class TestIosConfigRegexp(unittest.TestCase):
         res = self.icr.remove_section()
         self.assertEqual('interface GigabitEthernet1/0/31' in [res], False, "Invalid Result set.")
 
+    def test_iosconfigregexp_matcher_rebuild(self):
+        self.icr.regexplist = [ r"GigabitEthernet1/0/31" ]
+        self.assertFalse(self.icr.is_match(39), "Match without prefix_str")
+        self.icr.prefix_str = r'interface\s+'
+        self.assertTrue(self.icr.is_match(39), "Matcher not rebuilt after prefix_str changed")
+        self.icr.regexplist = [ r"gigabitethernet1/0/31" ]
+        self.assertFalse(self.icr.is_match(39), "Matcher not rebuilt after regexplist changed")
+        self.icr.ignorecase = True
+        self.assertTrue(self.icr.is_match(39), "Matcher not rebuilt after ignorecase changed")
+
+    def test_iosconfigregexp_matcher_groups(self):
+        self.icr.regexplist = [ r"(?P<kw>start)\s+block", r"(?i:START)\s+BLOCK", r"(line)\s+1" ]
+        res = self.icr.extract_section()
+        self.assertEqual(res, ["line 1", "start block", " should be seleted in start block section",
+                               "start block", " should be seleted"], "Invalid result set")
+
+    def test_iosconfigregexp_literal_patterns(self):
+        self.icr.regexplist = [ r"GigabitEthernet1/0/31", r"GigabitEthernet1/0/3[0]", r"Gi1/0/32" ]
+        self.icr.prefix_str = r'interface\s+'
+        res = self.icr.remove_section()
+        self.assertEqual(len(res), 41, "Invalid result set")
+        self.assertEqual(res[-16:-13], ["! raise exception because block end line ^C is missing",
+                               "!", "interface GigabitEthernet1/0/32"], "Invalid result set")
+
+        self.icr.regexplist = [ r"gigabitethernet1/0/32" ]
+        self.icr.ignorecase = True
+        res = self.icr.extract_section()
+        self.assertEqual(len(res), 12, "Invalid result set")
+
+    def test_iosconfigregexp_section_index(self):
+        idx = self.icr.section_index
+        other = IosConfigRegexp("\n".join(self.ios_config) + "\n")
+        self.assertIs(other.section_index, idx, "Section index not reused for same content")
+        self.assertEqual(self.icr.section_end(3), 5, "Invalid section end")
+        self.assertEqual(self.icr.section_end(39), 51, "Invalid section end")
+        self.assertTrue(self.icr.is_banner(13), "Banner not detected")
+        self.assertFalse(self.icr.is_banner(10), "Invalid banner")
+        self.assertEqual(self.icr.banner_end(6), 10, "Invalid banner end")
+        with self.assertRaises(MissingEndOfBannerError) as cm:
+            self.icr.banner_end(24, 'remove_banner')
+        self.assertEqual(cm.exception.message,
+            "Error in IosConfigRegexp.remove_banner: Missing block-end for line-no 24 - 'banner exception ^C'")
+
+        self.icr.conf_lines = self.ios_config[:3]
+        self.assertIsNot(self.icr.section_index, idx, "Section index not rebuilt")
+
+    def test_iosconfigregexp_iter_extract_remove(self):
+        self.icr.regexplist = [ r"^start\s+block$", r"^banner\s+[m|l].*\^C$", r"^.*block\s+end$" ]
+        text = "\n".join(self.ios_config) + "\n"
+        self.assertEqual(list(self.icr.iter_extract(io.StringIO(text))), self.icr.extract_section(),
+            "Invalid result set")
+        self.assertEqual(list(self.icr.iter_remove(io.BytesIO(text.encode('utf-8')))), self.icr.remove_section(),
+            "Invalid result set")
+        self.assertEqual(list(self.icr.iter_remove(l for l in self.ios_config)), self.icr.remove_section(),
+            "Invalid result set")
+
+        self.icr.regexplist = [ r"^banner\s+ex.*\^C$" ]
+        with self.assertRaises(MissingEndOfBannerError) as cm:
+            list(self.icr.iter_extract())
+        self.assertEqual(cm.exception.message,
+            "Error in IosConfigRegexp.extract_banner: Missing block-end for line-no 24 - 'banner exception ^C'")
+
+    def test_iosconfigregexp_views(self):
+        icr = IosConfigRegexp("\n".join(self.ios_config) + "\n")
+        self.assertIsInstance(icr.conf_lines, ConfigLines, "String not stored as ConfigLines")
+        self.assertIs(IosConfigRegexp(icr.conf_lines).conf_lines, icr.conf_lines, "ConfigLines copied")
+        icr.regexplist = [ r"^start\s+block$", r"^banner\s+[m|l].*\^C$", r"^.*block\s+end$" ]
+        res = icr.extract_view()
+        self.assertIs(res._buf, icr.conf_lines._buf, "Result does not share the buffer")
+        self.assertEqual(res, icr.extract_section(), "Invalid result set")
+        self.assertIn("\x03", res, "Missing converted banner end")
+        self.assertEqual(icr.remove_view(), icr.remove_section(), "Invalid result set")
+
+        # a list is converted to ConfigLines for views
+        self.icr.regexplist = icr.regexplist
+        self.assertEqual(self.icr.remove_view(), icr.remove_section(), "Invalid result set")
+
+    def test_iosconfigregexp_metrics(self):
+        self.assertIsNone(IosConfigRegexp(self.ios_config).last_metrics, "Metrics recorded without metrics=True")
+        icr = IosConfigRegexp(self.ios_config, [r"^start\s+block$", r"^banner\s+motd.*$"], metrics=True)
+        res = icr.remove_section()
+        m = icr.last_metrics
+        self.assertEqual(m['call'], 'remove_section')
+        self.assertEqual((m['lines_in'], m['lines_out']), (len(self.ios_config), len(res)))
+        self.assertEqual(m['bytes_out'], sum(len(li) + 1 for li in res))
+        self.assertEqual(m['lines_scanned'], m['regex_evaluations'])
+        self.assertGreater(m['sections_matched'], 0)
+        self.assertGreaterEqual(m['seconds'], 0.0)
+
+        # literal patterns are looked up in the section index
+        icr = IosConfigRegexp(self.ios_config, ["start block"], metrics=True)
+        res = icr.extract_view()
+        self.assertEqual(icr.last_metrics['call'], 'extract_view')
+        self.assertEqual((icr.last_metrics['lines_scanned'], icr.last_metrics['index_lookups']), (0, 1))
+        self.assertEqual(icr.last_metrics['lines_out'], len(res))
+
+    def test_iosconfigregexp_parallel(self):
+        conf = (self.ios_config + ["!"]) * 7
+        for regexp in ([r"^start\s+block$", r"^banner\s+[m|l].*\^C$"], [r"^.*block\s+end$"], ["!"]):
+            icr = IosConfigRegexp(conf, regexp)
+            self.assertEqual(icr.extract_parallel(3, 0), icr.extract_section(), "Invalid result set")
+            self.assertEqual(icr.remove_parallel(3, 0), icr.remove_section(), "Invalid result set")
+        # small configurations are processed serially
+        self.assertEqual(icr.remove_parallel(3), icr.remove_section(), "Invalid result set")
+
+        # line numbers of errors refer to the whole configuration
+        conf = self.ios_config + ["!", "banner exec ^C", "no end"]
+        icr = IosConfigRegexp(conf, r"^banner\s+exec.*$")
+        with self.assertRaises(MissingEndOfBannerError) as ctx:
+            icr.remove_parallel(3, 0)
+        self.assertIn("line-no {} ".format(len(conf) - 2), ctx.exception.message)
+
 if __name__ == '__main__':
     unittest.main()
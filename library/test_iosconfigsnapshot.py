@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from iosconfigsnapshot import IosConfigSnapshotStore, parse_size, snapshot_timestamp, split_chunks
+
+
+def config(hostname, interfaces=20, description=''):
+    lines = ["Building configuration...", "", "!", "hostname " + hostname, "!"]
+    for i in range(1, interfaces + 1):
+        lines += ["interface GigabitEthernet1/0/{}".format(i),
+                  " description client {}{}".format(i, description),
+                  " switchport mode access",
+                  "!"]
+    lines += ["banner motd ^C", "!", "motd of " + hostname, "^C", "!", "end"]
+    return "\n".join(lines)
+
+
+class TestIosConfigSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = IosConfigSnapshotStore(os.path.join(self.tmpdir, 'store'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_iosconfigsnapshot_split_chunks(self):
+        for c in [config('R01'), config('R01') + "\n", "", "\n", "hostname R01",
+                  config('R01').replace("\n", "\r\n"), "banner motd ^C\nunterminated\n!", " orphan\n!\n!\n"]:
+            self.assertEqual(''.join(split_chunks(c)), c + "\n", "Chunks not lossless: {!r}".format(c[:40]))
+        chunks = split_chunks(config('R01', 2))
+        self.assertIn("interface GigabitEthernet1/0/1\n description client 1\n switchport mode access\n!\n",
+                      chunks, "Interface not a chunk")
+        self.assertIn("banner motd ^C\n!\nmotd of R01\n^C\n!\n", chunks, "Banner split at '!'")
+        self.assertEqual(len(split_chunks("\n".join(["x"] * 10), 4)), 3, "Invalid max_lines")
+
+    def test_iosconfigsnapshot_put_get(self):
+        r01 = config('R01')
+        res = self.store.put('R01', r01, timestamp='20191001T120000')
+        self.assertTrue(res['changed'], "Snapshot not stored")
+        self.assertEqual(self.store.get('R01'), r01, "Invalid configuration")
+        # sections of other hosts are stored once
+        res = self.store.put('R02', config('R02'), timestamp='20191001T120000')
+        self.assertEqual(res['new_chunks'], 2, "Shared sections stored again")
+        # unchanged configuration is not stored again
+        res = self.store.put('R01', r01, timestamp='20191002T120000')
+        self.assertFalse(res['changed'], "Unchanged configuration stored")
+        self.assertEqual(self.store.history('R01'), ['20191001T120000'], "Invalid history")
+        self.store.put('R01', config('R01', description=' new'), timestamp='20191002T120000')
+        self.store.put('R01', r01 + "\n", kind='managed', timestamp='20191002T120000')
+        self.assertEqual(self.store.latest('R01')['timestamp'], '20191002T120000', "Invalid latest")
+        self.assertEqual(self.store.get('R01', timestamp='20191001'), r01, "Invalid timestamp prefix")
+        self.assertEqual(self.store.get('R01', 'managed'), r01 + "\n", "Invalid managed configuration")
+        self.assertEqual(self.store.get('R03'), None, "Snapshot of unknown host")
+        self.assertEqual(self.store.get('R01', timestamp='2018'), None, "Snapshot of unknown timestamp")
+        with self.assertRaises(ValueError):
+            self.store.put('../R01', r01)
+
+    def test_iosconfigsnapshot_timestamp(self):
+        # clock reads across a second boundary and a clock that didn't advance
+        clock = [1569974457.999999, 1569974458.000513, 1569974458.000513, 1569974457.5]
+        for i in range(len(clock)):
+            with mock.patch('time.time', return_value=clock[i]):
+                self.store.put('R01', config('R01', description=' {}'.format(i)))
+            self.assertEqual(self.store.get('R01'), config('R01', description=' {}'.format(i)), "Latest not updated")
+        self.assertEqual(self.store.history('R01'), ['20191002T000057.999999Z', '20191002T000058.000513Z',
+                                                     '20191002T000058.000514Z', '20191002T000058.000515Z'],
+                         "Invalid timestamps")
+        with mock.patch('time.time', return_value=clock[0]):
+            self.assertEqual(snapshot_timestamp('20191002T120000'), '20191002T120000.000001Z', "Invalid timestamp")
+
+    def test_iosconfigsnapshot_damaged(self):
+        manifest = self.store.put('R01', config('R01'))
+        filename = self.store._object_path(manifest['chunks'][0])
+        with open(filename, 'wb') as f:
+            f.write(b"damaged")
+        with self.assertRaises(ValueError):
+            self.store.get('R01')
+
+    def test_iosconfigsnapshot_gc(self):
+        for day in range(1, 6):
+            for host in ('R01', 'R02'):
+                self.store.put(host, config(host, 40, ' day {}'.format(day)), timestamp='2019100{}T120000'.format(day))
+        stats = self.store.stats()
+        self.assertEqual(stats['snapshots'], 10, "Invalid number of snapshots")
+        res = self.store.gc(keep=3)
+        self.assertEqual(res['removed_snapshots'], 4, "Invalid number of removed snapshots")
+        self.assertGreater(res['removed_objects'], 0, "Unreferenced chunks not removed")
+        self.assertEqual(self.store.history('R01'), ['20191003T120000', '20191004T120000', '20191005T120000'])
+        self.assertEqual(self.store.get('R01', timestamp='20191003'), config('R01', 40, ' day 3'), "Kept snapshot damaged")
+        # the latest snapshots are always kept
+        res = self.store.gc(max_bytes=0)
+        self.assertEqual(res['removed_snapshots'], 4, "Invalid number of removed snapshots")
+        self.assertEqual(self.store.get('R02'), config('R02', 40, ' day 5'), "Latest snapshot removed")
+        self.assertEqual(self.store.stats()['used_bytes'], res['used_bytes'], "Invalid used bytes")
+        res = self.store.gc(max_age_days=0)
+        self.assertEqual(res['removed_snapshots'], 0, "Latest snapshot removed")
+        self.assertEqual(parse_size('2G'), 2 * 1024 ** 3, "Invalid size")
+        self.assertEqual(parse_size('1.5k'), 1536, "Invalid size")
+
+
+if __name__ == '__main__':
+    unittest.main()
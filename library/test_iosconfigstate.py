@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from iosconfigstate import HostStateFile, input_fingerprint
+
+
+def _update(args):
+    filename, host = args
+    return HostStateFile(filename).update(host, 'fp-' + host, True)
+
+
+class TestIosConfigState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.tmpdir, 'state', 'managed_config_state.json')
+        self.template = os.path.join(self.tmpdir, 'config_vlans.j2')
+        with open(self.template, 'w') as f:
+            f.write("vlan {{ vl }}\n")
+        self.config = ["Building configuration...", "hostname R01", "!", "vlan 10", " name DATA", "end"]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_iosconfigstate_fingerprint(self):
+        data = {'device_vlans': {'10': {'vlan_name': 'DATA'}}}
+        fp = input_fingerprint(self.config, [], data, [self.template])
+        self.assertEqual(fp, input_fingerprint(["hostname R01", "vlan 10", " name DATA", "!", "end"], [],
+                                               {'device_vlans': {'10': {'vlan_name': 'DATA'}}}, [self.template]),
+                         "Fingerprint must not depend on volatile lines")
+        self.assertNotEqual(fp, input_fingerprint(self.config[:4] + [" name VOICE"], [], data, [self.template]),
+                            "Running configuration not fingerprinted")
+        self.assertNotEqual(fp, input_fingerprint(self.config, [], {'device_vlans': {}}, [self.template]),
+                            "Data not fingerprinted")
+        with open(self.template, 'a') as f:
+            f.write("!\n")
+        self.assertNotEqual(fp, input_fingerprint(self.config, [], data, [self.template]),
+                            "Template not fingerprinted")
+        self.assertNotEqual(fp, input_fingerprint(self.config, [], data, [self.template + '.missing']),
+                            "Filenames not fingerprinted")
+
+    def test_iosconfigstate_update(self):
+        state = HostStateFile(self.state_file)
+        self.assertEqual(state.get('R01'), {}, "Missing state file must be empty")
+        self.assertFalse(state.is_unchanged('R01', 'fp1'))
+        state.update('R01', 'fp1', False)
+        self.assertFalse(state.is_unchanged('R01', 'fp1'), "Non-compliant run must not be skipped")
+        state.update('R01', 'fp1', True)
+        state.update('R02', 'fp2', True)
+        self.assertTrue(state.is_unchanged('R01', 'fp1'))
+        self.assertFalse(state.is_unchanged('R01', 'fp2'))
+        self.assertEqual(sorted(state.load()), ['R01', 'R02'])
+        self.assertEqual([f for f in os.listdir(os.path.dirname(self.state_file)) if f.startswith('.state-')], [],
+                         "Temporary file not removed")
+
+    def test_iosconfigstate_damaged(self):
+        os.makedirs(os.path.dirname(self.state_file))
+        with open(self.state_file, 'w') as f:
+            f.write('{"R01": ')
+        state = HostStateFile(self.state_file)
+        self.assertEqual(state.load(), {}, "Damaged state file must be empty")
+        state.update('R01', 'fp1', True)
+        self.assertTrue(state.is_unchanged('R01', 'fp1'))
+
+    def test_iosconfigstate_parallel(self):
+        hosts = ['R{:02}'.format(i) for i in range(40)]
+        with ProcessPoolExecutor(max_workers=8) as pool:
+            list(pool.map(_update, [(self.state_file, host) for host in hosts]))
+        with open(self.state_file) as f:
+            data = json.load(f)
+        self.assertEqual(sorted(data), hosts, "Lost updates of parallel hosts")
+        self.assertTrue(all(data[host]['fingerprint'] == 'fp-' + host for host in hosts))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from plantdatamodel import PlantDataModel
+
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PLANT_DIR = os.path.join(BASE_DIR, 'vars', 'PLANT_A')
+HOST_DIR = os.path.join(BASE_DIR, 'host_vars', 'R01')
+
+
+class TestPlantDataModel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.plant_dir = os.path.join(self.tmpdir, 'PLANT_T')
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        shutil.copytree(PLANT_DIR, self.plant_dir)
+        PlantDataModel.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        PlantDataModel.clear()
+
+    def test_plantdatamodel_indexes(self):
+        model = PlantDataModel.load(PLANT_DIR)
+        with open(os.path.join(HOST_DIR, 'R01.yml')) as f:
+            host = yaml.safe_load(f)
+        with open(os.path.join(HOST_DIR, 'device_vlans.yml')) as f:
+            device_vlans = yaml.safe_load(f)['device_vlans']
+        self.assertEqual(model.device_vlans(host['switch_location']), device_vlans, "Invalid device vlans")
+        self.assertEqual(model.vlan_names['40'], 'VOIP', "Invalid vlan name")
+        uplink = model.uplinks_by_host['FIREWALL']['R01_FIREWALL']
+        self.assertEqual((uplink['side'], uplink['device_remote']), ('right', 'R01'), "Invalid uplink side")
+        self.assertEqual(model.uplinks_by_host['R01']['R01_FIREWALL']['side'], 'left', "Invalid uplink side")
+        self.assertIn('uplink_default_allowed_vlans', model.data, "Variables missing")
+        self.assertIs(PlantDataModel.load(PLANT_DIR), model, "Model loaded again")
+
+    def test_plantdatamodel_cache(self):
+        model = PlantDataModel.load(self.plant_dir, self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1, "Model not cached")
+        # another process of the same run
+        PlantDataModel.clear()
+        cached = PlantDataModel.load(self.plant_dir, self.cache_dir)
+        self.assertIsNot(cached, model, "Model of this process used")
+        self.assertEqual(cached.device_vlans('atvi'), model.device_vlans('atvi'), "Invalid cached model")
+        # touched file with the same content
+        filename = os.path.join(self.plant_dir, 'vlan_db.yml')
+        os.utime(filename, ns=(0, 0))
+        PlantDataModel.clear()
+        self.assertEqual(PlantDataModel.load(self.plant_dir, self.cache_dir).vlan_names, model.vlan_names)
+        # changed file
+        with open(filename) as f:
+            content = f.read()
+        with open(filename, 'w') as f:
+            f.write(content.replace('"VOIP"', '"VOICE"'))
+        self.assertEqual(PlantDataModel.load(self.plant_dir, self.cache_dir).vlan_names['40'], 'VOICE',
+                         "Outdated model used")
+        PlantDataModel.clear()
+        self.assertEqual(PlantDataModel.load(self.plant_dir, self.cache_dir).vlan_names['40'], 'VOICE',
+                         "Outdated cache used")
+        # damaged cache
+        cache_file = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(cache_file, 'wb') as f:
+            f.write(b"damaged")
+        PlantDataModel.clear()
+        self.assertEqual(PlantDataModel.load(self.plant_dir, self.cache_dir).vlan_names['40'], 'VOICE')
+
+    def test_plantdatamodel_invalid(self):
+        with self.assertRaises(ValueError):
+            PlantDataModel.load(os.path.join(self.tmpdir, 'missing'))
+        with open(os.path.join(self.plant_dir, 'uplinks_db.yml'), 'w') as f:
+            f.write('switch_uplinks:\n  "R01":\n    uplink_type: trunk\n')
+        with self.assertRaises(ValueError):
+            PlantDataModel.load(self.plant_dir)
+
+    def test_plantdatamodel_vault(self):
+        filename = os.path.join(self.plant_dir, 'secrets.yml')
+        with open(filename, 'w') as f:
+            f.write("snmp_community: !vault |\n  $ANSIBLE_VAULT;1.1;AES256\n  6136\n")
+        with self.assertRaisesRegex(ValueError, "vault encrypted values are not supported.*secrets.yml"):
+            PlantDataModel.load(self.plant_dir)
+        with open(filename, 'w') as f:
+            f.write("$ANSIBLE_VAULT;1.1;AES256\n6136\n")
+        with self.assertRaisesRegex(ValueError, "secrets.yml' is vault encrypted"):
+            PlantDataModel.load(self.plant_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2019, Josef Fuchs <josef.fuchs@j-fuchs.at>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import unittest
+
+from resultcache import LruResultCache, input_digest, pattern_key
+
+
+class TestLruResultCache(unittest.TestCase):
+
+    def test_resultcache_keys(self):
+        self.assertEqual(input_digest("a\nb"), input_digest("a\nb"), "Invalid digest")
+        self.assertNotEqual(input_digest("a\nb"), input_digest("a\nc"), "Invalid digest")
+        self.assertEqual(input_digest(["a", "b"]), input_digest(("a", "b")), "Invalid digest")
+        self.assertEqual(pattern_key("^a$\n^b$"), pattern_key(["^a$", "^b$"]), "Invalid pattern key")
+        self.assertEqual(pattern_key(None), (), "Invalid pattern key")
+
+    def test_resultcache_lru(self):
+        cache = LruResultCache(max_entries=2, max_bytes=100)
+        self.assertIsNone(cache.get('a'), "Invalid hit")
+        cache.put('a', ["line a"])
+        cache.put('b', {'x': ["line b"]})
+        res = cache.get('a')
+        self.assertEqual(res, ["line a"], "Invalid result")
+        res.append("modified")
+        self.assertEqual(cache.get('a'), ["line a"], "Cached result modified")
+        cache.put('c', ["line c"])
+        self.assertIsNone(cache.get('b'), "Least recently used result not evicted")
+        cache.put('d', ["x" * 50, "y" * 50])
+        self.assertEqual(cache.stats()['entries'], 2, "Result larger than max_bytes cached")
+        cache.put('e', ["x" * 80])
+        self.assertEqual(cache.stats(), {'enabled': True, 'hits': 2, 'misses': 2, 'evictions': 3,
+                                         'entries': 1, 'bytes': 88, 'max_entries': 2, 'max_bytes': 100},
+                         "Invalid stats")
+
+        cache.enabled = False
+        cache.put('f', ["line f"])
+        self.assertIsNone(cache.get('e'), "Hit with disabled cache")
+        cache.clear()
+        self.assertEqual(cache.stats()['misses'], 0, "Counters not reset")
+
+if __name__ == '__main__':
+    unittest.main()